@@ -0,0 +1,39 @@
+"""Tools for locating CharLib's on-disk caches and fingerprinting the files they depend on"""
+
+import hashlib, os
+from pathlib import Path
+
+_file_digests = {}
+
+
+def default_cache_dir() -> Path:
+    """Return the per-user cache directory, honoring $XDG_CACHE_HOME if set."""
+    return Path(os.environ.get('XDG_CACHE_HOME', '~/.cache')).expanduser() / 'charlib'
+
+
+def file_digest(path) -> str:
+    """Return a hex digest of the contents of the file at path.
+
+    Digests are memoized by (path, mtime, size), so repeated calls for the same unchanged file only
+    read it once per process.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _file_digests:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        _file_digests[key] = digest.hexdigest()
+    return _file_digests[key]
+
+
+def write_atomic(path, data: bytes):
+    """Write data to path such that concurrent readers never observe a partial file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,167 @@
+"""Interfaces with the simulation backend, reusing stored results for previously simulated decks"""
+
+import hashlib, io, re
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from charlib.cache import file_digest, write_atomic
+
+# Per-process hit/miss counters. The characterizer collects these from each worker after a task.
+stats = Counter()
+
+INCLUDE_REGEX = re.compile(r'^\s*\.(inc|include|lib)\s+(\S+)(\s+\S+)?', re.IGNORECASE)
+
+
+def run(simulator, simulation, settings, key=None):
+    """Run simulation with simulator, or return the stored results of an identical simulation.
+
+    :param simulator: A PySpice simulator object (from PySpice.Simulator.factory).
+    :param simulation: A PySpice simulation object ready to run.
+    :param settings: A CharacterizationSettings object. If settings.use_cache is False, the
+                     simulation always runs and nothing is stored.
+    :param key: (Optional) The simulation's key from simulation_key, if already known.
+    """
+    if not settings.use_cache:
+        return simulator.run(simulation)
+    cache = SimulationCache(settings.cache_dir / 'simulations')
+    key = key or simulation_key(simulation, settings)
+    analysis = cache.load(key)
+    if analysis is not None:
+        stats['hits'] += 1
+        return analysis
+    stats['misses'] += 1
+    stats['simulations'] += 1
+    analysis = simulator.run(simulation)
+    cache.store(key, analysis)
+    return analysis
+
+
+def simulation_key(simulation, settings) -> str:
+    """Return the deck key identifying a PySpice simulation for the configured backend."""
+    return deck_key(str(simulation), settings.simulation.backend)
+
+
+def deck_key(deck: str, backend='') -> str:
+    """Return a content-addressed key for a rendered SPICE deck.
+
+    The deck is normalized before hashing: comments, blank lines and the title line are dropped,
+    whitespace and case are collapsed, and every included file path is replaced by a fingerprint
+    of that file's contents (including any files it includes in turn). This means that renaming a
+    netlist or changing a circuit title does not invalidate the cache, but editing a model does.
+    """
+    lines = [backend]
+    for line in deck.splitlines():
+        line = line.strip()
+        if not line or line.startswith('*') or line.lower().startswith('.title'):
+            continue
+        if match := INCLUDE_REGEX.match(line):
+            (card, path, section) = match.groups()
+            fingerprint = _fingerprint(Path(path.strip('\'"')).expanduser(), set())
+            line = f'.{card} {fingerprint} {section or ""}'
+        lines.append(' '.join(line.lower().split()))
+    return hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+
+
+def _fingerprint(path, visited) -> str:
+    """Return a digest of path's contents and the contents of every file it includes."""
+    path = path.resolve()
+    if not path.is_file():
+        return str(path) # Let ngspice report missing files; just key on the name
+    if path in visited:
+        return ''
+    visited.add(path)
+    digest = hashlib.sha256(file_digest(path).encode())
+    with open(path, 'r', errors='replace') as file:
+        for line in file:
+            match = INCLUDE_REGEX.match(line)
+            # Single-argument .lib cards open a section rather than include another file
+            if match and not (match.group(1).lower() == 'lib' and match.group(3) is None):
+                included = Path(match.group(2).strip('\'"')).expanduser()
+                if not included.is_absolute():
+                    included = path.parent / included
+                digest.update(_fingerprint(included, visited).encode())
+    return digest.hexdigest()
+
+
+class SimulationCache:
+    """An on-disk store of simulation results, keyed by deck_key."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f'{key}.npz'
+
+    def load(self, key):
+        """Return the CachedAnalysis stored under key, or None if there isn't one."""
+        try:
+            with np.load(self._path(key)) as data:
+                return CachedAnalysis.from_arrays({name: data[name] for name in data.files})
+        except (OSError, ValueError, KeyError):
+            return None # Missing or unreadable entries are treated as misses
+
+    def store(self, key, analysis):
+        """Store the vectors and measurements of analysis under key."""
+        buffer = io.BytesIO()
+        np.savez(buffer, **CachedAnalysis.to_arrays(analysis))
+        write_atomic(self._path(key), buffer.getvalue())
+
+
+class CachedAnalysis:
+    """Simulation results loaded from the cache.
+
+    Exposes the parts of the PySpice analysis interface used by procedures: node and branch
+    vectors by item or attribute access, the time or frequency abscissa, and .meas results.
+    """
+
+    ABSCISSAE = ('time', 'frequency')
+
+    def __init__(self, nodes=None, branches=None, measurements=None, **abscissae):
+        self.nodes = nodes or {}
+        self.branches = branches or {}
+        self.measurements = measurements or {}
+        for name, vector in abscissae.items():
+            setattr(self, name, vector)
+
+    @classmethod
+    def to_arrays(cls, analysis) -> dict:
+        """Flatten a PySpice (or cached) analysis into a dict of named numpy arrays."""
+        arrays = {}
+        for name, vector in getattr(analysis, 'nodes', {}).items():
+            arrays[f'node:{name}'] = np.asarray(vector)
+        for name, vector in getattr(analysis, 'branches', {}).items():
+            arrays[f'branch:{name}'] = np.asarray(vector)
+        for name, value in getattr(analysis, 'measurements', {}).items():
+            arrays[f'meas:{name}'] = np.asarray(float(value))
+        for name in cls.ABSCISSAE:
+            vector = getattr(analysis, name, None)
+            if vector is not None:
+                arrays[f'abscissa:{name}'] = np.asarray(vector)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict):
+        """Rebuild an analysis from the output of to_arrays."""
+        parts = {'node': {}, 'branch': {}, 'meas': {}, 'abscissa': {}}
+        for key, array in arrays.items():
+            kind, name = key.split(':', 1)
+            parts[kind][name] = float(array) if kind == 'meas' else array
+        return cls(parts['node'], parts['branch'], parts['meas'], **parts['abscissa'])
+
+    def __getitem__(self, name):
+        for vectors in (self.nodes, self.branches):
+            for key in (name, name.lower()):
+                if key in vectors:
+                    return vectors[key]
+        raise IndexError(f'No node or branch named {name}')
+
+    def __getattr__(self, name):
+        # Only called when normal attribute lookup fails, i.e. for node and branch names
+        if name.startswith('_') or name in ('nodes', 'branches'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except IndexError as e:
+            raise AttributeError(name) from e
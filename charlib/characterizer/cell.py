@@ -1,9 +1,10 @@
 """Encapsulates a cell to be tested."""
 
-import itertools, re
+import itertools
 from pathlib import Path
 
-from charlib.characterizer.procedures import registered_procedures
+from charlib.characterizer import spice
+from charlib.characterizer.procedures import supported_parameters
 
 from charlib.characterizer.logic.evaluators import OPERAND_REGEX
 from charlib.characterizer.logic.functions import Function
@@ -14,11 +15,13 @@ from charlib.liberty import liberty
 class Cell:
     """A standard cell and its functional details"""
 
-    def __init__(self, name: str, supply_nodes: dict,  **cell_config):
+    def __init__(self, name: str, supply_nodes: dict, function_cache=None, **cell_config):
         """Construct a new cell from the given configuration
 
         :param name: The cell name as it appears in the spice netlist.
         :param named_nodes: Supply node name: role maps from the library configuration.
+        :param function_cache: (Optional) A FunctionCache used to share test vectors between
+                               cells and runs.
         :param cell_config: The dict of properties provided in the configuration YAML.
 
         The cell initialization process is as follows:
@@ -41,6 +44,7 @@ class Cell:
         self.pins = {}
         self.diff_pairs = {}
         self.functions = {}
+        self._path_index = None
 
         ## 1. Process cell_config
 
@@ -112,7 +116,9 @@ class Cell:
             raise ValueError(f'Unable to determine direction for pin "{pin_name}"')
 
         # Get pin names from subckt and iterate until there are no unassigned pins remaining
-        unassigned_pins = self.subckt().split()[2:]
+        subckt = spice.netlist_index(self.netlist).subckt(name)
+        self.netlist_pins = [pin.upper() for pin in subckt.pins]
+        unassigned_pins = list(self.netlist_pins)
         while unassigned_pins:
             pin = unassigned_pins.pop(0)
             if pin in special_pins:
@@ -145,6 +151,8 @@ class Cell:
             # TODO: Handle multiple clocks, etc.
             [output_pin] = list(self.filter_pins(name=output))
             self.functions[output] = Function(output_pin, expression, *self.all_pins(), state=state)
+            if function_cache:
+                function_cache.fill(self.functions[output])
 
         ## 4. Add as much liberty data as we can right now
         self.liberty = liberty.Group('cell', name)
@@ -199,12 +207,7 @@ class Cell:
 
     def subckt(self) -> str:
         """Return the subckt line matching this cell"""
-        subckt_pattern = re.compile(rf'^\s*\.subckt\s+{re.escape(self.name)}\b', re.IGNORECASE)
-        with open(self.netlist, 'r') as file:
-            for line in file:
-                if subckt_pattern.match(line):
-                    return line.upper()
-            raise ValueError(f'Failed to identify a .subckt for cell {self.name} in netlist "{self.netlist}"')
+        return ' '.join(['.SUBCKT', self.name.upper(), *self.netlist_pins])
 
     def all_pins(self):
         """Yield all pins, including those stored as members of differential pairs"""
@@ -215,7 +218,7 @@ class Cell:
     def pins_in_netlist_order(self):
         """Yield all pins in the order they appear in the netlist"""
         pins = {p.name: p for p in self.all_pins()}
-        for pin_name in self.subckt().split()[2:]:
+        for pin_name in self.netlist_pins:
             yield pins[pin_name]
 
     def filter_pins(self, **attrs):
@@ -281,20 +284,43 @@ class Cell:
         """Generator for input-to-output paths through a cell
 
         Yields lists in the format [input_name, input_transition, output_name, output_transition].
-        All possible combinations of pin names and transitions are yielded, regardless of whether
-        they are possible given this cell's functions.
+        Only paths with at least one nonmasking condition (i.e. paths which are actually possible
+        given this cell's functions) are yielded.
         """
-        # FIXME: Generate only paths which actually make sense given this cell's function
         transitions = ['01', '10']
+        index = self.path_index
         for path in itertools.product(self.inputs, transitions, self.outputs, transitions):
-            yield path
+            if path in index:
+                yield path
+
+    @property
+    def path_index(self) -> dict:
+        """Return a dict mapping each possible path through the cell to its nonmasking conditions.
+
+        Keys are (input_name, input_transition, output_name, output_transition) tuples, and values
+        are lists of test vectors. The index is built on first use with a single pass over each
+        function's test vectors.
+        """
+        if self._path_index is None:
+            self._path_index = {}
+            inputs = set(self.inputs)
+            for (output_pin, function) in self.functions.items():
+                for tv in function.test_vectors:
+                    output_transition = tv[output_pin]
+                    if len(output_transition) != 2:
+                        continue
+                    for (input_pin, input_transition) in tv.items():
+                        if input_pin in inputs and len(input_transition) == 2:
+                            path = (input_pin, input_transition, output_pin, output_transition)
+                            self._path_index.setdefault(path, []).append(tv)
+        return self._path_index
 
     def nonmasking_conditions_for_path(self, input_pin, input_transition, output_pin,
                                        output_transition):
         """Find all mappings of pin states such that the desired state transitions occur.
 
-        Returns a generator yielding dictionaries of states for which input_pin and output_pin
-        undergo input_transition and output_transition respectively.
+        Returns a list of dictionaries of states for which input_pin and output_pin undergo
+        input_transition and output_transition respectively.
 
         :param input_pin: The name of the input pin of interest.
         :param input_transition: The desired state transition for the input pin. Must be '01' or
@@ -303,9 +329,43 @@ class Cell:
         :param output_transition: The desired state transition for the output pin. Must be '01' or
                                   '10'.
         """
-        for tv in self.functions[output_pin].test_vectors:
-            if tv.get(input_pin) == input_transition and tv[output_pin] == output_transition:
-                yield tv
+        return self.path_index.get((input_pin, input_transition, output_pin, output_transition), [])
+
+    def paths_from(self, input_pin, input_transition):
+        """Generator for the possible paths through a cell starting with the given input transition
+
+        Yields lists in the same format as paths().
+        """
+        transitions = ['01', '10']
+        index = self.path_index
+        for path in itertools.product([input_pin], [input_transition], self.outputs, transitions):
+            if path in index:
+                yield path
+
+    def input_transitions(self):
+        """Generator for (input_name, input_transition) pairs which start at least one path"""
+        yield from dict.fromkeys((path[0], path[1]) for path in self.paths())
+
+    def conditions_for_input(self, input_pin, input_transition) -> dict:
+        """Group the nonmasking conditions for every path starting at input_pin by pin state.
+
+        Several outputs may switch in response to the same input stimulus (for example, both the
+        sum and carry outputs of a full adder), so a single simulation of that stimulus exercises
+        several paths. Returns a dict mapping each distinct input state to a dict of the outputs
+        which switch under it and their transitions. Input states are tuples of (pin, state) pairs
+        covering every input, with inputs not mentioned in a test vector held low as in
+        PinStateMap.
+
+        :param input_pin: The name of the input pin of interest.
+        :param input_transition: The state transition for the input pin. Must be '01' or '10'.
+        """
+        conditions = {}
+        for (_, _, output_pin, output_transition) in self.paths_from(input_pin, input_transition):
+            for state_map in self.nonmasking_conditions_for_path(input_pin, input_transition,
+                                                                 output_pin, output_transition):
+                inputs = tuple((pin, state_map.get(pin, '0')) for pin in self.inputs)
+                conditions.setdefault(inputs, {})[output_pin] = output_transition
+        return conditions
 
     @property
     def is_sequential(self) -> bool:
@@ -348,8 +408,7 @@ class CellTestConfig:
 
         self.timestep = timestep
         self.plots = plots
-        supported_parameters = {param for rp in registered_procedures.values() for param in rp['parameters']}
-        self.parameters = {k: parameters[k] for k in supported_parameters if k in parameters}
+        self.parameters = {k: parameters[k] for k in supported_parameters() if k in parameters}
 
     def variations(self, *keys):
         """Generator for test configuration variations
@@ -1,126 +1,341 @@
 """Dispatches characterization jobs and manages cell data"""
 
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from tqdm import tqdm
+from time import perf_counter
 
-import matplotlib.pyplot as plt
-
-from charlib.characterizer import utils, plots
+from charlib.cache import default_cache_dir
+from charlib.characterizer import backend, spice, utils, plots
 from charlib.characterizer.cell import Cell, CellTestConfig
+from charlib.characterizer.costs import CostModel, makespan
+from charlib.characterizer.dispatch import Dispatcher
+from charlib.characterizer.journal import Journal
+from charlib.characterizer.logic.functions import FunctionCache
+from charlib.characterizer.results import CellGroup, PlotRequest
+from charlib.characterizer.store import MeasurementStore
 from charlib.characterizer.units import UnitsSettings
-from charlib.characterizer.procedures import registered_procedures, ProcedureFailedException
+from charlib.characterizer.procedures import registered_procedures, static_cost, ProcedureFailedException
 from charlib.liberty.library import Library
 
-import charlib.characterizer.procedures.pin_capacitance.ac_sweep
-import charlib.characterizer.procedures.pin_capacitance.charge_integration
-import charlib.characterizer.procedures.combinational.delay
-import charlib.characterizer.procedures.combinational.leakage_power
-import charlib.characterizer.procedures.sequential.delay
-import charlib.characterizer.procedures.sequential.constraint.metastability.binary_search
-import charlib.characterizer.procedures.sequential.constraint.metastability.c2q_contour
-import charlib.characterizer.procedures.sequential.constraint.recovery
-import charlib.characterizer.procedures.sequential.constraint.removal
-import charlib.characterizer.procedures.sequential.constraint.min_pulse_width
-
 class Characterizer:
     """Main object of Charlib. Keeps track of settings and cells, and schedules simulations."""
 
     def __init__(self, **kwargs) -> None:
         self.settings = CharacterizationSettings(**kwargs)
         self.library = Library(kwargs.pop('lib_name'), **self.settings.liberty_attrs_as_dict())
-        self.cells = []
+        self.cells = [] # (cell, config) pairs, built from pending_cells
+        self.pending_cells = [] # (name, properties) pairs added with add_cell
+        self.cache_stats = Counter()
+        self.plot_requests = []
+        self.function_cache = FunctionCache(self.settings.cache_dir / 'functions')
 
     def add_cell(self, name: str, properties: dict):
-        """Add a cell to be characterized"""
-        # Get pg_pins from library settings, then construct the cell
-        supply_pins = {self.settings.primary_power.name: 'primary_power',
-                       self.settings.primary_ground.name: 'primary_ground',
-                       self.settings.pwell.name: 'pwell',
-                       self.settings.nwell.name: 'nwell'}
-        try:
-            cell = Cell(name, supply_pins, **properties)
-        except Exception as e: # FIXME: We should have a more specific error type than this!
-            if self.settings.omit_on_failure:
-                return
-            else:
-                raise ValueError(f'Unable to add cell {name}') from e
-
-        # Handle keywords for plots
-        if properties.get('plots', []) == 'all':
-            properties['plots'] = ['delay', 'io']
-        config = CellTestConfig(properties.pop('models'), **properties)
-        self.cells.append((cell, config))
+        """Add a cell to be characterized.
+
+        Cells are built when planning or characterization begins, in parallel (see prepare_cells).
+        """
+        self.pending_cells.append((name, properties))
 
     def analyse_cell(self, cell, config) -> list:
         """Return a list of callable characterization tasks required for this cell."""
-        simulations = []
-
-        # Measure input pin capacitances
-        simulations += self.settings.simulation.input_capacitance(cell, config, self.settings)
-
-        # Identify which delay and constraint procedures to run based on cell & config
-        if cell.is_sequential:
-            # Find setup & hold constraints (clock-to-q, en-to-q)
-            simulations += self.settings.simulation.metastability_constraint(cell, config, self.settings)
-            # TODO: Find minimum pulse width constraints (set, reset, enable, clock)
-            # Find recovery & removal constraints (clk/en-to-set, clk/en-to-reset)
-            simulations += self.settings.simulation.recovery_constraint(cell, config, self.settings)
-            simulations += self.settings.simulation.removal_constraint(cell, config, self.settings)
-            # Measure sequential propagation and transient delays
-            simulations += self.settings.simulation.sequential_delay(cell, config, self.settings)
+        return plan_cell(cell, config, self.settings)
+
+    def prepare_cells(self, executor=None, use_cache=True):
+        """Build cells added with add_cell and plan their tasks, moving them to self.cells.
+
+        Yields (cell, config, tasks) for each cell, in the order cells were added. Cells which
+        failed to build are skipped if settings.omit_on_failure is set.
+
+        :param executor: (Optional) A concurrent.futures executor to build cells with. If None,
+                         cells are built one at a time in this process.
+        :param use_cache: If False, build cells without the function cache, even if
+                          settings.use_cache is set, so nothing is written to the cache directory.
+        """
+        (pending, self.pending_cells) = (self.pending_cells, [])
+        function_cache = self.function_cache if self.settings.use_cache and use_cache else None
+        jobs = [(name, properties, self.settings, function_cache)
+                for (name, properties) in pending]
+        if executor:
+            prepared = executor.map(prepare_cell, *zip(*jobs)) if jobs else []
         else:
-            # Measure combinational propagation and transient delays
-            simulations += self.settings.simulation.combinational_delay(cell, config, self.settings)
-            # Measure static leakage power for all input states
-            simulations += self.settings.simulation.combinational_leakage(cell, config, self.settings)
-        return simulations
+            prepared = (prepare_cell(*job) for job in jobs)
+        for result in prepared:
+            if result is not None:
+                self.cells.append(result[:2])
+                yield result
+
+    def plan(self, jobs=None) -> dict:
+        """Return a summary of the tasks characterize() would run, without running them.
+
+        The summary includes task and expected simulation counts for each procedure in each cell,
+        and the expected run time given jobs parallel workers. Run time estimates use timings
+        learned from previous runs if available (see CostModel), otherwise they assume one second
+        per simulation. Nothing is written to the cache directory.
+
+        :param jobs: The number of parallel workers. Defaults to settings.jobs, or the number of
+                     CPUs if settings.jobs is None.
+        """
+        jobs = jobs or self.settings.jobs or os.cpu_count()
+        costs = CostModel(self.settings.cache_dir / 'task_costs.json'
+                          if self.settings.use_cache else None)
+        cells = {}
+        durations = []
+        prepared = [(cell, config, self.analyse_cell(cell, config)) for (cell, config) in self.cells]
+        if self.pending_cells:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                prepared += self.prepare_cells(executor, use_cache=False)
+        for (cell, config, tasks) in prepared:
+            procedures = cells.setdefault(cell.name, {})
+            for (task, *args) in tasks:
+                summary = procedures.setdefault(task.__name__,
+                                                {'tasks': 0, 'simulations': 0, 'seconds': 0.0})
+                seconds = costs.estimate(task, *args)
+                summary['tasks'] += 1
+                summary['simulations'] += static_cost(task, *args)
+                summary['seconds'] += seconds
+                durations.append(seconds)
+        summaries = [summary for procedures in cells.values() for summary in procedures.values()]
+        return {
+            'library': self.library.identifier,
+            'jobs': jobs,
+            'cells': cells,
+            'tasks': sum(summary['tasks'] for summary in summaries),
+            'simulations': sum(summary['simulations'] for summary in summaries),
+            'cpu_seconds': sum(durations),
+            'wall_seconds': makespan(durations, jobs),
+            'learned_timings': bool(costs.rates),
+        }
 
     def characterize(self):
-        """Execute scheduled simulation jobs in parallel"""
-        # Setup: Prepare simulation jobs single-threadedly (is that a word?)
-        simulation_tasks = []
-        for (cell, config) in self.cells:
-            simulation_tasks += self.analyse_cell(cell, config)
+        """Build cells, plan their tasks and run them in parallel.
+
+        Cells are built and planned on the same worker pool as simulations, and each cell's tasks
+        are queued as soon as it is ready, so simulations start while later cells are still being
+        planned. Queued tasks are run most expensive first (see Dispatcher).
+        """
+        from tqdm import tqdm # Imported here so that planning doesn't pay for it
 
-        # Run all simulation jobs and merge each resulting liberty cell group into the library
+        # Record every result, including raw measurements, so the library can be re-rendered.
+        # Cells are recorded as they are added (see CellGroup), so the base library has none.
+        store = MeasurementStore(self.measurement_store_path, create=True,
+                                 corner={'temperature': self.settings.temperature,
+                                         'voltage': self.settings.primary_power.voltage})
+        store.set_library(self.library)
+
+        # Skip tasks completed by a previous run (if resuming), applying their stored results
+        journal = Journal(self.settings.results_dir / f'{self.library.identifier}.journal',
+                          resume=self.settings.resume)
+        costs = CostModel(self.settings.cache_dir / 'task_costs.json'
+                          if self.settings.use_cache else None)
+        function_cache = self.function_cache if self.settings.use_cache else None
+        (pending, self.pending_cells) = (self.pending_cells, [])
+        (built_earlier, self.cells) = (self.cells, []) # Such as by plan()
+        built = {} # Index of each built cell in pending -> (cell, config, tasks), or None if omitted
+        next_cell = 0 # Index in pending of the next cell to add to the library
+        tasks = {} # Task key -> task
+        skipped = 0
+
+        # Build cells and run all simulation jobs, applying their results to the library
         with tqdm(bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]',
-                  total=len(simulation_tasks), desc="Characterizing") as progress_bar:
+                  total=0, desc="Characterizing") as progress_bar, journal, store:
             with ProcessPoolExecutor(max_workers=self.settings.jobs) as executor:
-                futures = [executor.submit(task, *args) for (task, *args) in simulation_tasks]
-                for future in as_completed(futures):
+                dispatcher = Dispatcher(executor, 2 * (self.settings.jobs or os.cpu_count()))
+
+                def add_cell(cell, config, cell_tasks):
+                    """Add a built cell to the library and queue its tasks that aren't complete"""
+                    nonlocal skipped
+                    results = [CellGroup(cell.name, cell.liberty)]
+                    if plots.wants(config.plots, 'delay'):
+                        results.append(PlotRequest(cell.name, plots.DelaySurfacePlots(
+                            cell.name, self.settings.plots_dir / cell.name)))
+                    self.apply_results(results)
+                    store.add('characterize', results)
+                    self.cells.append((cell, config))
+                    for task in cell_tasks:
+                        key = task_key(*task)
+                        if key in journal:
+                            self.apply_results(journal.entries[key])
+                            store.add(task[0].__name__, journal.entries[key])
+                            skipped += 1
+                            continue
+                        tasks[key] = task
+                        dispatcher.push(('task', key), costs.estimate(*task), run_task, *task)
+                    progress_bar.total = len(tasks)
+                    progress_bar.refresh()
+
+                for (cell, config) in built_earlier:
+                    add_cell(cell, config, self.analyse_cell(cell, config))
+                for (index, (name, properties)) in enumerate(pending):
+                    dispatcher.prepare(('cell', index), prepare_cell, name, properties,
+                                       self.settings, function_cache)
+                for ((kind, label), future) in dispatcher.completed():
+                    if kind == 'cell':
+                        # Add cells to the library in the order they were configured
+                        built[label] = future.result()
+                        while next_cell in built:
+                            if built[next_cell] is not None:
+                                add_cell(*built[next_cell])
+                            del built[next_cell]
+                            next_cell += 1
+                        continue
                     try:
-                        cell_group = future.result()
+                        (results, cache_stats, seconds) = future.result()
                     except ProcedureFailedException:
                         if self.settings.omit_on_failure:
                             continue
                         else:
                             raise
-                    self.library.add_group(cell_group)
+                    journal.append(label, results)
+                    self.apply_results(results)
+                    store.add(tasks[label][0].__name__, results)
+                    self.cache_stats.update(cache_stats)
+                    if not cache_stats.get('hits'): # Cached simulations would skew timings
+                        (task, *args) = tasks[label]
+                        costs.record(task, args, seconds)
                     progress_bar.update(1)
+        costs.save()
+        if self.settings.resume and not self.settings.quiet:
+            print(f'Resumed: {skipped} of {skipped + len(tasks)} tasks were already complete')
+        if self.settings.use_cache and not self.settings.quiet:
+            print(f'Simulation cache: {self.cache_stats["hits"]} hits, '
+                  f'{self.cache_stats["misses"]} misses')
 
         # Post-processing: Fetch generated table templates and add them to the library
-        lut_templates = []
-        for timing_group in self.library.subgroups_with_name('timing'):
-            lut_templates += [lut_group.template for lut_group in timing_group.groups.values()]
-        [self.library.add_group(lut_template) for lut_template in lut_templates]
-
-        # Plot delay surfaces (if desired)
-        for (cell, config) in self.cells:
-            cell_group = self.library.group('cell', cell.name)
-            if 'delay' in config.plots:
-                for pin_group in cell_group.subgroups_with_name('pin'):
-                    pin = pin_group.identifier
-                    for timing_group in pin_group.subgroups_with_name('timing'):
-                        related_pin = timing_group.attributes['related_pin'].value
-                        fig = plots.plot_delay_surfaces(list(timing_group.groups.values()),
-                                                        title=f'Cell delays ({related_pin} to {pin})')
-                        # FIXME: let user decide whether to show or save
-                        fig_path = self.settings.plots_dir / cell.name
-                        fig_path.mkdir(parents=True, exist_ok=True)
-                        fig.savefig(fig_path / f'{related_pin} to {pin} delay.png') # FIXME: filetype should be configurable
-                        plt.close()
-        return self.library.to_liberty(precision=6)
+        self.library.add_table_templates()
+
+        # Draw requested plots in their own stage, unless they are deferred to charlib plot
+        if not self.settings.defer_plots:
+            plots.draw_plots(self.library, self.plot_requests, self.settings.jobs,
+                             self.settings.quiet)
+        return self.library
+
+    @property
+    def measurement_store_path(self) -> Path:
+        """The location of the measurement store written by characterize()"""
+        return self.settings.results_dir / f'{self.library.identifier}.measurements.db'
+
+    def write_library(self, file=None):
+        """Write the characterized library in Liberty format and return where it was written.
+
+        The library is streamed to the file rather than rendered into memory first.
+
+        :param file: (Optional) A path or writable text file object. Paths ending in .gz are
+                     compressed with gzip. Defaults to the library file name in
+                     settings.results_dir.
+        """
+        if file is None:
+            file = self.settings.results_dir / self.library.file_name
+        self.library.write(file, precision=6)
+        return file
+
+    def apply_results(self, results):
+        """Write a list of task results (see charlib.characterizer.results) into the library."""
+        for result in results:
+            result.apply(self.library)
+            if isinstance(result, PlotRequest):
+                self.plot_requests.append(result)
+
+
+def build_cell(name: str, properties: dict, settings, function_cache=None):
+    """Construct a Cell and its CellTestConfig from the properties given in the configuration.
+
+    :param name: The cell name.
+    :param properties: The dict of cell properties from the configuration YAML.
+    :param settings: A CharacterizationSettings object.
+    :param function_cache: (Optional) A FunctionCache to load and store test vectors with.
+    :raises ValueError: If the cell can't be built.
+    """
+    # Get pg_pins from library settings, then construct the cell
+    supply_pins = {settings.primary_power.name: 'primary_power',
+                   settings.primary_ground.name: 'primary_ground',
+                   settings.pwell.name: 'pwell',
+                   settings.nwell.name: 'nwell'}
+    try:
+        cell = Cell(name, supply_pins, function_cache, **properties)
+        if settings.extract_netlists:
+            # Simulate with only this cell's subckts rather than the whole library netlist
+            cell.netlist = spice.extract_subckt(cell.netlist, name, settings.cache_dir / 'netlists')
+    except Exception as e: # FIXME: We should have a more specific error type than this!
+        raise ValueError(f'Unable to add cell {name}') from e
+
+    # Handle keywords for plots
+    if properties.get('plots', []) == 'all':
+        properties['plots'] = ['delay', 'io']
+    config = CellTestConfig(properties.pop('models'), **properties)
+    return (cell, config)
+
+
+def plan_cell(cell, config, settings) -> list:
+    """Return a list of callable characterization tasks required for a cell."""
+    simulations = []
+
+    # Measure input pin capacitances
+    simulations += settings.simulation.input_capacitance(cell, config, settings)
+
+    # Identify which delay and constraint procedures to run based on cell & config
+    if cell.is_sequential:
+        # Find setup & hold constraints (clock-to-q, en-to-q)
+        simulations += settings.simulation.metastability_constraint(cell, config, settings)
+        # TODO: Find minimum pulse width constraints (set, reset, enable, clock)
+        # Find recovery & removal constraints (clk/en-to-set, clk/en-to-reset)
+        simulations += settings.simulation.recovery_constraint(cell, config, settings)
+        simulations += settings.simulation.removal_constraint(cell, config, settings)
+        # Measure sequential propagation and transient delays
+        simulations += settings.simulation.sequential_delay(cell, config, settings)
+    else:
+        # Measure combinational propagation and transient delays
+        simulations += settings.simulation.combinational_delay(cell, config, settings)
+        # Measure static leakage power for all input states
+        simulations += settings.simulation.combinational_leakage(cell, config, settings)
+    return simulations
+
+
+def prepare_cell(name: str, properties: dict, settings, function_cache=None):
+    """Build a cell and plan its tasks, usually in a worker process.
+
+    Returns (cell, config, tasks), or None if the cell failed to build and settings.omit_on_failure
+    is set. See build_cell for a description of the arguments.
+    """
+    try:
+        (cell, config) = build_cell(name, properties, settings, function_cache)
+    except ValueError:
+        if settings.omit_on_failure:
+            return None
+        raise
+    return (cell, config, plan_cell(cell, config, settings))
+
+
+def task_key(task, *args) -> str:
+    """Return a string identifying a characterization task across runs.
+
+    The key is built from the task's name, the cell name, and the task-specific arguments (such as
+    the variation and path under test). Cell, configuration and settings objects are represented
+    only by the cell name.
+    """
+    parts = [task.__name__]
+    for arg in args:
+        if isinstance(arg, Cell):
+            parts.append(arg.name)
+        elif isinstance(arg, (CellTestConfig, CharacterizationSettings)):
+            continue
+        elif callable(arg):
+            parts.append(arg.__name__)
+        else:
+            parts.append(repr(arg))
+    return ' '.join(parts)
+
+
+def run_task(task, *args):
+    """Run a characterization task in a worker process.
+
+    Returns the task's result along with the simulation cache statistics it accumulated and its
+    run time in seconds."""
+    backend.stats.clear()
+    start = perf_counter()
+    result = task(*args)
+    return (result, dict(backend.stats), perf_counter() - start)
 
 
 class CharacterizationSettings:
@@ -134,8 +349,15 @@ class CharacterizationSettings:
         self.debug = kwargs.pop('debug', False)
         self.debug_dir = Path(kwargs.pop('debug_dir', 'debug'))
         self.quiet = kwargs.pop('quiet', False)
+        self.resume = kwargs.pop('resume', False)
+        self.defer_plots = kwargs.pop('defer_plots', False)
+        self.keep_waveforms = kwargs.pop('keep_waveforms', False)
         self.cell_defaults = kwargs.get('cell_defaults', {})
         self.omit_on_failure = kwargs.get('omit_on_failure', False)
+        self.use_cache = kwargs.pop('use_cache', True)
+        self.cache_dir = Path(kwargs.pop('cache_dir', None) or default_cache_dir()).expanduser()
+        self.subset_models = kwargs.pop('subset_models', True)
+        self.extract_netlists = kwargs.pop('extract_netlists', True)
 
         # Simulation procedures
         self.simulation = SimulationSettings(**kwargs.get('simulation', {}))
@@ -156,6 +378,16 @@ class CharacterizationSettings:
         # Operating conditions
         self.temperature = kwargs.get('temperature', 25)
 
+    @property
+    def waveforms_dir(self):
+        """Directory for waveforms saved by characterization tasks (see characterizer.waveforms)"""
+        return self.results_dir / 'waveforms'
+
+    @property
+    def models_dir(self):
+        """Directory for trimmed model files, or None if model subsetting is disabled"""
+        return self.cache_dir / 'models' if self.subset_models else None
+
     @property
     def named_nodes(self):
         """Convenience accessor returning a tuple of all named nodes"""
@@ -0,0 +1,69 @@
+"""Estimates how long characterization tasks will take so the most expensive can be run first"""
+
+import heapq, json, statistics
+from pathlib import Path
+
+from charlib.cache import write_atomic
+from charlib.characterizer.procedures import static_cost
+
+
+class CostModel:
+    """Combines static per-task cost estimates with timings learned from previous runs.
+
+    Each task declares an approximate cost (see charlib.characterizer.procedures.estimated_cost).
+    As tasks complete, the model learns how many seconds each unit of declared cost actually takes
+    for that kind of task, and uses this to scale future estimates. Task kinds which haven't been
+    timed yet are scaled by the median rate of those which have.
+    """
+
+    # Number of samples after which older timings are gradually forgotten
+    window = 20
+
+    def __init__(self, path=None):
+        """Create a new cost model.
+
+        :param path: (Optional) A JSON file used to persist learned timings between runs.
+        """
+        self.path = Path(path) if path else None
+        self.rates = {} # task name -> {'samples': int, 'seconds_per_cost': float}
+        if self.path and self.path.exists():
+            try:
+                self.rates = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                pass # A corrupt timing file only costs us scheduling quality
+
+    def estimate(self, task, *args) -> float:
+        """Return the expected run time of task with the given arguments."""
+        return static_cost(task, *args) * self._rate(task.__name__)
+
+    def _rate(self, name) -> float:
+        if name in self.rates:
+            return self.rates[name]['seconds_per_cost']
+        if self.rates:
+            return statistics.median(rate['seconds_per_cost'] for rate in self.rates.values())
+        return 1.0
+
+    def record(self, task, args, seconds: float):
+        """Update learned timings with a task's measured run time."""
+        cost = static_cost(task, *args)
+        if cost <= 0:
+            return # Nothing to learn a rate from
+        rate = self.rates.setdefault(task.__name__, {'samples': 0, 'seconds_per_cost': 0.0})
+        rate['samples'] += 1
+        sample = seconds / cost
+        rate['seconds_per_cost'] += (sample - rate['seconds_per_cost']) / min(rate['samples'],
+                                                                               self.window)
+
+    def save(self):
+        """Write learned timings to disk, if this model has a path."""
+        if self.path:
+            write_atomic(self.path, json.dumps(self.rates, indent=2).encode())
+
+
+def makespan(durations, jobs: int) -> float:
+    """Return the total run time of tasks with the given durations, run longest-first on jobs
+    parallel workers."""
+    workers = [0.0] * max(jobs, 1)
+    for duration in sorted(durations, reverse=True):
+        heapq.heappush(workers, heapq.heappop(workers) + duration)
+    return max(workers)
@@ -0,0 +1,75 @@
+"""Streams jobs into a worker pool as they become known, most expensive first"""
+
+import heapq, itertools
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class Dispatcher:
+    """Runs jobs on an executor, keeping a bounded number in flight.
+
+    Two kinds of jobs share the pool. Preparation jobs (such as building a cell and planning its
+    tasks) run in the order they were added. Tasks wait in a priority queue and run most expensive
+    first. Preparation jobs are submitted while fewer than limit tasks are queued, so planning stays
+    far enough ahead to find expensive tasks without holding up the first simulations.
+
+    Because only limit jobs are ever submitted to the executor, jobs added while others are running
+    (for example, the tasks of a newly planned cell) are still scheduled by priority.
+
+    :param executor: A concurrent.futures executor to run jobs on.
+    :param limit: The maximum number of jobs submitted to the executor at once. Should be somewhat
+                  more than the number of workers, so no worker waits on the dispatcher.
+    """
+
+    def __init__(self, executor, limit: int):
+        self.executor = executor
+        self.limit = max(limit, 1)
+        self.preparations = deque() # (label, function, args) in submission order
+        self.queue = [] # Heap of (-cost, sequence number, label, function, args)
+        self.running = {} # future -> label
+        self._sequence = itertools.count()
+
+    def prepare(self, label, function, *args):
+        """Queue a preparation job, to run after those already queued.
+
+        :param label: Any value identifying the job. It is returned with the job's future.
+        :param function: The picklable function to run.
+        :param *args: Arguments to pass to function.
+        """
+        self.preparations.append((label, function, args))
+
+    def push(self, label, cost: float, function, *args):
+        """Queue a task, to run before queued tasks with a lower cost.
+
+        Tasks with equal costs run in the order they were pushed.
+
+        :param label: Any value identifying the task. It is returned with the task's future.
+        :param cost: The task's estimated cost, such as from CostModel.estimate.
+        :param function: The picklable function to run.
+        :param *args: Arguments to pass to function.
+        """
+        heapq.heappush(self.queue, (-cost, next(self._sequence), label, function, args))
+
+    def __len__(self) -> int:
+        """Return the number of jobs queued or running."""
+        return len(self.preparations) + len(self.queue) + len(self.running)
+
+    def _fill(self):
+        while len(self.running) < self.limit and (self.preparations or self.queue):
+            if self.preparations and len(self.queue) < self.limit:
+                (label, function, args) = self.preparations.popleft()
+            else:
+                (*_, label, function, args) = heapq.heappop(self.queue)
+            self.running[self.executor.submit(function, *args)] = label
+
+    def completed(self):
+        """Yield (label, future) for each job as it completes, until no jobs are left.
+
+        Jobs may be added while iterating. They are submitted as running jobs complete.
+        """
+        self._fill()
+        while self.running:
+            (done, _) = wait(self.running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield (self.running.pop(future), future)
+            self._fill()
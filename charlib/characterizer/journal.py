@@ -0,0 +1,62 @@
+"""Keeps a durable record of completed characterization tasks so interrupted runs can resume"""
+
+import os, pickle
+from pathlib import Path
+
+
+class Journal:
+    """An append-only file of (task key, result) entries.
+
+    Each entry is flushed to disk as soon as it is appended, so a crash or interruption loses at
+    most the entry being written at the time. A partially-written final entry is ignored when the
+    journal is read back.
+    """
+
+    def __init__(self, path, resume=False):
+        """Open a journal at path.
+
+        :param path: The journal file location.
+        :param resume: If True, load entries from an existing journal at path and append to it.
+                       Otherwise any existing journal is discarded.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._valid_length = 0
+        self.entries = dict(self._read()) if resume and self.path.exists() else {}
+        self._file = open(self.path, 'ab' if resume else 'wb')
+        if resume:
+            # Drop any partially-written entry so appended entries stay readable
+            self._file.truncate(self._valid_length)
+
+    def _read(self):
+        """Yield (key, result) pairs from the journal file, stopping at the first bad entry."""
+        with open(self.path, 'rb') as file:
+            while True:
+                try:
+                    (key, result) = pickle.load(file)
+                except (EOFError, pickle.UnpicklingError, AttributeError, IndexError, ValueError):
+                    return
+                self._valid_length = file.tell()
+                yield (key, result)
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def append(self, key, result):
+        """Durably record that the task identified by key completed with result."""
+        pickle.dump((key, result), self._file)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.entries[key] = result
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,3 +1,5 @@
+import warnings
+
 # Global Token definitions
 T_NOT = 0
 T_GROUP = 1
@@ -49,106 +51,115 @@ class Token:
     def is_binary_operator(self) -> bool:
         return self.type in range(T_AND, T_OR+1)
 
-# Rules
-# E = expression
-# U = unary operator
-# B = binary operator
-RULES = lambda S : [
-    [S],                            # 0: E -> [A-z,0-9,_]* OR U -> ((~)|(!)) OR B -> (\|)|((~\^)|(\^~)|(\^))|(&)
-    [Token('('), 'E', Token(')')],  # 1: E -> (E)
-    ['U', 'E'],                     # 2: E -> UE
-    ['E', 'B', 'E'],                # 3: E -> EBE
-]
-
-def _get_rule(stack_token, input_sequence) -> (int, int):
-    """Look up a rule by the current stack token and input sequence"""
-    # 3 If the sequence contains any B not in grouping symbols
-    #   | On Stack: | Condition:
-    # --|-----------|
-    #   | E | U | B |
-    # --|---|---|---|------------
-    # R | 3 |   |   | Binary operator in input sequence (not within matched grouping symbols)
-    # u | 2 |   |   | Input sequence starts with unary operator ('~' or '!')
-    # l | 1 |   |   | Input sequence starts with grouping symbol
-    # e | 0 | 0 | 0 | Input sequence contains a terminal
-    if not input_sequence:
-        raise ValueError('Unable to determine rule for empty sequence!')
-    if stack_token == 'E':
-        if any([token.is_binary_operator for token in input_sequence]):
-            try:
-                op_index = _find_least_precedent_binary_operator(input_sequence)
-                return (3, op_index)
-            except ValueError:
-                # If we didn't return, either there is a syntax error OR all operators are within
-                # parentheses. Check other conditions
-                pass
-        if input_sequence[0] == Token('~'):
-            return (2, None)
-        elif input_sequence[0] == Token('('):
-            return (1, None)
-        else:
-            return (0, None)
-    elif stack_token == 'U' and input_sequence[0] == Token('~'):
-        return (0, None)
-    elif stack_token == 'B' and input_sequence[0].is_binary_operator:
-        return (0, None)
-    else:
-        # Syntax error
-        raise ValueError() # TODO: check error type, add a decent message
-
-def _has_matching_parentheses(tokens: list) -> bool:
-    # Check if the list of tokens has matching grouping symbols
-    unmatched_parentheses = 0
-    for token in tokens:
-        if token.type == T_GROUP:
-            unmatched_parentheses += 1
-        elif token.type == T_GROUP_END:
-            unmatched_parentheses -= 1
-    return unmatched_parentheses == 0
-
-def _find_least_precedent_binary_operator(tokens: list) -> int:
-    # Locate the least precedent binary operator in the list (outside of grouping symbols) and return its index
-    for op_types in [[T_OR], [T_XOR, T_XNOR], [T_AND]]:
-        matching_ops = [op.type in op_types for op in tokens]
-        for matching_op in matching_ops: # FIXME: There's probably a way to do this more simply with e.g. enumerate
-            if matching_op:
-                op_index = matching_ops.index(matching_op)
-                if _has_matching_parentheses(tokens[:op_index]):
-                    return op_index
-                else:
-                    matching_ops[op_index] = False # Move on to the next matching op, if any
-        # If we didn't return on this iteration, check the next group of op_types
-    raise ValueError('No binary operators outside of grouping symbols')
+# Binary operator precedence, from least to most tightly binding
+PRECEDENCE = {T_OR: 0, T_XOR: 1, T_XNOR: 1, T_AND: 2}
+MAX_PRECEDENCE = 2
 
-def _parse(tokens: list) -> list:
-    # Parse a list of lexed tokens and return an abstract syntax tree
-    stack = ['E']
-    position = 0
-    syntax_tree = []
+# Operators whose chains (e.g. A&B&C) are collected into a single syntax tree node
+ASSOCIATIVE_OPERATORS = {'&', '*', '|', '+', '^'}
 
-    while stack:
-        stack_token = stack.pop()
+def _parse_tree(tokens: list):
+    """Parse a list of lexed tokens and return an abstract syntax tree.
 
-        if isinstance(stack_token, Token): # Pop resolved terminals
-            if stack_token == tokens[position] or stack_token.type == T_GROUP_END:
-                if stack_token.type == T_OTHER or stack_token.type == T_NOT:
-                    syntax_tree.append(stack_token.symbol)
-                position += 1
-            else:
-                raise ValueError(f'Parsing failed: token "{tokens[position]}" did not match stack token "{stack_token}" at position {position}')
-        else: # Resolve rules by lookup
-            (rule, op_index) = _get_rule(stack_token, tokens[position:])
-            if op_index is not None:
-                # Immediately append the operation to the syntax tree
-                syntax_tree.append(tokens[position+op_index].symbol)
-                # Split binary operations and parse left & right separately
-                syntax_tree.extend(_parse(tokens[position:position+op_index]))
-                syntax_tree.extend(_parse(tokens[position+op_index+1:]))
-            else:
-                stack.extend(reversed(RULES(tokens[position])[rule]))
+    This is a precedence-climbing parser: each token is visited once, so parsing takes time linear
+    in the length of the expression. Binary operators of equal precedence group to the right.
 
+    Warns if & and ^ (or ~^) are mixed without parentheses: & binds more tightly here, as in
+    SystemVerilog, but Liberty gives ^ precedence over &, so such functions are ambiguous.
+    """
+    position = 0
+    bare_and = False # Whether an & outside any parentheses was seen since the last reset
+
+    def parse_operand():
+        # Parse a (possibly negated) operand or parenthesized group
+        nonlocal position, bare_and
+        negations = 0
+        while position < len(tokens) and tokens[position].type == T_NOT:
+            negations += 1
+            position += 1
+        if position >= len(tokens):
+            raise ValueError('Parsing failed: expected an operand at end of expression')
+        token = tokens[position]
+        if token.type == T_GROUP:
+            group_start = position
+            position += 1
+            outer_bare_and = bare_and
+            node = parse_binary(0)
+            bare_and = outer_bare_and
+            if position >= len(tokens) or tokens[position].type != T_GROUP_END:
+                raise ValueError(f'Parsing failed: unmatched "(" at position {group_start}')
+            position += 1
+        elif token.type == T_OTHER:
+            node = token.symbol
+            position += 1
+        else:
+            raise ValueError(f'Parsing failed: unexpected token "{token}" at position {position}')
+        for _ in range(negations):
+            node = ('~', node)
+        return node
+
+    def parse_binary(level):
+        # Parse a chain of operations with precedence at least level
+        nonlocal position, bare_and
+        if level > MAX_PRECEDENCE:
+            return parse_operand()
+        if level == PRECEDENCE[T_XOR]:
+            outer_bare_and = bare_and
+            bare_and = False
+        operands = [parse_binary(level + 1)]
+        operators = []
+        while position < len(tokens) and PRECEDENCE.get(tokens[position].type) == level:
+            operators.append(tokens[position].symbol)
+            position += 1
+            operands.append(parse_binary(level + 1))
+        if level == PRECEDENCE[T_AND] and operators:
+            bare_and = True
+        elif level == PRECEDENCE[T_XOR]:
+            if operators and bare_and:
+                expression = ''.join(str(token) for token in tokens)
+                warnings.warn(f'"{expression}" mixes & with ^ or ~^ without parentheses. & is applied '
+                              f'first, but Liberty applies ^ first: add parentheses to make the '
+                              f'intended order explicit.')
+            bare_and = outer_bare_and
+        # Group operations to the right, merging chains of the same associative operator. Each
+        # chain's operands are collected first, so its node is only built once.
+        node = operands.pop()
+        while operators:
+            operator = operators.pop()
+            if operator not in ASSOCIATIVE_OPERATORS:
+                node = (operator, operands.pop(), node)
+                continue
+            chain = list(node[:0:-1]) if isinstance(node, tuple) and node[0] == operator else [node]
+            chain.append(operands.pop())
+            while operators and operators[-1] == operator:
+                operators.pop()
+                chain.append(operands.pop())
+            node = (operator, *reversed(chain))
+        return node
+
+    syntax_tree = parse_binary(0)
+    if position < len(tokens):
+        raise ValueError(f'Parsing failed: unexpected token "{tokens[position]}" at position {position}')
     return syntax_tree
 
+def to_prefix(syntax_tree) -> list:
+    """Convert an abstract syntax tree to a list of tokens in Polish prefix notation."""
+    if isinstance(syntax_tree, str):
+        return [syntax_tree]
+    (operator, *operands) = syntax_tree
+    prefix = []
+    for operand in operands[:-1]:
+        prefix.append(operator)
+        prefix.extend(to_prefix(operand))
+    if len(operands) == 1: # Unary operation
+        prefix.append(operator)
+    prefix.extend(to_prefix(operands[-1]))
+    return prefix
+
+def _parse(tokens: list) -> list:
+    # Parse a list of lexed tokens and return the result in Polish prefix notation
+    return to_prefix(_parse_tree(tokens))
+
 
 def _lex(expression: str) -> list:
     """Convert a simple boolean logic expression into tokens"""
@@ -186,6 +197,17 @@ def _lex(expression: str) -> list:
         tokens.append(Token(temp))
     return tokens
 
+def parse_tree(expression: str):
+    """Parse a logic string and return an abstract syntax tree.
+
+    Operands are returned as strings, and operations as tuples of (operator, *operands). Operators
+    are represented by their symbols ('!' is normalized to '~'). Chains of the same associative
+    operator, such as A&B&C, are collected into a single tuple.
+
+    Supports the same operations as parse_logic.
+    """
+    return _parse_tree(_lex(expression))
+
 def parse_logic(expression: str) -> list:
     """Parse a logic string and return the result in Polish prefix notation.
 
@@ -225,3 +247,5 @@ if __name__ == '__main__':
     assert parse_logic('a^b|c^d') == ['|', '^', 'a', 'b', '^', 'c', 'd']
     assert parse_logic('a|b^c|d') == ['|', 'a', '|', '^', 'b', 'c', 'd']
     assert parse_logic('a&(b|c)&d') == ['&', 'a', '&', '|', 'b', 'c', 'd']
+    assert parse_tree('a|b&c|(d|e)') == ('|', 'a', ('&', 'b', 'c'), 'd', 'e')
+    assert parse_tree('|'.join(f'a{i}' for i in range(10000)))[1:] == tuple(f'a{i}' for i in range(10000))
@@ -1,32 +1,115 @@
 """Tools for reliably evaluating functions"""
 
-import re
+import functools, re
 from charlib.characterizer.port import Port
+from charlib.characterizer.logic.Parser import parse_tree, to_prefix
 
 OPERAND_REGEX = re.compile(r'(\w+)')
 
+
+def packed_columns(operands) -> tuple:
+    """Return the input columns of a truth table over operands, packed into integers.
+
+    Row r of the truth table assigns each operand the corresponding bit of r, with the first
+    operand as the most significant bit. Bit r of each column holds that operand's value in row r.
+    Returns a tuple of (columns, mask), where columns maps operand names to packed columns and mask
+    has one set bit per row.
+
+    :param operands: A list of operand names.
+    """
+    n_rows = 2**len(operands)
+    mask = (1 << n_rows) - 1
+    columns = {}
+    for (i, operand) in enumerate(operands):
+        run = 1 << (len(operands) - 1 - i) # Number of consecutive rows with the same value
+        block = ((1 << run) - 1) << run # One run of 0s followed by one run of 1s
+        columns[operand] = mask // ((1 << 2*run) - 1) * block
+    return (columns, mask)
+
+
+def _to_python(node, arguments) -> str:
+    """Return Python source evaluating a syntax tree from parse_tree."""
+    if isinstance(node, str):
+        return arguments[node]
+    (operator, *operands) = node
+    operands = [_to_python(operand, arguments) for operand in operands]
+    match operator:
+        case '~':
+            return f'(not {operands[0]})'
+        case '&' | '*':
+            return '(' + ' and '.join(operands) + ')'
+        case '|' | '+':
+            return '(' + ' or '.join(operands) + ')'
+        case '^':
+            return '(' + ' ^ '.join(f'bool({operand})' for operand in operands) + ')'
+        case '~^':
+            return '(' + ' == '.join(f'bool({operand})' for operand in operands) + ')'
+    raise ValueError(f'Unrecognized operator "{operator}"')
+
+
+@functools.lru_cache(maxsize=None)
+def compile_expression(expression: str) -> tuple:
+    """Parse and compile a Boolean expression into a Python callable.
+
+    Returns a tuple of (ast, syntax_tree, operands, source, function). ast is the abstract syntax
+    tree from parse_tree, syntax_tree is the same expression in Polish prefix notation (see
+    parse_logic), and function takes one positional argument per operand, in the order given by
+    operands. Results are memoized, so an expression shared by many cells is only compiled once
+    per process.
+    """
+    ast = parse_tree(expression)
+    operands = sorted(set(OPERAND_REGEX.findall(expression)))
+    arguments = {operand: f'_{i}' for (i, operand) in enumerate(operands)}
+    source = _to_python(ast, arguments)
+    function = eval(compile(f'lambda {",".join(arguments.values())}: bool({source})',
+                            f'<expression {expression}>', 'eval'))
+    return (ast, to_prefix(ast), operands, source, function)
+
+
 class BooleanEvaluator:
     """Evaluates Boolean functions by converting them to static Python callables"""
 
     def __init__(self, expression: str) -> None:
         """Initialize a new BooleanEvaluator"""
         self.raw_expression = expression
-        self.expression = (
-            expression.upper()
-                .replace('!', ' not ')
-                .replace('~', ' not ')
-                .replace('&', ' and ')
-                .replace('|', ' or ')
-        )
+        (self.ast, self.syntax_tree, self._operands, self.expression, self._function) = \
+            compile_expression(expression)
+
+    def __reduce__(self):
+        # Compiled functions can't be pickled, so recompile (or reuse) them when unpickling
+        return (BooleanEvaluator, (self.raw_expression,))
 
     def __call__(self, **inputs) -> bool:
         """Call the evaluator's stored expression"""
-        evaluator = eval(f'lambda {",".join(self.operands)}: {self.expression}')
-        return evaluator(**inputs)
+        return self._function(*[inputs[operand] for operand in self._operands])
+
+    def evaluate_columns(self, columns: dict, mask: int) -> int:
+        """Evaluate the expression over every row of a truth table at once.
+
+        :param columns: A dict mapping operand names to packed truth table columns, as returned by
+                        packed_columns.
+        :param mask: An integer with one set bit per truth table row.
+        """
+        stack = []
+        for token in reversed(self.syntax_tree):
+            match token:
+                case '~':
+                    stack.append(mask ^ stack.pop())
+                case '&' | '*':
+                    stack.append(stack.pop() & stack.pop())
+                case '|' | '+':
+                    stack.append(stack.pop() | stack.pop())
+                case '^':
+                    stack.append(stack.pop() ^ stack.pop())
+                case '~^':
+                    stack.append(mask ^ stack.pop() ^ stack.pop())
+                case _:
+                    stack.append(columns[token])
+        return stack.pop()
 
     @property
     def operands(self):
-        return sorted(set(OPERAND_REGEX.findall(self.raw_expression)))
+        return list(self._operands)
 
     def __str__(self):
         return self.raw_expression
@@ -61,6 +144,21 @@ class StateMachineEvaluator:
         else:
             return self.expression(**inputs)
 
+    def evaluate_columns(self, columns: dict, mask: int) -> int:
+        """Compute the next state for every row of a truth table at once.
+
+        :param columns: A dict mapping operand names to packed truth table columns, as returned by
+                        packed_columns.
+        :param mask: An integer with one set bit per truth table row.
+        """
+        next_state = self.expression.evaluate_columns(columns, mask)
+        # Apply preset before clear so that clear takes priority, as in __call__
+        for (pin, state) in [(self.preset, self.preset_state), (self.clear, self.clear_state)]:
+            if pin:
+                asserted = columns[pin.name] ^ mask if pin.is_inverted() else columns[pin.name]
+                next_state = (next_state & ~asserted) | (asserted if state else 0)
+        return next_state & mask
+
     @property
     def operands(self):
         operands = set(self.expression.operands)
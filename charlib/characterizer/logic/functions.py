@@ -1,7 +1,15 @@
 """Maps logic functions to truth tables and test vectors."""
 
+import hashlib, sys
+from array import array
+from pathlib import Path
+
+from charlib.cache import write_atomic
 from charlib.characterizer.port import Port
-from charlib.characterizer.logic.evaluators import OPERAND_REGEX, BooleanEvaluator, StateMachineEvaluator
+from charlib.characterizer.logic.evaluators import OPERAND_REGEX, BooleanEvaluator, StateMachineEvaluator, packed_columns
+
+# Test vectors are packed as (start_row << PIN_BITS) | flipped_operand_index
+PIN_BITS = 6
 
 class Function:
     """Provides function evaluation and mapping faculties"""
@@ -27,7 +35,8 @@ class Function:
         self.clear = None
         self.preset = None
         self.enable = None
-        self._cached_test_vectors = list()
+        self._output_column = None
+        self._packed_test_vectors = None
 
         # Save ports which appear in the expression (or are relevant to state)
         # TODO: Handle multiple clocks/sets/resets/enables
@@ -50,11 +59,11 @@ class Function:
         expr = self.expression
         if self.enable:
             not_en, en = ('', '~') if self.enable.is_inverted() else ('~', '')
-            expr = f'{en}{self.enable.name} & {expr} | {not_en}{self.enable.name} & {self.state}'
+            expr = f'{en}{self.enable.name} & ({expr}) | {not_en}{self.enable.name} & {self.state}'
         if state:
             if self.clock:
                 not_clk, clk = ('', '~') if self.clock.is_inverted() else ('~', '')
-                expr = f'{clk}{self.clock.name} & {expr} | {not_clk}{self.clock.name} & {self.state}'
+                expr = f'{clk}{self.clock.name} & ({expr}) | {not_clk}{self.clock.name} & {self.state}'
             self.evaluator = StateMachineEvaluator(expr, self.preset, self.clear,
                                                    preset_state = not self.is_output_inverting,
                                                    clear_state = self.is_output_inverting)
@@ -70,6 +79,33 @@ class Function:
         """Evaluate this function for the given inputs"""
         return int(self.evaluator(**inputs))
 
+    @property
+    def output_column(self) -> int:
+        """Return the output column of this function's truth table, packed into an integer.
+
+        Bit r holds the output for row r of truth_table(). The column is computed once, evaluating
+        the expression over every row at the same time.
+        """
+        if self._output_column is None:
+            (columns, mask) = packed_columns(self.operands)
+            self._output_column = self.evaluator.evaluate_columns(columns, mask)
+        return self._output_column
+
+    @property
+    def canonical_form(self) -> str:
+        """Return a string identifying this function up to the names of its operands.
+
+        Operands are renamed by their position in self.operands, so functions which differ only in
+        pin names (such as the drive strength variants of a cell) share a canonical form, and
+        therefore the same packed test vectors.
+        """
+        operands = self.operands
+        state = operands.index(self.state) if self.state else ''
+        controls = [f'{role}{operands.index(pin.name)}{"n" if pin.is_inverted() else ""}'
+                    for (role, pin) in [('c', self.clock), ('e', self.enable),
+                                        ('p', self.preset), ('r', self.clear)] if pin]
+        return f'{len(operands)}:{self.output_column:x}:{state}:{",".join(controls)}'
+
     def truth_table(self) -> list:
         """Return a truth table for this function.
 
@@ -77,10 +113,12 @@ class Function:
         pin. For example, a 1 on the input pin of an inverter implies a static high voltage,
         whereas a 1 on the clock pin of a DFF implies a positive clock edge."""
         table = []
-        length = len(self.operands)
+        operands = self.operands
+        length = len(operands)
+        output = self.output_column
         for n in range(2**length):
-            result = dict(zip(self.operands, [int(c) for c in f'{n:0{length}b}']))
-            result[self.output_key] = self.eval(**result)
+            result = dict(zip(operands, [int(c) for c in f'{n:0{length}b}']))
+            result[self.output_key] = (output >> n) & 1
             table.append(result)
         return table
 
@@ -105,67 +143,153 @@ class Function:
         Each test vector consists of a dictionary with pin names for keys and pin states for
         values.
 
-        Test vectors are generated by comparing each row in the truth table to subsequent rows. Any
-        pair of rows for which the output differs and only a single input pin differs can be used
-        to build a candidate test vector. An additional validation step takes place for cells with
-        state: candidates whose initial state does not match the stored internal state are
-        discarded, as are any candidates which simultaneously assert both set and reset.
+        Test vectors are pairs of truth table rows for which the output differs and only a single
+        input pin differs. An additional validation step takes place for cells with state:
+        candidates whose initial state does not match the stored internal state are discarded, as
+        are any candidates which simultaneously assert both set and reset.
 
         Downstream consumers of test vectors must interpret them based on pin trigger types. Level-
         triggered pins are interpreted as 0 = low voltage, 1 = high voltage. Edge-triggered pin
         states should be interpreted as 0 = fall, 1 = rise.
 
-        Because test vector generation is a relatively slow process, test vectors are cached and
-        reused after being generated the first time. To regenerate test vectors, clear the
-        _cached_test_vectors list attribute.
+        Test vectors are stored in the compact form returned by packed_test_vectors, and expanded
+        into dictionaries each time this property is accessed.
         """
-        # If assigned and not empty, use stored
-        if self._cached_test_vectors:
-            return self._cached_test_vectors
+        operands = self.operands
+        length = len(operands)
+        output = self.output_column
+        pin_mask = (1 << PIN_BITS) - 1
+        test_vectors = []
+        for code in self.packed_test_vectors:
+            (start, pin) = (code >> PIN_BITS, code & pin_mask)
+            end = start ^ (1 << (length - 1 - pin))
+            vector = {operand: str((start >> (length - 1 - i)) & 1)
+                      for (i, operand) in enumerate(operands)}
+            vector[operands[pin]] += str((end >> (length - 1 - pin)) & 1)
+            vector[self.output_key] = f'{(output >> start) & 1}{(output >> end) & 1}'
+            test_vectors.append(vector)
+        return test_vectors
+
+    @property
+    def packed_test_vectors(self) -> array:
+        """Return this function's test vectors in compact form.
+
+        Each test vector is packed into an integer as (start_row << PIN_BITS) | pin, where
+        start_row is the truth table row before the transition and pin is the index (in
+        self.operands) of the input which changes. The row after the transition is start_row with
+        that input's bit flipped.
 
-        # Otherwise generate new test vector candidates
+        Test vectors are found using the Boolean difference: XORing the output column with a copy
+        of itself shifted by one input's row stride marks every pair of rows, differing only in
+        that input, whose outputs differ. Because test vector generation is a relatively slow
+        process, the result is cached and reused after being generated the first time.
+        """
+        if self._packed_test_vectors is not None:
+            return self._packed_test_vectors
+
+        operands = self.operands
+        length = len(operands)
+        if length >= 1 << PIN_BITS:
+            raise ValueError(f'Functions with more than {(1 << PIN_BITS) - 1} operands are not '
+                             f'supported')
+        (columns, mask) = packed_columns(operands)
+        output = self.output_column
+
+        # Find (low_row, pin) pairs where flipping pin from 0 to 1 changes the output
+        pairs = []
+        for (pin, operand) in enumerate(operands):
+            stride = 1 << (length - 1 - pin)
+            difference = (output ^ (output >> stride)) & (mask ^ columns[operand])
+            while difference:
+                low_bit = difference & -difference
+                pairs.append((low_bit.bit_length() - 1, stride, pin))
+                difference ^= low_bit
+
+        # Add both the test vector and its reverse, in truth table order
         candidates = []
-        table = self.truth_table()
-        while table:
-            top_row = table.pop(0) # Get top row of table
-            # Compare to each later row with a differing output
-            for compared_row in [cr for cr in table if not cr[self.output_key] == top_row[self.output_key]]:
-                # Check if input differs by only one pin
-                deltas = {}
-                for pin in top_row.keys():
-                    if top_row[pin] == compared_row[pin]:
-                        deltas[pin] = str(top_row[pin])
-                    else:
-                        deltas[pin] = f'{top_row[pin]}{compared_row[pin]}'
-                if len(''.join(deltas.values())) == len(top_row) + 2:
-                    # Add both the test vector and its reverse
-                    candidates.append(deltas)
-                    candidates.append({pin: state[::-1] for pin, state in deltas.items()})
+        for (row, stride, pin) in sorted(pairs):
+            candidates.append(row << PIN_BITS | pin)
+            candidates.append((row | stride) << PIN_BITS | pin)
 
         # Validate test vector candidates based on state & triggers
         if self.state:
+            state_pin = operands.index(self.state)
+            trigger_pins = [(operands.index(p.name), p.is_inverted())
+                            for p in [self.clock, self.enable, self.preset, self.clear]
+                            if p is not None]
+            def bit(code, pin):
+                return (code >> (PIN_BITS + length - 1 - pin)) & 1
+            def is_asserted(code, pin, inverted):
+                # Transitioning pins are always asserted at some point
+                return code & ((1 << PIN_BITS) - 1) == pin or bit(code, pin) != inverted
             # Filter test vectors where internal state does not match output initial state
-            # Note that this also (conveniently) filters any cases where len(state) > 1
-            candidates = [c for c in candidates if c[self.state] == c[self.output_key][0]]
+            # Note that this also (conveniently) filters any cases where the state transitions
+            candidates = [c for c in candidates if c & ((1 << PIN_BITS) - 1) != state_pin
+                          and bit(c, state_pin) == (output >> (c >> PIN_BITS)) & 1]
             # Filter test vectors where no control pin (clk, enable, set, reset) is triggered
-            candidates = [c for c in candidates if self._validate_triggers(c)]
+            candidates = [c for c in candidates
+                          if any(is_asserted(c, pin, inverted) for (pin, inverted) in trigger_pins)]
             if self.preset and self.clear:
                 # Filter test vectors where set and reset contend
-                active_set = lambda tv: self.preset.is_asserted(tv[self.preset.name])
-                active_reset = lambda tv: self.clear.is_asserted(tv[self.clear.name])
-                candidates = [c for c in candidates if not (active_set(c) and active_reset(c))]
+                preset = (operands.index(self.preset.name), self.preset.is_inverted())
+                clear = (operands.index(self.clear.name), self.clear.is_inverted())
+                candidates = [c for c in candidates
+                              if not (is_asserted(c, *preset) and is_asserted(c, *clear))]
 
-        test_vectors = candidates
-        self._cached_test_vectors = test_vectors
-        return test_vectors
+        self._packed_test_vectors = array('Q', candidates)
+        return self._packed_test_vectors
+
+
+class FunctionCache:
+    """An on-disk store of packed test vectors, keyed by Function.canonical_form.
+
+    Entries are also memoized in memory, so each canonical function is read from disk at most once
+    per process.
+    """
+
+    MAGIC = b'CHARLIB-TV1\n'
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self._memo = {}
+
+    def _path(self, key):
+        return self.cache_dir / f'{hashlib.sha256(key.encode()).hexdigest()}.tv'
+
+    def load(self, key):
+        """Return the packed test vectors stored under key, or None if there are none."""
+        if key not in self._memo:
+            try:
+                data = self._path(key).read_bytes()
+            except OSError:
+                return None
+            header = self.MAGIC + key.encode() + b'\n'
+            if not data.startswith(header):
+                return None # Unreadable or colliding entries are treated as misses
+            vectors = array('Q')
+            vectors.frombytes(data[len(header):])
+            if sys.byteorder != 'little':
+                vectors.byteswap()
+            self._memo[key] = vectors
+        return self._memo[key]
+
+    def store(self, key, vectors):
+        """Store packed test vectors under key."""
+        self._memo[key] = vectors
+        data = array('Q', vectors)
+        if sys.byteorder != 'little':
+            data.byteswap()
+        write_atomic(self._path(key), self.MAGIC + key.encode() + b'\n' + data.tobytes())
 
-    def _validate_triggers(self, test_vector) -> bool:
-        """Check that this test vector triggers at least one of this function's trigger pins.
+    def fill(self, function):
+        """Give function its test vectors from the cache, generating and storing them on a miss.
 
-        This method returns True if at least one pin triggers.
+        Returns True on a cache hit.
         """
-        trigger_pins = [self.clock, self.enable, self.preset, self.clear]
-        for pin in [p for p in trigger_pins if p is not None]:
-            if pin.is_asserted(test_vector[pin.name]):
-                return True
+        key = function.canonical_form
+        vectors = self.load(key)
+        if vectors is not None:
+            function._packed_test_vectors = vectors
+            return True
+        self.store(key, function.packed_test_vectors)
         return False
@@ -1,9 +1,147 @@
-"""Plotting utilities for characterization results"""
+"""Plotting utilities for characterization results
+
+Plots requested in cell configurations are drawn in a separate stage once characterization is
+complete (or later, with ``charlib plot``), rather than by the simulation tasks themselves. Tasks
+save the waveforms a plot needs to a WaveformStore (see charlib.characterizer.waveforms) and return
+a PlotRequest (see charlib.characterizer.results) describing it. draw_plots then renders every
+requested plot on its own process pool using the non-interactive Agg backend. matplotlib is only
+imported once a plot is drawn.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
 import numpy as np
 
+from charlib.characterizer.waveforms import WaveformStore
+from charlib.liberty.library import LookupTable
+
+
+def wants(plots, kind: str) -> bool:
+    """Return whether a cell's plots setting (from CellTestConfig.plots) includes plots of kind.
+
+    :param plots: 'all', 'none', a single plot kind such as 'io', or a list of plot kinds.
+    :param kind: The kind of plot to check for, such as 'io' or 'delay'.
+    """
+    if isinstance(plots, str):
+        plots = [plots]
+    return 'all' in plots or kind in plots
+
+
+class IOVoltagePlot:
+    """A plot of input and output voltages from saved waveforms
+
+    :param path: The image file to write.
+    :param directory: The directory of the WaveformStore holding the waveforms.
+    :param waveforms: A dict mapping a legend label for each simulation to its waveform store key.
+    :param input_pin: The input pin to plot.
+    :param output_pin: The output pin to plot.
+    :param indicate_voltages: Key voltage values to indicate on each axis.
+    """
+
+    def __init__(self, path, directory, waveforms: dict, input_pin, output_pin,
+                 indicate_voltages=[]):
+        self.path = Path(path)
+        self.directory = Path(directory)
+        self.waveforms = waveforms
+        self.input_pin = input_pin
+        self.output_pin = output_pin
+        self.indicate_voltages = indicate_voltages
+
+    def prepare(self, library) -> list:
+        """Return the plots to draw. IO plots don't need any library data."""
+        return [self]
+
+    def draw(self):
+        import matplotlib.pyplot as plt
+        store = WaveformStore(self.directory)
+        waveforms = {label: store.load(key) for (label, key) in self.waveforms.items()}
+        figure = plot_io_voltages(waveforms.values(), [self.input_pin], [self.output_pin],
+                                  legend_labels=waveforms.keys(),
+                                  indicate_voltages=self.indicate_voltages)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        figure.savefig(self.path) # FIXME: filetype should be configurable
+        plt.close(figure)
+
+
+class DelaySurfacePlots:
+    """Delay surface plots for every timing group of a cell
+
+    :param cell: The cell name.
+    :param directory: The directory to write plots to.
+    """
+
+    def __init__(self, cell: str, directory):
+        self.cell = cell
+        self.directory = Path(directory)
+
+    def prepare(self, library) -> list:
+        """Return a DelaySurfacePlot for each timing group of this cell in library."""
+        surfaces = []
+        for pin_group in library.group('cell', self.cell).subgroups_with_name('pin'):
+            pin = pin_group.identifier
+            for timing_group in pin_group.subgroups_with_name('timing'):
+                related_pin = timing_group.attributes['related_pin'].value
+                # Copy the tables so each plot can be sent to a worker without the library
+                tables = []
+                for lut in timing_group.groups.values():
+                    table = LookupTable(lut.name, lut.template.identifier,
+                                        **dict(zip(lut.template.variables, lut.index_values)))
+                    table.values = lut.values
+                    tables.append(table)
+                surfaces.append(DelaySurfacePlot(
+                    self.directory / f'{related_pin} to {pin} delay.png', tables,
+                    title=f'Cell delays ({related_pin} to {pin})'))
+        return surfaces
+
+
+class DelaySurfacePlot:
+    """A plot of one or more lookup tables as 3D surfaces
+
+    :param path: The image file to write.
+    :param tables: A list of LookupTables sharing common index variables.
+    :param title: The plot title.
+    """
+
+    def __init__(self, path, tables, title='Cell Delays'):
+        self.path = Path(path)
+        self.tables = tables
+        self.title = title
+
+    def draw(self):
+        import matplotlib.pyplot as plt
+        figure = plot_delay_surfaces(self.tables, title=self.title)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        figure.savefig(self.path) # FIXME: filetype should be configurable
+        plt.close(figure)
+
+
+def _use_agg():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _draw(plot):
+    plot.draw()
+
+
+def draw_plots(library, requests, jobs=None, quiet=False):
+    """Draw requested plots in parallel.
+
+    :param library: The characterized library, used by plots of table data.
+    :param requests: A list of PlotRequest results.
+    :param jobs: (Optional) The number of plotting processes. Defaults to the number of CPUs.
+    :param quiet: If True, don't display a progress bar.
+    """
+    plots = [plot for request in requests for plot in request.plot.prepare(library)]
+    if not plots:
+        return
+    from tqdm import tqdm
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_use_agg) as executor:
+        for _ in tqdm(executor.map(_draw, plots), total=len(plots), desc='Plotting',
+                      disable=quiet):
+            pass
+
 
 def plot_io_voltages(analyses, input_signals, output_signals, legend_labels,
                      indicate_voltages=[], indicate_times=[], fig_label='', title='I/O Voltages'):
@@ -21,6 +159,7 @@ def plot_io_voltages(analyses, input_signals, output_signals, legend_labels,
     :param indicate_voltages: Key voltage values to be indicated as horizontal lines on each ax.
     :param indicate_times: Key time values to be indicated as vertical lines on each ax.
     """
+    import matplotlib.pyplot as plt
     signals = input_signals + output_signals
     ratios = [1]*len(input_signals) + [len(input_signals)]*len(output_signals)
     figure, axs = plt.subplots(nrows=len(signals), sharex=True, height_ratios=ratios,
@@ -47,6 +186,8 @@ def plot_delay_surfaces(lut_groups, fig_label='', title='Cell Delays'):
 
     :param lut_groups: A list of liberty.LookupTable groups containing delay data.
     """
+    import matplotlib.pyplot as plt
+    import matplotlib.colors as mcolors
     figure, ax = plt.subplots(label=fig_label, subplot_kw={'projection': '3d'})
     ax.set(
         xlabel=list(lut_groups[0].template.variables.keys())[0],
@@ -72,6 +213,7 @@ def plot_contour(settings, points, min_setup, max_hold, max_setup, min_hold,
     """
     if debug_path is None:
         return
+    import matplotlib.pyplot as plt
     debug_path.mkdir(parents=True, exist_ok=True)
 
     t_unit = settings.units.time.prefixed_unit
@@ -1,4 +1,46 @@
-registered_procedures = {}
+import importlib
+
+# Built-in procedures, with the module (relative to this package) which defines each. Modules are
+# only imported once one of their procedures is looked up, so that importing the characterizer
+# doesn't pull in every procedure and its dependencies.
+BUILTIN_PROCEDURES = {
+    'ac_sweep': 'pin_capacitance.ac_sweep',
+    'charge_integration': 'pin_capacitance.charge_integration',
+    'combinational_worst_case': 'combinational.delay',
+    'combinational_average': 'combinational.delay',
+    'combinational_leakage': 'combinational.leakage_power',
+    'sequential_worst_case': 'sequential.delay',
+    'metastability_binary_search_worst_case': 'sequential.constraint.metastability.binary_search',
+    'measure_setup_hold_from_contour': 'sequential.constraint.metastability.c2q_contour',
+    'recovery_constraint': 'sequential.constraint.recovery',
+    'removal_constraint': 'sequential.constraint.removal',
+    'min_pulse_width_constraint': 'sequential.constraint.min_pulse_width',
+}
+
+class ProcedureRegistry(dict):
+    """Registered procedures by name, importing built-in procedure modules on first lookup.
+
+    Each entry is a dict with the procedure 'callable' and the 'parameters' it accepts. Procedures
+    defined elsewhere are added by importing their module, which registers them with @register.
+    """
+
+    def __missing__(self, name):
+        if name not in BUILTIN_PROCEDURES:
+            raise KeyError(f'Unknown procedure "{name}"')
+        importlib.import_module(f'{__name__}.{BUILTIN_PROCEDURES[name]}')
+        return dict.__getitem__(self, name)
+
+registered_procedures = ProcedureRegistry()
+
+def supported_parameters() -> set:
+    """Return the names of all test parameters accepted by any registered procedure.
+
+    Built-in procedures are registered once their module is imported, which happens when settings
+    select them (see SimulationSettings). Parameters only used by procedures that no settings have
+    selected are not included, so unused procedure modules are never imported.
+    """
+    return {parameter for procedure in registered_procedures.values()
+            for parameter in procedure['parameters']}
 
 def register(*parameters):
     """
@@ -25,6 +67,24 @@ def register(*parameters):
         return procedure
     return decorator_with_args
 
+def estimated_cost(cost):
+    """
+    Decorator to declare the expected relative cost of a characterization task.
+
+    Cost is expressed in approximate simulations per task, and is used to submit the most expensive
+    tasks first. The argument may be a number or a callable which receives the same arguments as
+    the task and returns a number. Tasks without an estimate are assumed to cost 1.
+    """
+    def decorator(task):
+        task.estimated_cost = cost
+        return task
+    return decorator
+
+def static_cost(task, *args) -> float:
+    """Return the declared cost estimate for running task with the given arguments."""
+    cost = getattr(task, 'estimated_cost', 1)
+    return cost(*args) if callable(cost) else cost
+
 class ProcedureFailedException(Exception):
     """Indicates that the procedure failed for the reason specified in the message."""
     pass
@@ -1,33 +1,40 @@
 import PySpice
-import matplotlib.pyplot as plt
 from numpy import average
 
-from charlib.characterizer import utils, plots
+from charlib.characterizer import backend, utils, plots
 from charlib.characterizer.cell import Port
-from charlib.characterizer.procedures import register, ProcedureFailedException
-from charlib.liberty import liberty
-from charlib.liberty.library import LookupTable
+from charlib.characterizer.procedures import register, estimated_cost, ProcedureFailedException
+from charlib.characterizer.results import PlotRequest, TableMeasurements
+from charlib.characterizer.waveforms import WaveformStore
 
 @register('data_slews', 'loads', 'transient_sim_end_time')
 def combinational_worst_case(cell, config, settings):
     """Measure worst-case combinational transient and propagation delays"""
     for variation in config.variations('data_slews', 'loads', 'transient_sim_end_time'):
-        for path in cell.paths():
-            yield (measure_delays_for_path_with_criterion, cell, config, settings, variation, path, max)
+        for (input_pin, input_transition) in cell.input_transitions():
+            yield (measure_delays_for_input_with_criterion, cell, config, settings, variation,
+                   input_pin, input_transition, max)
 
 @register('data_slews', 'loads', 'transient_sim_end_time')
 def combinational_average(cell, config, settings):
     """Measure combinational transient and propagation delays using a uniform average"""
     for variation in config.variations('data_slews', 'loads', 'transient_sim_end_time'):
-        for path in cell.paths():
-            yield (measure_delays_for_path_with_criterion, cell, config, settings, variation, path, average)
+        for (input_pin, input_transition) in cell.input_transitions():
+            yield (measure_delays_for_input_with_criterion, cell, config, settings, variation,
+                   input_pin, input_transition, average)
 
-def measure_delays_for_path_with_criterion(cell, config, settings, variation, path, criterion=max):
-    """Given a particular path through the cell, find delays according to a selection criterion.
+@estimated_cost(lambda cell, config, settings, variation, input_pin, input_transition, *args:
+                len(cell.conditions_for_input(input_pin, input_transition)))
+def measure_delays_for_input_with_criterion(cell, config, settings, variation, input_pin,
+                                            input_transition, criterion=max):
+    """Given a transition on an input pin, find delays to each output according to a criterion.
 
-    This method tests all nonmasking conditions for the path through the cell from target_input to
-    target_output with the given slew rate and capacitive load, then assigns the delay selected
-    using the passed criterion function. Returns a liberty cell group with the delay information.
+    This method tests all nonmasking conditions for every path through the cell starting with
+    input_pin undergoing input_transition, with the given slew rate and capacitive load. Paths to
+    different outputs which share a nonmasking condition are measured in the same simulation.
+    For each path, it then assigns the delay selected using the passed criterion function from
+    the conditions that exercise that path. Returns a list of TableEntry results with the delay
+    information.
 
     The default criterion selects the worst-case (i.e. maximum) delay. This is in theory an overly
     pessimistic method of delay estimation. A more accurate method would be to perform a weighted
@@ -41,26 +48,31 @@ def measure_delays_for_path_with_criterion(cell, config, settings, variation, pa
                      details.
     :param variation: A dict containing test parameters for this configuration variation, such
                       as slew rates and loads.
-    :param path: A list in the format [input_pin, input_transition, output_pin,
-                 output_transtition] describing the path under test in the cell.
+    :param input_pin: The name of the input pin under test.
+    :param input_transition: The transition applied to input_pin. Must be '01' or '10'.
     :param criterion: A function which returns a single value given a list of numeric values.
                       Default max.
     """
     # Set up key parameters
-    [input_pin, _, output_pin, _] = path
     data_slew = variation['data_slews'] * settings.units.time
     load = variation['loads'] * settings.units.capacitance
     t_sim_end = max(variation['transient_sim_end_time'] * settings.units.time, 1000*data_slew)
     vdd = settings.primary_power.voltage * settings.units.voltage
     vss = settings.primary_ground.voltage * settings.units.voltage
 
-    # Measure delays for all nonmasking conditions
-    analyses = {}
-    measurement_names = set()
-    for state_map in cell.nonmasking_conditions_for_path(*path):
+    # Measure delays for all nonmasking conditions, simulating each distinct input state once.
+    # Only measurements (and, if needed, saved waveforms) are kept from each simulation.
+    waveform_store = WaveformStore(settings.waveforms_dir) \
+        if plots.wants(config.plots, 'io') or settings.keep_waveforms else None
+    state_measurements = {}
+    waveform_keys = {} # stable pin states -> waveform store key
+    measurement_names = {} # measurement name -> output pin
+    for (input_states, output_transitions) in cell.conditions_for_input(input_pin,
+                                                                        input_transition).items():
+        state_map = {**dict(input_states), **output_transitions}
         # Build the test circuit
         circuit = utils.init_circuit('comb_delay', cell.netlist, config.models,
-                                     settings.named_nodes, settings.units)
+                                     settings.named_nodes, settings.units, settings.models_dir)
 
         # Initialize device under test and wire up pins
         pin_map = utils.PinStateMap(cell.inputs, cell.outputs, state_map)
@@ -99,13 +111,13 @@ def measure_delays_for_path_with_criterion(cell, config, settings, variation, pa
                                 threshold_tran_0 = settings.logic_thresholds.high
                                 threshold_tran_1 = settings.logic_thresholds.low
                             prop_name = f'cell_{out_direction}__{in_pin}_to_{pin.name}'.lower()
-                            measurement_names.add(prop_name)
+                            measurement_names[prop_name] = pin.name
                             measurements.append((
                                 'tran', prop_name,
                                 f'trig v(v{in_pin}) val={float(vdd*threshold_prop_0)} {in_direction}=1',
                                 f'targ v(v{pin.name}) val={float(vdd*threshold_prop_1)} {out_direction}=1'))
                             tran_name = f'{out_direction}_transition__{in_pin}_to_{pin.name}'.lower()
-                            measurement_names.add(tran_name)
+                            measurement_names[tran_name] = pin.name
                             measurements.append((
                                 'tran', tran_name,
                                 f'trig v(v{pin.name}) val={float(vdd*threshold_tran_0)} {out_direction}=1',
@@ -144,10 +156,11 @@ def measure_delays_for_path_with_criterion(cell, config, settings, variation, pa
         simulation.transient(step_time=data_slew/8, end_time=t_sim_end, run=False)
 
         stable_pins_map_str = ', '.join(['='.join([pin, state]) for pin, state in pin_map.stable_inputs.items()])
+        key = backend.simulation_key(simulation, settings)
         try:
-            analyses[stable_pins_map_str] = simulator.run(simulation)
+            analysis = backend.run(simulator, simulation, settings, key)
         except Exception as e:
-            msg = f'Procedure measure_worst_case_delay_for_path failed for cell {cell.name} ' \
+            msg = f'Procedure measure_delays_for_input_with_criterion failed for cell {cell.name} ' \
                   f'with variation {variation}, pin states {state_map}'
             if settings.debug:
                 debug_path = settings.debug_dir / cell.name / __name__.split('.')[-1]
@@ -155,37 +168,44 @@ def measure_delays_for_path_with_criterion(cell, config, settings, variation, pa
                 with open(debug_path / f'slew = {data_slew} load = {load}.sp', 'w', encoding='utf-8') as file:
                     file.write(str(simulation))
             raise ProcedureFailedException(msg) from e
+        state_measurements[stable_pins_map_str] = dict(analysis.measurements)
+        if waveform_store:
+            waveform_store.save(key, analysis, [f'v{input_pin}', *(f'v{pin}' for pin in
+                                                                   pin_map.target_outputs)])
+            waveform_keys[stable_pins_map_str] = key
 
-    # Select the worst-case delays and add to LUTs
-    result = cell.liberty
-    result.group('pin', output_pin).add_group('timing', f'/* {input_pin} */') # FIXME: This is a \
-    # hack to allow multiple timing groups while the liberty API doesn't yet support multiple
-    # groups with the same name and no id. In practice timing groups are distinguished by
-    # their related_pin attribute.
-    result.group('pin', output_pin).group('timing', f'/* {input_pin} */').add_attribute('related_pin', input_pin) # FIXME
-    for name in measurement_names:
-        # Get the worst delay & plot io
-        if 'io' in config.plots:
-            fig = plots.plot_io_voltages(analyses.values(), list(pin_map.target_inputs.keys()),
-                                         list(pin_map.target_outputs.keys()),
-                                         legend_labels=analyses.keys(),
-                                         indicate_voltages=[settings.primary_power.voltage*settings.logic_thresholds.low,
-                                                            settings.primary_power.voltage*settings.logic_thresholds.high])
-            # FIXME: let user decide whether to show or save
-            fig_path = settings.plots_dir / cell.name / 'io'
-            fig_path.mkdir(parents=True, exist_ok=True)
-            fig.savefig(fig_path / f'{name} with slew = {data_slew} load = {load}.png') # FIXME: filetype should be configurable
-            plt.close(fig)
+    # Select the worst-case delays and record LUT entries
+    result = []
+    c_unit = settings.units.capacitance
+    t_unit = settings.units.time
+    axes = {
+        'total_output_net_capacitance': [(value * c_unit).convert(c_unit.prefixed_unit).value
+                                         for value in config.parameters['loads']],
+        'input_net_transition': [(value * t_unit).convert(t_unit.prefixed_unit).value
+                                 for value in config.parameters['data_slews']],
+    }
+    for (name, output_pin) in measurement_names.items():
+        if plots.wants(config.plots, 'io'):
+            result.append(PlotRequest(cell.name, plots.IOVoltagePlot(
+                settings.plots_dir / cell.name / 'io' / f'{name} with slew = {data_slew} load = {load}.png',
+                settings.waveforms_dir, waveform_keys, input_pin, output_pin,
+                indicate_voltages=[settings.primary_power.voltage*settings.logic_thresholds.low,
+                                   settings.primary_power.voltage*settings.logic_thresholds.high])))
 
-        # Build LUT
-        delay_measurements =[analysis.measurements[name] for analysis in analyses.values() if name in analysis.measurements]
-        delay = criterion(delay_measurements) @ PySpice.Unit.u_s
+        # Build LUT, keeping each measurement so the table can be re-reduced later
+        samples = {state: (values[name] @ PySpice.Unit.u_s).convert(t_unit.prefixed_unit).value
+                   for (state, values) in state_measurements.items() if name in values}
         lut_name, meas_path = name.split('__')
         lut_template_size = f'{len(config.parameters["loads"])}x{len(config.parameters["data_slews"])}'
-        lut = LookupTable(lut_name, f'delay_template_{lut_template_size}',
-                          total_output_net_capacitance=[load.convert(settings.units.capacitance.prefixed_unit).value],
-                          input_net_transition=[data_slew.convert(settings.units.time.prefixed_unit).value])
-        lut.values[0,0] = delay.convert(settings.units.time.prefixed_unit).value
-        result.group('pin', output_pin).group('timing', f'/* {input_pin} */').add_group(lut) # FIXME
+        index = {
+            'total_output_net_capacitance': load.convert(settings.units.capacitance.prefixed_unit).value,
+            'input_net_transition': data_slew.convert(settings.units.time.prefixed_unit).value,
+        }
+        # FIXME: Timing groups are identified by related pin as a hack while the liberty API
+        # doesn't yet support multiple groups with the same name and no id.
+        result.append(TableMeasurements(cell.name, output_pin, f'/* {input_pin} */',
+                                        {'related_pin': input_pin}, lut_name,
+                                        f'delay_template_{lut_template_size}', index, samples,
+                                        criterion, axes))
 
     return result
@@ -1,10 +1,10 @@
 import itertools
 import PySpice
 
-from charlib.characterizer import utils
+from charlib.characterizer import backend, utils
 from charlib.characterizer.cell import Port
 from charlib.characterizer.procedures import register, ProcedureFailedException
-from charlib.liberty import liberty
+from charlib.characterizer.results import CellSubgroup
 
 
 @register
@@ -26,7 +26,7 @@ def build_when_str(state_map):
 
 
 def measure_leakage_for_state(cell, config, settings, state_map):
-    """Run one DC operating point and write one leakage_power group to cell.liberty.
+    """Run one DC operating point and return one leakage_power group result.
 
     :param cell: Cell object under test.
     :param config: CellTestConfig with model paths and cell-specific config.
@@ -34,7 +34,8 @@ def measure_leakage_for_state(cell, config, settings, state_map):
     :param state_map: dict mapping each logic input name to '0' or '1'.
     """
     circuit = utils.init_circuit(
-        'leakage', cell.netlist, config.models, settings.named_nodes, settings.units
+        'leakage', cell.netlist, config.models, settings.named_nodes, settings.units,
+        settings.models_dir
     )
 
     connections = []
@@ -68,7 +69,7 @@ def measure_leakage_for_state(cell, config, settings, state_map):
     simulation.operating_point()
 
     try:
-        analysis = simulator.run(simulation)
+        analysis = backend.run(simulator, simulation, settings)
     except Exception as e:
         msg = (f'Procedure measure_leakage_for_state failed for cell {cell.name} '
                f'with state {state_map}')
@@ -89,9 +90,5 @@ def measure_leakage_for_state(cell, config, settings, state_map):
     when_str = build_when_str(state_map)
 
     # Use when_str as identifier so multiple leakage_power groups in the same cell don't collide
-    result = cell.liberty
-    lp_group = liberty.Group('leakage_power', f'/* {when_str} */')
-    lp_group.add_attribute('when', when_str)
-    lp_group.add_attribute('value', power_value)
-    result.add_group(lp_group)
-    return result
+    return [CellSubgroup(cell.name, 'leakage_power', f'/* {when_str} */',
+                         when=when_str, value=power_value)]
@@ -2,14 +2,14 @@ import numpy as np
 import PySpice
 from PySpice.Unit import *
 
-from charlib.characterizer import utils
+from charlib.characterizer import backend, utils
 from charlib.characterizer.cell import Port
 from charlib.characterizer.procedures import register
-from charlib.liberty import liberty
+from charlib.characterizer.results import PinAttribute
 
 @register
 def ac_sweep(cell, config, settings):
-    """Measure input capacitance for each input pin using ac sweep and return a liberty cell group"""
+    """Measure input capacitance for each input pin using ac sweep and return pin attribute results"""
     # Yield simulation tasks for measuring capacitance of each pin
     roles=['logic', 'clock', 'set', 'reset', 'enable']
     for target_pin in cell.filter_pins(direction=['input'], role=roles):
@@ -21,10 +21,8 @@ def measure_pin_cap_by_ac_sweep(cell, settings, config, target_pin):
     Treat the cell as a grounded capacitor with fixed capacitance. Perform an ac sweep with fixed
     current amplitude, then evaluate capacitance as d/ds(i(s)/v(s))
 
-    Returns a liberty cell group with the capacitance included on the appropriate pin.
+    Returns a PinAttribute result with the capacitance of the target pin.
     """
-    result = cell.liberty
-
     vdd = settings.primary_power.voltage * settings.units.voltage
     vss = settings.primary_ground.voltage * settings.units.voltage
 
@@ -39,7 +37,7 @@ def measure_pin_cap_by_ac_sweep(cell, settings, config, target_pin):
     # Initialize circuit
     circuit_name = f'cell-{cell.name}-pin-{target_pin}-cap'
     circuit = utils.init_circuit(circuit_name, cell.netlist, config.models,
-                                 settings.named_nodes, settings.units)
+                                 settings.named_nodes, settings.units, settings.models_dir)
     circuit.I('in', circuit.gnd, 'vin', f'DC 0 AC {PySpice.Spice.unit.str_spice(i_in)}')
     circuit.R('in', circuit.gnd, 'vin', r_in)
 
@@ -78,12 +76,9 @@ def measure_pin_cap_by_ac_sweep(cell, settings, config, target_pin):
             spice_file.write(str(simulation))
 
     # Measure capacitance as the slope of the conductance with respect to frequency
-    analysis = simulator.run(simulation)
-    conductance = np.reciprocal(np.abs(analysis.vin)/i_in)
+    analysis = backend.run(simulator, simulation, settings)
+    conductance = np.reciprocal(np.abs(analysis.vin)/float(i_in))
     [*_, capacitance] = np.polynomial.polynomial.polyfit(analysis.frequency, conductance, 1)
 
-    # Add to the liberty group
     converted_cap = (capacitance @ u_F).convert(settings.units.capacitance.prefixed_unit).value
-    result.group('pin', target_pin).add_attribute('capacitance', converted_cap)
-
-    return result
+    return [PinAttribute(cell.name, target_pin, 'capacitance', converted_cap)]
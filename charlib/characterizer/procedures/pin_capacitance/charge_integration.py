@@ -3,14 +3,15 @@ import math
 import PySpice
 from PySpice.Unit import *
 
-from charlib.characterizer import utils
+from charlib.characterizer import backend, utils
 from charlib.characterizer.cell import Port
 from charlib.characterizer.procedures import register, ProcedureFailedException
+from charlib.characterizer.results import PinAttribute
 
 
 @register('data_slews', 'charge_integration_t_slew', 'charge_integration_t_wait')
 def charge_integration(cell, config, settings):
-    """Measure input capacitance for each input pin using charge integration and return a liberty cell group"""
+    """Measure input capacitance for each input pin using charge integration and return pin attribute results"""
     roles = ['logic', 'clock', 'set', 'reset', 'enable']
     for target_pin in cell.filter_pins(direction=['input'], role=roles):
         yield (measure_pin_cap_by_charge_integration, cell, settings, config, target_pin.name)
@@ -24,10 +25,8 @@ def measure_pin_cap_by_charge_integration(cell, settings, config, target_pin):
     All other pins are isolated with a large R and small C to ground, matching the AC
     sweep topology.
 
-    Returns a liberty cell group with the capacitance set on the appropriate pin.
+    Returns PinAttribute results with the capacitances of the target pin.
     """
-    result = cell.liberty
-
     vdd = settings.primary_power.voltage * settings.units.voltage
     vss = settings.primary_ground.voltage * settings.units.voltage
 
@@ -55,7 +54,7 @@ def measure_pin_cap_by_charge_integration(cell, settings, config, target_pin):
     # Initialize circuit
     circuit_name = f'cell-{cell.name}-pin-{target_pin}-cap'
     circuit = utils.init_circuit(circuit_name, cell.netlist, config.models,
-                                 settings.named_nodes, settings.units)
+                                 settings.named_nodes, settings.units, settings.models_dir)
 
     # PWL stimulus: flat at VSS, ramp to VDD, flat at VDD, ramp back to VSS
     circuit.PieceWiseLinearVoltageSource('stim', 'vin', circuit.gnd, values=[
@@ -117,7 +116,7 @@ def measure_pin_cap_by_charge_integration(cell, settings, config, target_pin):
             spice_file.write(str(simulation))
 
     try:
-        analysis = simulator.run(simulation)
+        analysis = backend.run(simulator, simulation, settings)
     except Exception as e:
         msg = (f'Procedure measure_pin_cap_by_charge_integration failed for cell {cell.name}, '
                f'pin {target_pin}')
@@ -126,7 +125,7 @@ def measure_pin_cap_by_charge_integration(cell, settings, config, target_pin):
     q_rise = analysis.measurements.get('q_rise', float('nan'))
     q_fall = analysis.measurements.get('q_fall', float('nan'))
     if math.isnan(q_rise) or math.isnan(q_fall):
-        return result
+        return []
 
     # C = |Q| / VDD per edge; capacitance is the worst-case
     vdd_v = settings.primary_power.voltage
@@ -137,9 +136,8 @@ def measure_pin_cap_by_charge_integration(cell, settings, config, target_pin):
     def to_lib(cap_F):
         return (cap_F @ u_F).convert(settings.units.capacitance.prefixed_unit).value
 
-    pin_group = result.group('pin', target_pin)
-    pin_group.add_attribute('rise_capacitance', to_lib(rise_cap_F))
-    pin_group.add_attribute('fall_capacitance', to_lib(fall_cap_F))
-    pin_group.add_attribute('capacitance',      to_lib(worst_cap_F))
-
-    return result
+    return [
+        PinAttribute(cell.name, target_pin, 'rise_capacitance', to_lib(rise_cap_F)),
+        PinAttribute(cell.name, target_pin, 'fall_capacitance', to_lib(fall_cap_F)),
+        PinAttribute(cell.name, target_pin, 'capacitance',      to_lib(worst_cap_F)),
+    ]
@@ -1,7 +1,7 @@
 import PySpice
 
 from charlib.characterizer import utils
-from charlib.characterizer.procedures import register, ProcedureFailedException
+from charlib.characterizer.procedures import register, estimated_cost, ProcedureFailedException
 from charlib.liberty import liberty
 from charlib.liberty.library import LookupTable
 
@@ -12,6 +12,7 @@ def metastability_binary_search_worst_case(cell, config, settings):
         for path in cell.paths():
             yield (worst_case_setup_hold_constraint, cell, config, settings, variation, path)
 
+@estimated_cost(0)
 def worst_case_setup_hold_constraint(cell, config, settings, variation, path):
     """Given a particular path through the cell, find the worst-case minimum setup & hold time.
 
@@ -38,4 +39,4 @@ def worst_case_setup_hold_constraint(cell, config, settings, variation, path):
     # Compute minimum setup & hold constraint for all nonmasking conditions
     # TODO: implement binary search for minimum setup/hold
 
-    return cell.liberty # TODO
+    return [] # TODO
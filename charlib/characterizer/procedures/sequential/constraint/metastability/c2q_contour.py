@@ -2,9 +2,10 @@ import PySpice
 import numpy as np
 import math
 
-from charlib.characterizer.procedures import register, ProcedureFailedException
-from charlib.characterizer import utils, plots
-from charlib.liberty.library import LookupTable
+from charlib.characterizer.procedures import register, estimated_cost, ProcedureFailedException
+from charlib.characterizer import backend, utils, plots
+from charlib.characterizer.results import TableEntry
+from charlib.characterizer.waveforms import WaveformStore
 
 @register(
     'data_slews',
@@ -24,11 +25,9 @@ def measure_setup_hold_from_contour(cell, config, settings):
             'metastability_constraint_load',
             'metastability_constraint_sweep_samples'):
         for path in cell.paths():
-            # cell.nonmasking_conditions_for_path filter out the impossible paths
+            # cell.paths only yields possible paths
             # ex. non-inverting FF with D, Q, and CLK. it'll never have D_01 -> Q_10
             state_maps = list(cell.nonmasking_conditions_for_path(*path))
-            if not state_maps:
-                continue
             yield (find_setup_hold_for_path, cell, config, settings, variation, path, state_maps)
 
 def make_log_header(cell_name, ds, cs, path_str, constants):
@@ -63,6 +62,24 @@ def write_step_log(debug_path, step_label, cell_name, ds, cs, path_str, state_st
         ]
     )
 
+# Number of doublings assumed for each find_min_valid search to bracket its threshold. The true
+# number depends on the stabilizing time, which isn't known until simulation.
+ASSUMED_SEARCH_EXPANSIONS = 10
+
+def estimate_simulations(cell, config, settings, variation, path, state_maps):
+    """Return a worst-case estimate of the number of simulations find_setup_hold_for_path runs.
+
+    For each state there is one simulation to measure stabilizing time, two reference c2q
+    simulations, four find_min_valid searches, and a sweep over at most n_samples^2 points.
+    """
+    step = variation['metastability_constraint_search_timestep']
+    tolerance = variation['metastability_constraint_search_tolerance']
+    n_samples = variation['metastability_constraint_sweep_samples']
+    bisections = max(math.ceil(math.log2(step * 2**(ASSUMED_SEARCH_EXPANSIONS-1) / tolerance)), 0)
+    per_search = ASSUMED_SEARCH_EXPANSIONS + bisections
+    return len(state_maps) * (3 + 4*per_search + n_samples**2)
+
+@estimated_cost(estimate_simulations)
 def find_setup_hold_for_path(cell, config, settings, variation, path, state_maps):
     """Find setup and hold time using an approach from https://ieeexplore.ieee.org/document/4167994, which is exploits
     the interdependence between setup time, hold time.
@@ -289,42 +306,35 @@ def find_setup_hold_for_path(cell, config, settings, variation, path, state_maps
             ]
         )
 
-    # Build liberty output
-    result = cell.liberty
+    # Build liberty results
     clock_pin = cell.clock
     n_ds = len(config.parameters['data_slews'])
     n_cs  = len(config.parameters['clock_slews'])
-    lut_template_size = f'{len(config.parameters["clock_slews"])}x{len(config.parameters["data_slews"])}'
+    edge = 'falling' if clock_pin.is_inverted() else 'rising'
+    index = {
+        'related_pin_transition': cs.convert(settings.units.time.prefixed_unit).value,
+        'constraint_pin_transition': ds.convert(settings.units.time.prefixed_unit).value,
+    }
+    axes = {
+        'related_pin_transition': [to_t(value * settings.units.time)
+                                   for value in config.parameters['clock_slews']],
+        'constraint_pin_transition': [to_t(value * settings.units.time)
+                                      for value in config.parameters['data_slews']],
+    }
 
-    # Setup timing group
-    result.group('pin', data_pin).add_group('timing', "/* setup */")
-    stg = result.group('pin', data_pin).group('timing', "/* setup */")
-    stg.add_attribute('related_pin', clock_pin.name)
-    stg.add_attribute('timing_type', 'setup_falling' if clock_pin.is_inverted() else 'setup_rising')
-
-    # Hold timing group
-    result.group('pin', data_pin).add_group('timing', "/* hold */")
-    htg = result.group('pin', data_pin).group('timing', "/* hold */")
-    htg.add_attribute('related_pin', clock_pin.name)
-    htg.add_attribute('timing_type', 'hold_falling' if clock_pin.is_inverted() else 'hold_rising')
-
-    # add lut to timing group
     # rise_constraint when D rises (01), fall_constraint when D falls (10)
     cname = 'rise_constraint' if data_transition == '01' else 'fall_constraint'
 
-    setup_lut = LookupTable(cname, f'setup_template_{n_cs}x{n_ds}',
-                            related_pin_transition=[cs.convert(settings.units.time.prefixed_unit).value],
-                            constraint_pin_transition=[ds.convert(settings.units.time.prefixed_unit).value])
-    setup_lut.values[0, 0] = worst_setup.convert(settings.units.time.prefixed_unit).value
-    stg.add_group(setup_lut)
-
-    hold_lut = LookupTable(cname, f'hold_template_{n_cs}x{n_ds}',
-                           related_pin_transition=[cs.convert(settings.units.time.prefixed_unit).value],
-                           constraint_pin_transition=[ds.convert(settings.units.time.prefixed_unit).value])
-    hold_lut.values[0, 0] = worst_hold.convert(settings.units.time.prefixed_unit).value
-    htg.add_group(hold_lut)
-
-    return result
+    return [
+        TableEntry(cell.name, data_pin, '/* setup */',
+                   {'related_pin': clock_pin.name, 'timing_type': f'setup_{edge}'},
+                   cname, f'setup_template_{n_cs}x{n_ds}', index,
+                   worst_setup.convert(settings.units.time.prefixed_unit).value, axes),
+        TableEntry(cell.name, data_pin, '/* hold */',
+                   {'related_pin': clock_pin.name, 'timing_type': f'hold_{edge}'},
+                   cname, f'hold_template_{n_cs}x{n_ds}', index,
+                   worst_hold.convert(settings.units.time.prefixed_unit).value, axes),
+    ]
 
 
 def sweep_2d_space_for_contour(probe_fn, setup_min, setup_max, hold_min, hold_max, c2q_threshold=math.inf, n_samples=40):
@@ -495,7 +505,8 @@ def sim_latch(cell, config, settings, path, state_map, capacitive_load=None,
     data_pwl += utils.slew_pwl(v1, v0, t_data_slew, data_pulse_width, th_low, th_high, data_pwl[-1][0])[1:]
 
     # Initialize circuit
-    circuit = utils.init_circuit(circuit_title, cell.netlist, config.models, settings.named_nodes, settings.units)
+    circuit = utils.init_circuit(circuit_title, cell.netlist, config.models, settings.named_nodes, settings.units,
+                                 settings.models_dir)
     circuit.V('o_cap', 'vout', 'wout', 0) # 0 volt source in series with c_load is a trick to measure current through the load capacitor.
     circuit.C('c_load', 'wout', circuit.gnd, c_load)
     circuit.PieceWiseLinearVoltageSource('clk', 'vclk', circuit.gnd, values=clk_pwl)
@@ -542,6 +553,20 @@ def sim_latch(cell, config, settings, path, state_map, capacitive_load=None,
     return (simulator, simulation)
 
 
+def _run_latch(simulator, simulation, settings):
+    """Run a latch simulation, returning only its clock and output waveforms if they are kept.
+
+    With settings.keep_waveforms, vout and vclk are saved to the waveform store and returned as
+    memory-mapped views, so the full analysis can be dropped right away."""
+    if not settings.keep_waveforms:
+        return backend.run(simulator, simulation, settings)
+    key = backend.simulation_key(simulation, settings)
+    store = WaveformStore(settings.waveforms_dir)
+    if key in store:
+        return store.load(key)
+    return store.save(key, backend.run(simulator, simulation, settings, key), ['vout', 'vclk'])
+
+
 def get_t_stabilizing(cell, config, settings, path, state_map, k=2, th_low=0.03, th_high=0.99, **sim_kwargs):
     """Find a reasonable estimate of the stabilizing time for the current configuration.
 
@@ -552,7 +577,7 @@ def get_t_stabilizing(cell, config, settings, path, state_map, k=2, th_low=0.03,
 
     simulator, simulation = sim_latch(cell, config, settings, path, state_map, **sim_kwargs)
     try:
-        analysis = simulator.run(simulation)
+        analysis = _run_latch(simulator, simulation, settings)
     except Exception as e:
         raise ProcedureFailedException('get_t_stabilizing failed') from e
 
@@ -562,8 +587,8 @@ def get_t_stabilizing(cell, config, settings, path, state_map, k=2, th_low=0.03,
     vdd = settings.primary_power.voltage * settings.units.voltage
     v_start = vdd * (th_low if output_is_rising else th_high)
     v_end = vdd - v_start
-    time = np.array(analysis.time)
-    vout = np.array(analysis['vout'])
+    time = np.asarray(analysis.time)
+    vout = np.asarray(analysis['vout'])
 
     # Measure transient time
     start_crossings = np.where(np.diff(((np.sign(vout - v_start)) > 0) if output_is_rising else \
@@ -589,7 +614,7 @@ def get_c2q(cell, config, settings, path, state_map, debug_dir=None, **sim_kwarg
 
     # Run simulation
     try:
-        analysis = simulator.run(simulation)
+        analysis = _run_latch(simulator, simulation, settings)
     except Exception as e:
         kwarg_str = ", ".join([f"{k}={v}" for k, v in sim_kwargs.items()])
         msg = f'Procedure get_c2q failed for cell {cell.name} with kwargs {kwarg_str}'
@@ -605,9 +630,9 @@ def get_c2q(cell, config, settings, path, state_map, debug_dir=None, **sim_kwarg
     th_fall = settings.logic_thresholds.falling
 
     # Check whether Q latched the D value by looking at vout after the 3rd clock edge
-    time = np.array(analysis.time)
-    vout = np.array(analysis['vout'])
-    vclk = np.array(analysis['vclk'])
+    time = np.asarray(analysis.time)
+    vout = np.asarray(analysis['vout'])
+    vclk = np.asarray(analysis['vclk'])
 
     # Find the time where the 3rd clock edge crosses the activation threshold
     clk_is_rising = state_map[cell.clock.name] == '1'
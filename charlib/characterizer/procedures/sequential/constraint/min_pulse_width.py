@@ -2,7 +2,7 @@ import PySpice
 
 from charlib.characterizer import utils, plots
 from charlib.characterizer.cell import Port
-from charlib.characterizer.procedures import register, ProcedureFailedException
+from charlib.characterizer.procedures import register, estimated_cost, ProcedureFailedException
 from charlib.liberty import liberty
 
 @register
@@ -17,9 +17,10 @@ def min_pulse_width_constraint(cell, config, settings):
     for pin in cell.filter_pins(direction='input', trigger=Port.Trigger.EDGE):
         yield (find_min_pulse_width, cell, config, settings, pin)
 
+@estimated_cost(0)
 def find_min_pulse_width(cell, config, settings, input_pin):
     """Find the minimum pulse width for input_pin across all combinations of test parameters.
 
     This method tests every test configuration variation and nonmasking condition to find the
     minimum pulse width for the target input_pin."""
-    return cell.liberty # TODO
+    return [] # TODO
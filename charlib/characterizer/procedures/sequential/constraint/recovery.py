@@ -2,7 +2,7 @@ import PySpice
 
 from charlib.characterizer import utils, plots
 from charlib.characterizer.cell import Port
-from charlib.characterizer.procedures import register, ProcedureFailedException
+from charlib.characterizer.procedures import register, estimated_cost, ProcedureFailedException
 from charlib.liberty import liberty
 
 @register
@@ -18,13 +18,14 @@ def recovery_constraint(cell, config, settings):
         for path in cell.paths():
             yield (find_min_recovery_time_for_path, cell, config, settings, variation, path)
 
+@estimated_cost(0)
 def find_min_recovery_time_for_path(cell, config, settings, variation, path):
     """Find the minimum time a control pin must be active in order to affect device state.
 
     This method tests all nonmasking conditions for the path through the cell and finds the minumum
     recovery constraint for each. Nonmasking conditions are annotated in the 'when' and 'sdf_cond'
-    fields of the timing tables on the returned liberty cell groups.
+    fields of the timing tables in the returned results.
 
     Recovery timing tables are indexed by the transition time of a related trigger pin (usually a
     clock) and the transition time of the constrained control pin (usually set or reset)."""
-    return cell.liberty # TODO
+    return [] # TODO
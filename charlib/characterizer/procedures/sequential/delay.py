@@ -1,7 +1,7 @@
 import PySpice
 
 from charlib.characterizer import utils, plots
-from charlib.characterizer.procedures import register, ProcedureFailedException
+from charlib.characterizer.procedures import register, estimated_cost, ProcedureFailedException
 from charlib.liberty import liberty
 
 @register
@@ -11,5 +11,6 @@ def sequential_worst_case(cell, config, settings):
         for path in cell.paths():
             yield (measure_delays_for_path, cell, config, settings, variation, path)
 
+@estimated_cost(0)
 def measure_delays_for_path(cell, config, settings, variation, path, criterion=max):
-    return cell.liberty # TODO
+    return [] # TODO
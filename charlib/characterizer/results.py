@@ -0,0 +1,185 @@
+"""Compact result records returned by characterization tasks.
+
+Rather than returning a copy of the entire liberty cell group, each task returns a short list of
+records describing only what it measured. The characterizer applies each record directly to the
+library, so the cost of returning and merging a result does not depend on the size of the cell.
+"""
+
+import copy
+
+import numpy as np
+
+from charlib.liberty import liberty
+from charlib.liberty.library import LookupTable
+
+# Functions which may be used to reduce a set of measurements to a single table value
+REDUCTIONS = {
+    'max': max,
+    'min': min,
+    'average': np.average,
+    'median': np.median,
+}
+
+
+class Result:
+    """Abstract base class for result records"""
+
+    def __init__(self, cell: str):
+        self.cell = cell
+
+    def apply(self, library):
+        """Write this result into the matching cell group of library."""
+        return NotImplemented
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return vars(self) == vars(other)
+
+    def __repr__(self):
+        fields = ', '.join(f'{k}={v!r}' for k, v in vars(self).items())
+        return f'{type(self).__name__}({fields})'
+
+
+class CellGroup(Result):
+    """A newly built cell's liberty group, before any measurements are applied to it
+
+    Cells are added to the library as they are built, so recording them as results lets the
+    library be rebuilt from the measurement store in the same order. A copy of the group is added,
+    so the cell object (which tasks carry to worker processes) stays detached from the library.
+
+    :param group: The cell's liberty group (see charlib.characterizer.cell.Cell.liberty).
+    """
+
+    def __init__(self, cell: str, group):
+        super().__init__(cell)
+        self.group = group
+
+    def apply(self, library):
+        library.add_group(copy.deepcopy(self.group))
+
+
+class PinAttribute(Result):
+    """A simple attribute measured for a pin, such as its capacitance"""
+
+    def __init__(self, cell: str, pin: str, attribute: str, value):
+        super().__init__(cell)
+        self.pin = pin
+        self.attribute = attribute
+        self.value = value
+
+    def apply(self, library):
+        library.group('cell', self.cell).group('pin', self.pin).add_attribute(self.attribute,
+                                                                             self.value)
+
+
+class CellSubgroup(Result):
+    """A subgroup of the cell consisting only of simple attributes, such as leakage_power"""
+
+    def __init__(self, cell: str, name: str, identifier: str, **attributes):
+        super().__init__(cell)
+        self.name = name
+        self.identifier = identifier
+        self.attributes = attributes
+
+    def apply(self, library):
+        group = liberty.Group(self.name, self.identifier)
+        for attr, value in self.attributes.items():
+            group.add_attribute(attr, value)
+        library.group('cell', self.cell).add_group(group)
+
+
+class PlotRequest(Result):
+    """A plot to draw once characterization is complete
+
+    Plots are not part of the library, so applying a PlotRequest does nothing. The characterizer
+    collects them and draws them in a separate stage (see charlib.characterizer.plots).
+
+    :param plot: A plot object from charlib.characterizer.plots, such as IOVoltagePlot.
+    """
+
+    def __init__(self, cell: str, plot):
+        super().__init__(cell)
+        self.plot = plot
+
+    def apply(self, library):
+        pass
+
+
+class TableEntry(Result):
+    """A single value in one of a pin's timing lookup tables
+
+    :param cell: The cell name.
+    :param pin: The name of the pin whose timing group holds the table.
+    :param timing: The identifier of the timing group.
+    :param timing_attributes: A dict of attributes of the timing group, such as related_pin.
+    :param table: The lookup table name, such as cell_rise.
+    :param template: The name of the lu_table_template the table uses.
+    :param index: A dict of table variable names and the index value for this entry, in template
+                  variable order.
+    :param value: The table value at index.
+    :param axes: (Optional) A dict of table variable names and all index values the full table
+                 will have. If given, the table is allocated at its final size when the first entry
+                 is applied, so that each entry is written directly into its slot.
+    """
+
+    def __init__(self, cell: str, pin: str, timing: str, timing_attributes: dict, table: str,
+                 template: str, index: dict, value: float, axes: dict=None):
+        super().__init__(cell)
+        self.pin = pin
+        self.timing = timing
+        self.timing_attributes = timing_attributes
+        self.table = table
+        self.template = template
+        self.index = index
+        self.value = value
+        self.axes = axes
+
+    def apply(self, library):
+        pin_group = library.group('cell', self.cell).group('pin', self.pin)
+        timing_group = liberty.Group('timing', self.timing)
+        for attr, value in self.timing_attributes.items():
+            timing_group.add_attribute(attr, value)
+        pin_group.add_group(timing_group)
+        timing_group = pin_group.groups[timing_group.unique_key]
+
+        lut = timing_group.groups.get((self.table, self.template))
+        if lut is None and self.axes:
+            # Allocate the table at its final size so each entry is a single slot write
+            lut = LookupTable(self.table, self.template,
+                              **{variable: sorted(set(values))
+                                 for variable, values in self.axes.items()})
+            timing_group.add_group(lut)
+        if lut is not None:
+            try:
+                lut[*self.index.values()] = self.value
+                return
+            except KeyError:
+                pass # Index falls outside the existing table; merge to extend it
+
+        lut = LookupTable(self.table, self.template,
+                          **{variable: [value] for variable, value in self.index.items()})
+        lut.values[(0,) * len(self.index)] = self.value
+        timing_group.add_group(lut)
+
+
+class TableMeasurements(TableEntry):
+    """A lookup table entry reduced from measurements taken under several pin states
+
+    The individual measurements are kept alongside the reduced value, so the table can later be
+    rebuilt under a different reduction (see charlib.characterizer.store).
+
+    :param samples: A dict mapping a description of the pin states for each measurement (such as
+                    'B=0, C=1') to the measured value.
+    :param criterion: The name of a function in REDUCTIONS, or a function which returns a single
+                      value given a list of values, used to select the table value from samples.
+    :param **kwargs: The arguments to TableEntry, except value.
+    """
+
+    def __init__(self, cell: str, pin: str, timing: str, timing_attributes: dict, table: str,
+                 template: str, index: dict, samples: dict, criterion='max', axes: dict=None):
+        function = REDUCTIONS[criterion] if isinstance(criterion, str) else criterion
+        value = float(function(list(samples.values())))
+        super().__init__(cell, pin, timing, timing_attributes, table, template, index, value, axes)
+        self.samples = samples
+        self.criterion = criterion if isinstance(criterion, str) else criterion.__name__
@@ -0,0 +1,333 @@
+"""Tools for reading SPICE decks and preparing trimmed model files for simulation"""
+
+import hashlib, mmap, re
+from pathlib import Path
+
+from charlib.cache import file_digest, write_atomic
+
+# Files considered when a model path is a directory
+MODEL_FILE_SUFFIXES = {'.lib', '.mod', '.model', '.spice', '.sp', '.cir', '.inc', '.m'}
+
+# Binned models are named like nfet.0, nfet.1, ... and selected by instances of nfet
+BIN_SUFFIX_REGEX = re.compile(r'\.\d+$')
+
+# Per-process memo of trimmed model files, keyed by the inputs used to create them
+_subsets = {}
+
+# Per-process memo of netlist indexes, keyed by (path, mtime, size)
+_netlist_indexes = {}
+
+SUBCKT_REGEX = re.compile(rb'^[ \t]*\.subckt[ \t]+(\S+)([^\n]*(?:\n[ \t]*\+[^\n]*)*)',
+                          re.IGNORECASE | re.MULTILINE)
+ENDS_REGEX = re.compile(rb'^[ \t]*\.ends\b[^\n]*(?:\n|$)', re.IGNORECASE | re.MULTILINE)
+
+
+def read_statements(path):
+    """Yield each statement in a SPICE file as a list of its physical lines.
+
+    Continuation lines (starting with '+') are grouped with the line they continue. Comment and
+    blank lines are dropped.
+    """
+    with open(path, 'r', errors='replace') as file:
+        yield from _statements(file)
+
+
+def _statements(lines):
+    statement = []
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith('*'):
+            continue
+        if stripped.startswith('+') and statement:
+            statement.append(line)
+            continue
+        if statement:
+            yield statement
+        statement = [line]
+    if statement:
+        yield statement
+
+
+def tokens(statement) -> list:
+    """Return the whitespace-separated tokens of a statement, ignoring continuation markers."""
+    return ' '.join(line.strip().lstrip('+') for line in statement).split()
+
+
+def _resolve(path_token, base_dir) -> Path:
+    path = Path(path_token.strip('\'"')).expanduser()
+    return path if path.is_absolute() else base_dir / path
+
+
+def flatten(path, section=None, _stack=()) -> list:
+    """Return the statements ngspice would read from path, with includes expanded inline.
+
+    :param path: The SPICE file to read.
+    :param section: (Optional) The name of a .lib section to read from path. If omitted, only
+                    statements outside of .lib sections are read, as with .include.
+    """
+    path = Path(path).resolve()
+    key = (path, section.lower() if section else None)
+    if key in _stack:
+        return [] # Circular include
+    _stack = (*_stack, key)
+
+    statements = []
+    current_section = None # The .lib section we are inside of, if any
+    for statement in read_statements(path):
+        words = tokens(statement)
+        card = words[0].lower()
+        if card == '.lib' and len(words) == 2:
+            current_section = words[1].lower()
+            continue
+        if card == '.endl':
+            current_section = None
+            continue
+        if current_section != key[1]:
+            continue
+        if card in ('.inc', '.include') and len(words) >= 2:
+            statements += flatten(_resolve(words[1], path.parent), None, _stack)
+        elif card == '.lib' and len(words) >= 3:
+            statements += flatten(_resolve(words[1], path.parent), words[2], _stack)
+        else:
+            statements.append(statement)
+    return statements
+
+
+def used_names(statements) -> set:
+    """Return the set of lowercase names that statements could use as model or subckt names."""
+    return {word.lower() for statement in statements for word in tokens(statement)
+            if '=' not in word}
+
+
+def trim(statements, used) -> list:
+    """Return statements with unused .model and .subckt definitions removed.
+
+    A model is kept if its name (or, for binned models, its base name) is in used. Subckts are
+    kept likewise, and any names used inside kept subckts are treated as used too.
+    """
+    # Split statements into definitions and everything else, preserving order
+    blocks = [] # (kind, name, [statements])
+    subckt = None
+    for statement in statements:
+        words = tokens(statement)
+        card = words[0].lower()
+        if subckt is not None:
+            subckt[2].append(statement)
+            if card == '.ends':
+                blocks.append(subckt)
+                subckt = None
+        elif card == '.subckt' and len(words) > 1:
+            subckt = ('subckt', words[1].lower(), [statement])
+        elif card == '.model' and len(words) > 1:
+            blocks.append(('model', words[1].lower(), [statement]))
+        else:
+            blocks.append(('other', None, [statement]))
+    if subckt is not None:
+        blocks.append(subckt) # Unterminated subckt; keep it as-is and let ngspice complain
+
+    # Grow the set of used names through kept subckts until nothing changes
+    used = set(used)
+    kept_subckts = set()
+    while True:
+        new_subckts = {name for (kind, name, _) in blocks
+                       if kind == 'subckt' and name in used and name not in kept_subckts}
+        if not new_subckts:
+            break
+        kept_subckts |= new_subckts
+        for (kind, name, body) in blocks:
+            if kind == 'subckt' and name in new_subckts:
+                used |= used_names(body[1:])
+
+    def is_used(kind, name):
+        if kind == 'model':
+            return name in used or BIN_SUFFIX_REGEX.sub('', name) in used
+        if kind == 'subckt':
+            return name in kept_subckts
+        return True
+    return [statement for (kind, name, body) in blocks if is_used(kind, name)
+            for statement in body]
+
+
+def model_statements(model) -> list:
+    """Return the flattened statements for a model entry from CellTestConfig.models.
+
+    :param model: A tuple of (path, [section]). If path is a directory, every SPICE file in it is
+                  read.
+    """
+    (path, *section) = model
+    path = Path(path)
+    if path.is_dir():
+        statements = []
+        for file in sorted(path.rglob('*')):
+            if file.is_file() and file.suffix.lower() in MODEL_FILE_SUFFIXES:
+                statements += flatten(file)
+        return statements
+    return flatten(path, *section)
+
+
+def subset_models(models, netlist, models_dir) -> Path:
+    """Write a model file containing only the models and subckts netlist uses, and return its path.
+
+    Trimmed files are named by a hash of their contents, so identical subsets are shared between
+    cells and runs. Results are memoized for the life of the process.
+
+    :param models: A list of (path, [section]) tuples (from CellTestConfig.models).
+    :param netlist: The SPICE netlist whose devices determine which models are used.
+    :param models_dir: The directory to write trimmed model files to.
+    """
+    memo_key = (tuple(tuple(str(part) for part in model) for model in models), str(netlist),
+                str(models_dir),
+                tuple(file_digest(Path(model[0])) for model in models if Path(model[0]).is_file()),
+                file_digest(netlist))
+    if memo_key not in _subsets:
+        statements = []
+        for model in models:
+            statements += model_statements(model)
+        used = used_names(flatten(netlist))
+        text = ''.join(line if line.endswith('\n') else f'{line}\n'
+                       for statement in trim(statements, used) for line in statement)
+        path = Path(models_dir) / f'{hashlib.sha256(text.encode()).hexdigest()}.lib'
+        if not path.exists():
+            write_atomic(path, text.encode())
+        _subsets[memo_key] = path
+    return _subsets[memo_key]
+
+
+class Subckt:
+    """The location and interface of a subcircuit definition in a netlist file
+
+    :param name: The subckt name as written in the netlist.
+    :param pins: The subckt's pin names, in netlist order.
+    :param start: The byte offset of the start of the .subckt line.
+    :param end: The byte offset just past the end of the matching .ends line.
+    """
+
+    def __init__(self, name: str, pins: list, start: int, end: int):
+        self.name = name
+        self.pins = pins
+        self.start = start
+        self.end = end
+
+
+class NetlistIndex:
+    """An index of the subcircuits defined in a SPICE netlist file.
+
+    The file is scanned once, recording each subckt's name, pins and byte range, so looking up a
+    cell never requires reading the file again. Use netlist_index(path) to get a shared instance.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.subckts = {} # Lowercase name -> Subckt
+        self._top_level = None
+        with open(self.path, 'rb') as file:
+            if self.path.stat().st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for match in SUBCKT_REGEX.finditer(data):
+                    name = match.group(1).decode(errors='replace')
+                    pins = []
+                    for word in match.group(2).decode(errors='replace').replace('\n', ' ').split():
+                        if word.lower() == 'params:' or '=' in word:
+                            break # Parameters follow the pins
+                        if word != '+':
+                            pins.append(word.lstrip('+'))
+                    ends = ENDS_REGEX.search(data, match.end())
+                    end = ends.end() if ends else len(data)
+                    self.subckts.setdefault(name.lower(), Subckt(name, pins, match.start(), end))
+
+    def __contains__(self, name) -> bool:
+        return name.lower() in self.subckts
+
+    def subckt(self, name) -> Subckt:
+        """Return the Subckt named name (case-insensitive).
+
+        :raises ValueError: If the netlist contains no such subckt.
+        """
+        try:
+            return self.subckts[name.lower()]
+        except KeyError:
+            raise ValueError(f'Failed to identify a .subckt for cell {name} in netlist '
+                             f'"{self.path}"') from None
+
+    def text(self, name) -> str:
+        """Return the full definition of subckt name, from .subckt through .ends."""
+        subckt = self.subckt(name)
+        with open(self.path, 'rb') as file:
+            file.seek(subckt.start)
+            return file.read(subckt.end - subckt.start).decode(errors='replace')
+
+    def top_level(self) -> list:
+        """Return the statements outside of any subckt definition.
+
+        Paths in .include and .lib cards are made absolute, so the statements can be used from a
+        file in another directory.
+        """
+        if self._top_level is None:
+            with open(self.path, 'rb') as file:
+                data = file.read()
+            lines = []
+            position = 0
+            for subckt in sorted(self.subckts.values(), key=lambda subckt: subckt.start):
+                if subckt.start >= position:
+                    lines += data[position:subckt.start].decode(errors='replace').splitlines(True)
+                    position = subckt.end
+            lines += data[position:].decode(errors='replace').splitlines(True)
+
+            self._top_level = []
+            for statement in _statements(lines):
+                words = tokens(statement)
+                card = words[0].lower()
+                if card in ('.inc', '.include', '.lib') and len(words) >= 2 and \
+                        not (card == '.lib' and len(words) == 2):
+                    path = _resolve(words[1], self.path.parent).resolve()
+                    statement = [' '.join([words[0], str(path), *words[2:]]) + '\n']
+                self._top_level.append(statement)
+        return self._top_level
+
+    def extract(self, name) -> str:
+        """Return a standalone netlist containing subckt name and everything it depends on.
+
+        The result holds the statements outside of any subckt (such as .include, .param and .model
+        cards), subckt name, and every subckt instantiated by those, recursively.
+        """
+        top_level = self.top_level()
+        pending = [name.lower()] + sorted(word for word in used_names(top_level) if word in self)
+        included = []
+        while pending:
+            subckt = pending.pop(0)
+            if subckt in included:
+                continue
+            included.append(subckt)
+            body = list(_statements(self.text(subckt).splitlines(True)))[1:]
+            pending += sorted(word for word in used_names(body) if word in self)
+        definitions = [self.text(subckt) for subckt in included]
+        lines = [line for statement in top_level for line in statement]
+        return ''.join(lines + [d if d.endswith('\n') else f'{d}\n' for d in definitions])
+
+
+def netlist_index(path) -> NetlistIndex:
+    """Return this process's NetlistIndex for path, building it if the file is new or changed."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _netlist_indexes:
+        _netlist_indexes[key] = NetlistIndex(path)
+    return _netlist_indexes[key]
+
+
+def extract_subckt(netlist, name, netlists_dir) -> Path:
+    """Write a netlist with only subckt name and its dependencies, and return its path.
+
+    Extracted files are named by the subckt name and a hash of their contents, so unchanged cells
+    reuse the same file across runs.
+
+    :param netlist: The SPICE netlist containing subckt name.
+    :param name: The subckt to extract.
+    :param netlists_dir: The directory to write extracted netlists to.
+    """
+    text = netlist_index(netlist).extract(name)
+    path = Path(netlists_dir) / f'{name}.{hashlib.sha256(text.encode()).hexdigest()[:16]}.sp'
+    if not path.exists():
+        write_atomic(path, text.encode())
+    return path
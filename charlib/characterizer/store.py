@@ -0,0 +1,152 @@
+"""Stores every characterization result, including raw measurements, in a single SQLite file
+
+The Liberty file written by a run only holds each table value after it has been reduced from the
+measurements behind it (for example, the worst delay across all input states). The store keeps
+those measurements, one row each, so that the library can be rendered again under a different
+reduction or precision without repeating any simulations.
+"""
+
+import json, pickle, sqlite3
+from pathlib import Path
+
+from charlib.characterizer.results import TableMeasurements
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS library (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    seq INTEGER PRIMARY KEY,
+    procedure TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    seq INTEGER NOT NULL,
+    procedure TEXT NOT NULL,
+    cell TEXT NOT NULL,
+    pin TEXT NOT NULL,
+    related_pin TEXT,
+    timing TEXT NOT NULL,
+    timing_attributes TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    template TEXT NOT NULL,
+    state TEXT NOT NULL,
+    slew REAL,
+    load REAL,
+    temperature REAL,
+    voltage REAL,
+    value REAL NOT NULL,
+    criterion TEXT NOT NULL,
+    table_index TEXT NOT NULL,
+    axes TEXT
+);
+CREATE INDEX IF NOT EXISTS measurements_by_seq ON measurements (seq);
+'''
+
+
+class MeasurementStore:
+    """A SQLite file holding the base library and every result of a characterization run.
+
+    TableMeasurements results are stored one measurement per row in the measurements table, along
+    with their cell, path, pin states, slew, load, corner and procedure, so they can be queried
+    directly. All other results are pickled into the results table. Both share a sequence number
+    recording the order results were applied in, so rendering reproduces the same library.
+
+    :param path: The store file location.
+    :param create: If True, replace any existing store at path with an empty one.
+    :param corner: (Optional) A dict with the temperature and voltage to record with measurements.
+    """
+
+    def __init__(self, path, create=False, corner=None):
+        self.path = Path(path)
+        if create:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.unlink(missing_ok=True)
+        elif not self.path.exists():
+            raise FileNotFoundError(f'No measurement store at "{self.path}"')
+        self.corner = corner or {}
+        self._connection = sqlite3.connect(self.path)
+        self._connection.executescript(SCHEMA)
+        self._seq = self._connection.execute(
+            'SELECT MAX(seq) FROM (SELECT seq FROM results UNION ALL '
+            'SELECT seq FROM measurements)').fetchone()[0] or 0
+
+    def set_library(self, library):
+        """Store the library that results are applied to, before any results are added."""
+        self._connection.execute('INSERT OR REPLACE INTO library VALUES (0, ?)',
+                                 (pickle.dumps(library),))
+
+    def library(self):
+        """Return a fresh copy of the stored base library."""
+        row = self._connection.execute('SELECT data FROM library').fetchone()
+        if row is None:
+            raise ValueError(f'Measurement store "{self.path}" has no library')
+        return pickle.loads(row[0])
+
+    def add(self, procedure: str, results):
+        """Record the results of a task.
+
+        :param procedure: The name of the task which produced results.
+        :param results: A list of task results (see charlib.characterizer.results).
+        """
+        rows = []
+        for result in results:
+            self._seq += 1
+            if not isinstance(result, TableMeasurements):
+                self._connection.execute('INSERT INTO results VALUES (?, ?, ?)',
+                                         (self._seq, procedure, pickle.dumps(result)))
+                continue
+            context = (self._seq, procedure, result.cell, result.pin,
+                       result.timing_attributes.get('related_pin'), result.timing,
+                       json.dumps(result.timing_attributes), result.table, result.template)
+            index = (result.index.get('input_net_transition'),
+                     result.index.get('total_output_net_capacitance'))
+            corner = (self.corner.get('temperature'), self.corner.get('voltage'))
+            rows += [(*context, state, *index, *corner, value, result.criterion,
+                      json.dumps(result.index), json.dumps(result.axes))
+                     for (state, value) in result.samples.items()]
+        self._connection.executemany(f'INSERT INTO measurements VALUES ({", ".join("?" * 18)})',
+                                     rows)
+
+    def results(self, criterion=None):
+        """Yield the stored results in the order they were added.
+
+        :param criterion: (Optional) The name of a reduction in charlib.characterizer.results.
+                          REDUCTIONS to apply to all measurements, instead of the one each was
+                          recorded with.
+        """
+        pickled = self._connection.execute('SELECT seq, data FROM results ORDER BY seq')
+        measured = self._connection.execute(
+            'SELECT seq, cell, pin, timing, timing_attributes, table_name, template, table_index, '
+            'axes, criterion, state, value FROM measurements ORDER BY seq, rowid')
+        next_pickled = next(pickled, None)
+        next_measured = next(measured, None)
+        while next_pickled or next_measured:
+            if next_measured is None or (next_pickled and next_pickled[0] < next_measured[0]):
+                yield pickle.loads(next_pickled[1])
+                next_pickled = next(pickled, None)
+                continue
+            # Gather every measurement belonging to the same result
+            (seq, cell, pin, timing, timing_attributes, table, template, index, axes,
+             recorded_criterion, *_) = next_measured
+            samples = {}
+            while next_measured and next_measured[0] == seq:
+                samples[next_measured[10]] = next_measured[11]
+                next_measured = next(measured, None)
+            yield TableMeasurements(cell, pin, timing, json.loads(timing_attributes), table,
+                                    template, json.loads(index), samples,
+                                    criterion or recorded_criterion, json.loads(axes))
+
+    def commit(self):
+        self._connection.commit()
+
+    def close(self):
+        self._connection.commit()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -2,10 +2,13 @@
 
 import csv
 import math
+from pathlib import Path
 
 import PySpice
 import numpy as np
 
+from charlib.characterizer import spice
+
 
 class PinStateMap:
     """Connect ports of a cell to the appropriate waveforms for a test.
@@ -64,7 +67,7 @@ def slew_pwl(v_0, v_1, t_slew, t_wait, low_threshold, high_threshold, t_start=0)
         (t_start + t_wait + t_full_slew, v_1)
     ]
 
-def init_circuit(title, cell_netlist, models, supplies, units):
+def init_circuit(title, cell_netlist, models, supplies, units, models_dir=None):
     """Perform common circuit initialization tasks
 
     :param title: The title for the created circuit object
@@ -72,6 +75,10 @@ def init_circuit(title, cell_netlist, models, supplies, units):
     :param models: A list of path-likes or tuples to be imported (from CellTestConfig.models)
     :param supplies: Key voltage supplies to create (from CharacterizationSettings.named_nodes)
     :param units: An object describing which unit to use (from CharacterizationSettings.units)
+    :param models_dir: (Optional) A directory for trimmed model files (from
+                       CharacterizationSettings.models_dir). If given, models are trimmed to only
+                       those used by cell_netlist before being imported. Required if any model
+                       path is a directory.
 
     1. Sets up a new circuit with the given title
     2. Imports cell_netlist and models using the appropriate .lib or .include syntax
@@ -79,13 +86,17 @@ def init_circuit(title, cell_netlist, models, supplies, units):
     """
     circuit = PySpice.Circuit(title)
     circuit.include(cell_netlist)
-    for model in models:
-        if len (model) > 1:
-            circuit.lib(*model)
-        else:
-            circuit.include(model[0])
-            # TODO: if model.is_dir(), use SpiceLibrary
-            #   To do this, we'll also need to know which subckts are used by the netlist
+    if models_dir:
+        circuit.include(spice.subset_models(models, cell_netlist, models_dir))
+    else:
+        for model in models:
+            if Path(model[0]).is_dir():
+                raise ValueError(f'Model directory "{model[0]}" can only be used with subset_models '
+                                 f'enabled')
+            if len (model) > 1:
+                circuit.lib(*model)
+            else:
+                circuit.include(model[0])
     for supply in supplies:
         if supply.name.upper() not in ['GND', '0']:
             circuit.V(supply.subscript, supply.name, circuit.gnd, supply.voltage*units.voltage)
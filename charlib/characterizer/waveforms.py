@@ -0,0 +1,87 @@
+"""Stores simulation waveforms in memory-mapped files for plotting and later analysis
+
+Full simulator analyses hold every vector a simulation produced, and keeping them around until a
+task finishes (for example, to plot them) costs a lot of memory for long transients. Instead,
+tasks can save just the vectors they need to a WaveformStore and drop the analysis. Each
+simulation's vectors are written once to a .npy file named by the simulation's deck key (see
+charlib.characterizer.backend.deck_key), and read back as zero-copy views of a memory map.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+class Waveforms:
+    """Vectors saved from a single simulation
+
+    Waveforms can be used in place of a simulator analysis wherever only the time abscissa and
+    node voltages are needed, such as charlib.characterizer.plots.plot_io_voltages.
+
+    :param time: An array of time points.
+    :param **vectors: Arrays of values at each time point, named like 'vA'.
+    """
+
+    def __init__(self, time, **vectors):
+        self.time = time
+        self.vectors = vectors
+
+    def __getitem__(self, name):
+        try:
+            return self.vectors[name]
+        except KeyError:
+            raise IndexError(f'No vector named {name}') from None
+
+    @classmethod
+    def from_array(cls, array):
+        """Wrap a structured array with a 'time' field and one field per vector, without copying."""
+        return cls(array['time'], **{name: array[name] for name in array.dtype.names
+                                     if name != 'time'})
+
+
+class WaveformStore:
+    """A directory of saved simulation waveforms, keyed by deck key.
+
+    :param directory: The directory to store waveform files in.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, key) -> Path:
+        return self.directory / key[:2] / f'{key}.npy'
+
+    def __contains__(self, key) -> bool:
+        return self.path(key).exists()
+
+    def save(self, key, analysis, vectors) -> Waveforms:
+        """Save the time abscissa and some vectors of analysis, and return them memory-mapped.
+
+        Nothing is written if waveforms are already stored under key, since identical decks produce
+        identical results.
+
+        :param key: The deck key of the simulation which produced analysis.
+        :param analysis: A simulator (or cached) analysis with a time abscissa.
+        :param vectors: The names of the vectors to save, such as 'vA'.
+        """
+        path = self.path(key)
+        if not path.exists():
+            time = np.asarray(analysis.time, dtype=float)
+            array = np.empty(len(time), dtype=[('time', float), *((name, float) for name in vectors)])
+            array['time'] = time
+            for name in vectors:
+                array[name] = np.asarray(analysis[name], dtype=float)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+            with open(tmp_path, 'wb') as file:
+                np.save(file, array)
+            os.replace(tmp_path, path)
+        return self.load(key)
+
+    def load(self, key) -> Waveforms:
+        """Return the waveforms stored under key as views of a read-only memory map.
+
+        :raises FileNotFoundError: If no waveforms are stored under key.
+        """
+        return Waveforms.from_array(np.load(self.path(key), mmap_mode='r'))
@@ -1,5 +1,22 @@
-from charlib.characterizer.logic.functions import generate_yml
+from pathlib import Path
+
+from charlib.cache import default_cache_dir
+from charlib.characterizer.logic.evaluators import OPERAND_REGEX
+from charlib.characterizer.logic.functions import Function, FunctionCache
+from charlib.characterizer.port import Pin
 
 def generate_functions(args):
-    """Generate YAML files for caching function-to-test-vector mappings"""
-    generate_yml(args.expressions)
+    """Generate test vectors for combinational functions and store them in the function cache"""
+    cache = FunctionCache(Path(args.cache_dir or default_cache_dir()).expanduser() / 'functions')
+    for expression in args.expressions:
+        try:
+            output, rhs = expression.split('=')
+        except ValueError:
+            raise ValueError(f'Expected an expression of the form Y=A&B, got "{expression}"')
+        output = ''.join([c for c in output if c.isalnum() or c == '_'])
+        inputs = [Pin(name, 'input') for name in sorted(set(OPERAND_REGEX.findall(rhs)))]
+        function = Function(Pin(output, 'output'), rhs.strip(), *inputs)
+        hit = cache.fill(function)
+        if not args.quiet:
+            print(f'{expression}: {len(function.packed_test_vectors)} test vectors ' \
+                  f'({"already cached" if hit else "generated"})')
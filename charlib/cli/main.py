@@ -1,10 +1,21 @@
 #! /usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import argparse
+import argparse, importlib
 from pathlib import Path
 
-from charlib.cli import run, compare
+from charlib.characterizer.results import REDUCTIONS
+
+def subcommand(name):
+    """Return a function which runs the subcommand in charlib.cli.<name>, importing it when called.
+
+    Subcommand modules (and the characterizer, PySpice and matplotlib behind them) are only imported
+    once arguments have been parsed, so that ``charlib --help`` and simple subcommands start fast.
+    """
+    def run_subcommand(args):
+        module = importlib.import_module(f'charlib.cli.{name}')
+        return getattr(module, name)(args)
+    return run_subcommand
 
 def main():
     """Run CharLib CLI"""
@@ -22,12 +33,21 @@ def main():
     # Set up run, compare, and generate_functions subcommands
     subparser = parser.add_subparsers(title='subcomamands', required=True)
     parser_characterize = subparser.add_parser('run', help='Characterize a standard cell library')
+    parser_plan = subparser.add_parser(
+        'plan',
+        help='Estimate the work needed to characterize a library without running simulations')
+    parser_render = subparser.add_parser(
+        'render',
+        help='Rebuild a liberty file from the measurements recorded by a previous run')
+    parser_plot = subparser.add_parser(
+        'plot',
+        help='Draw the plots requested for a previous run')
     parser_compare = subparser.add_parser(
         'compare',
         help='(experimental) Compare two liberty files')
     parser_genfunctions = subparser.add_parser(
         'generate_functions',
-        help='(experimental) Generate YAML maps for registered functions')
+        help='(experimental) Generate and cache test vectors for combinational functions')
 
     # Set up charlib run arguments
     parser_characterize.add_argument(
@@ -39,17 +59,69 @@ def main():
     parser_characterize.add_argument(
         '-j', '--jobs', type=int, default=0,
         help='Specify the number of concurrent jobs')
+    parser_characterize.add_argument(
+        '--no-cache', action='store_true',
+        help='Run every simulation and read every config file, ignoring (and not storing) cached results')
+    parser_characterize.add_argument(
+        '--resume', action='store_true',
+        help='Resume an interrupted run, skipping tasks recorded in the results directory journal')
+    parser_characterize.add_argument(
+        '--defer-plots', action='store_true',
+        help='Skip drawing plots after characterization. Draw them later with charlib plot')
+    parser_characterize.add_argument(
+        '--update', type=str, default='',
+        help='An existing liberty file to add the characterized cells to, replacing any cells with the same names')
     parser_characterize.add_argument(
         '--comparewith', type=str, default='',
         help='(experimental) A liberty file to compare results with')
     parser_characterize.add_argument(
         '-f', '--filters', nargs='*',
         help='A list of one or more regex strings. charlib will only characterize cells matching one or more of the filters.')
-    parser_characterize.set_defaults(func=run.run)
+    parser_characterize.set_defaults(func=subcommand('run'))
+
+    # Set up charlib plan arguments
+    parser_plan.add_argument(
+        'library', type=str,
+        help='The directory containing the library characterization configuration file, or the full path to the file')
+    parser_plan.add_argument(
+        '-o', '--output', type=str, default='',
+        help='Write the JSON plan to the specified file')
+    parser_plan.add_argument(
+        '-j', '--jobs', type=int, default=0,
+        help='Estimate run time for the specified number of concurrent jobs')
+    parser_plan.add_argument(
+        '-f', '--filters', nargs='*',
+        help='A list of one or more regex strings. charlib will only plan cells matching one or more of the filters.')
+    parser_plan.set_defaults(func=subcommand('plan'))
+
+    # Set up charlib render arguments
+    parser_render.add_argument(
+        'store', type=str,
+        help='The measurement store (<library>.measurements.db) in the results directory of a previous run')
+    parser_render.add_argument(
+        '-o', '--output', type=str, default='',
+        help='Place the rendered library in the specified file')
+    parser_render.add_argument(
+        '--criterion', type=str, default=None, choices=list(REDUCTIONS),
+        help='Reduce measurements taken under different pin states with this function, instead of the one each was measured with')
+    parser_render.add_argument(
+        '--precision', type=int, default=6,
+        help='The number of digits to display after the decimal point in table values')
+    parser_render.set_defaults(func=subcommand('render'))
+
+    # Set up charlib plot arguments
+    parser_plot.add_argument(
+        'store', type=str,
+        help='The measurement store (<library>.measurements.db) in the results directory of a previous run')
+    parser_plot.add_argument(
+        '-j', '--jobs', type=int, default=0,
+        help='Specify the number of concurrent plotting jobs')
+    parser_plot.set_defaults(func=subcommand('plot'))
 
     # Set up charlib compare arguments
     def compare_helper(args):
         """Helper function for compare subcommand"""
+        from charlib.cli import compare
         with open(Path(args.compared), 'r') as compared:
             compare.compare(args.benchmark, compared.read())
     parser_compare.add_argument(
@@ -60,6 +132,15 @@ def main():
         help='A liberty file to compare against the benchmark')
     parser_compare.set_defaults(func=compare_helper)
 
+    # Set up charlib generate_functions arguments
+    parser_genfunctions.add_argument(
+        'expressions', nargs='+',
+        help='One or more functions of the form Y=A&B')
+    parser_genfunctions.add_argument(
+        '--cache-dir', type=str, default='',
+        help='The cache directory to store test vectors in (default ~/.cache/charlib)')
+    parser_genfunctions.set_defaults(func=subcommand('generate_functions'))
+
     # Parse args and execute
     args = parser.parse_args()
     args.func(args)
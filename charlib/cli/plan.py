@@ -0,0 +1,62 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+from pathlib import Path
+
+from charlib.cache import default_cache_dir
+from charlib.characterizer.characterizer import Characterizer
+from charlib.cli import utils
+from charlib.config.loader import ConfigLoader
+
+def plan(args):
+    """Summarize the work characterization would do, without running any simulations"""
+    library_dir = args.library
+    loader = ConfigLoader(default_cache_dir()) # See run for why this ignores settings.cache_dir
+    try:
+        config = utils.find_config(library_dir, loader=loader)
+    except FileNotFoundError as e:
+        raise ValueError(f'Unable to locate a YAML file containing configuration settings in ' \
+                         f'{library_dir} or its subdirectories.') from e
+
+    # Read in library settings
+    settings = config['settings']
+    cells = config['cells']
+    characterizer = Characterizer(**settings)
+    characterizer.settings.extract_netlists = False # Planning only needs the full netlist
+
+    # Filter and add cells
+    if args.filters:
+        cells = utils.filter_cells(cells, args.filters)
+        if not cells:
+            raise RuntimeError("No cells left after filtering!")
+    [characterizer.add_cell(n, p) for (n, p) in utils.read_cell_configs(cells, loader)]
+    # Planning is a dry run, so the config cache is read but not updated
+
+    summary = characterizer.plan(args.jobs)
+
+    # Display the plan
+    if not (characterizer.settings.quiet or args.quiet):
+        print(f'{"cell":<24} {"procedure":<32} {"tasks":>7} {"sims":>9} {"est. seconds":>13}')
+        for (cell, procedures) in summary['cells'].items():
+            for (procedure, counts) in procedures.items():
+                print(f'{cell:<24} {procedure:<32} {counts["tasks"]:>7} ' \
+                      f'{counts["simulations"]:>9} {counts["seconds"]:>13.1f}')
+        print(f'{summary["tasks"]} tasks, {summary["simulations"]} simulations')
+        print(f'Estimated run time with {summary["jobs"]} jobs: ' \
+              f'{summary["wall_seconds"]:.0f} s ({summary["cpu_seconds"]:.0f} CPU seconds)')
+        if not summary['learned_timings']:
+            print('No timings from previous runs are available; estimates assume one second ' \
+                  'per simulation')
+
+    # Write to file
+    if args.output:
+        planfile = Path(args.output)
+        if planfile.is_dir():
+            planfile = planfile / f'{characterizer.library.identifier}.plan.json'
+    else:
+        planfile = characterizer.settings.results_dir / f'{characterizer.library.identifier}.plan.json'
+    planfile.parent.mkdir(parents=True, exist_ok=True)
+    planfile.write_text(json.dumps(summary, indent=2))
+    if not (characterizer.settings.quiet or args.quiet):
+        print(f'Plan written to {str(planfile.resolve())}')
@@ -0,0 +1,18 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from charlib.characterizer import plots
+from charlib.characterizer.results import PlotRequest
+from charlib.characterizer.store import MeasurementStore
+
+def plot(args):
+    """Draw the plots requested during a previous run, without running any simulations"""
+    with MeasurementStore(args.store) as store:
+        library = store.library()
+        requests = []
+        for result in store.results():
+            result.apply(library)
+            if isinstance(result, PlotRequest):
+                requests.append(result)
+    library.add_table_templates()
+    plots.draw_plots(library, requests, args.jobs or None, args.quiet)
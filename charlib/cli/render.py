@@ -0,0 +1,25 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+
+from charlib.characterizer.store import MeasurementStore
+
+def render(args):
+    """Rebuild a liberty file from a measurement store, without running any simulations"""
+    with MeasurementStore(args.store) as store:
+        library = store.library()
+        for result in store.results(criterion=args.criterion):
+            result.apply(library)
+    library.add_table_templates()
+
+    # Write to file
+    if args.output:
+        libfile = Path(args.output)
+        if libfile.is_dir():
+            libfile = libfile / library.file_name
+    else:
+        libfile = Path(args.store).parent / library.file_name
+    library.write(libfile, precision=args.precision)
+    if not args.quiet:
+        print(f'Results written to {str(libfile.resolve())}')
@@ -5,17 +5,23 @@ import argparse
 from pathlib import Path
 from PySpice.Logging import Logging
 
+from charlib.cache import default_cache_dir
 from charlib.characterizer.characterizer import Characterizer
 from charlib.cli import utils
-from charlib.cli.compare import compare
+from charlib.config.loader import ConfigLoader
+from charlib.liberty.reader import read_library
 
 def run(args):
     """Run characterization"""
     library_dir = args.library
-    config = utils.find_config(library_dir)
-    if not config:
+    # The config cache always lives in the default cache directory: settings.cache_dir is only
+    # known once the config has been read.
+    loader = ConfigLoader(None if args.no_cache else default_cache_dir())
+    try:
+        config = utils.find_config(library_dir, loader=loader)
+    except FileNotFoundError as e:
         raise ValueError(f'Unable to locate a YAML file containing configuration settings in ' \
-                         f'{library_dir} or its subdirectories.')
+                         f'{library_dir} or its subdirectories.') from e
 
     # Read in library settings
     settings = config['settings']
@@ -27,30 +33,41 @@ def run(args):
     characterizer.settings.debug = characterizer.settings.debug or args.debug
     characterizer.settings.quiet = characterizer.settings.quiet or args.quiet
     characterizer.settings.jobs = args.jobs if args.jobs else characterizer.settings.jobs
+    characterizer.settings.use_cache = characterizer.settings.use_cache and not args.no_cache
+    characterizer.settings.resume = args.resume
+    characterizer.settings.defer_plots = args.defer_plots
 
     # Filter and add cells
     if args.filters:
         cells = utils.filter_cells(cells, args.filters)
         if not cells:
             raise RuntimeError("No cells left after filtering!")
-    [characterizer.add_cell(n, p) for (n, p) in utils.read_cell_configs(cells)]
+    [characterizer.add_cell(n, p) for (n, p) in utils.read_cell_configs(cells, loader)]
+    loader.save()
 
     # Characterize
-    liberty = characterizer.characterize()
+    characterizer.characterize()
+
+    # Merge the new cells into an existing library if requested
+    if args.update:
+        library = read_library(args.update)
+        library.update_cells(characterizer.library)
+        characterizer.library = library
 
     # Write to file
     if args.output:
         libfile = Path(args.output)
         if libfile.is_dir():
             libfile = libfile / characterizer.library.file_name
+    elif args.update:
+        libfile = Path(args.update)
     else:
         libfile = characterizer.settings.results_dir / characterizer.library.file_name
-    libfile.parent.mkdir(parents=True, exist_ok=True)
-    with open(libfile, 'w') as f:
-        f.write(str(liberty))
-        if not characterizer.settings.quiet:
-             print(f'Results written to {str(libfile.resolve())}')
+    characterizer.write_library(libfile)
+    if not characterizer.settings.quiet:
+        print(f'Results written to {str(libfile.resolve())}')
 
     # Run any post-characterization analysis
     if args.comparewith:
-        compare(args.comparewith, library)
+        from charlib.cli.compare import compare # Pulls in liberty.parser and matplotlib
+        compare(args.comparewith, characterizer.library.to_liberty(precision=6))
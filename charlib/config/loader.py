@@ -0,0 +1,226 @@
+"""Finds and loads CharLib YAML configuration files, reusing work from previous runs
+
+A library directory may hold thousands of YAML files (for example, one per cell), possibly on slow
+network storage. ConfigLoader walks each directory once per run, parses YAML with the LibYAML
+bindings where available, and keeps every parsed file and validated configuration in a cache file.
+Cache entries are reused as long as the files they were read from have the same modification times
+and sizes, or failing that the same contents.
+"""
+
+import os, pickle
+from pathlib import Path
+
+import yaml
+from schema import SchemaError
+
+from charlib.cache import file_digest, write_atomic
+from charlib.config import syntax
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError: # PyYAML was built without LibYAML
+    from yaml import SafeLoader
+
+YAML_SUFFIXES = ('.yaml', '.yml')
+
+_MISSING = object() # Marks cache misses, since None is a valid cached value
+
+
+def load_yaml(path):
+    """Parse the YAML file at path."""
+    with open(path, 'rb') as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+class YamlIndex:
+    """The YAML files under each directory searched, found with a single walk per directory tree."""
+
+    def __init__(self):
+        self._trees = {} # Root directory -> YAML files anywhere under it
+
+    def files(self, path) -> list:
+        """Return a list of Paths to all YAML files at or under path.
+
+        Files ending in .yaml are listed before files ending in .yml. Each are listed from the
+        shallowest to the deepest, then by path.
+        """
+        path = Path(path)
+        if path.is_file():
+            return [path]
+        if not path.is_dir():
+            return []
+        path = path.resolve()
+        for (root, files) in self._trees.items():
+            if root == path:
+                return files
+            if root in path.parents:
+                return [file for file in files if path in file.parents]
+        files = [Path(directory) / name
+                 for (directory, _, names) in os.walk(path)
+                 for name in names if name.endswith(YAML_SUFFIXES)]
+        files.sort(key=lambda file: (file.suffix != '.yaml', len(file.parts), file))
+        # Drop trees under this one, since it now covers them
+        self._trees = {root: tree for (root, tree) in self._trees.items()
+                       if path not in root.parents}
+        self._trees[path] = files
+        return files
+
+
+class ConfigLoader:
+    """Finds and loads CharLib configuration, caching parsed and validated files.
+
+    :param cache_dir: (Optional) The directory to keep the config cache in. If None, nothing is
+                      cached between runs.
+    :param quiet: If False, explain why each file that isn't a valid configuration was skipped.
+    """
+
+    # Bumped whenever the format of cache entries changes
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_dir=None, quiet=True):
+        self.index = YamlIndex()
+        self.quiet = quiet
+        self.cache_path = Path(cache_dir) / 'configs.pickle' if cache_dir else None
+        # Validated configs are only reusable while the schema they were validated with is unchanged
+        self.schema = (self.CACHE_VERSION, file_digest(syntax.__file__))
+        self.entries = {}
+        self._changed = False
+        if self.cache_path:
+            try:
+                with open(self.cache_path, 'rb') as file:
+                    (schema, entries) = pickle.load(file)
+                if schema == self.schema:
+                    self.entries = entries
+            except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+                pass # Missing or unreadable caches are treated as empty
+
+    def _log(self, message):
+        if not self.quiet:
+            print(message)
+
+    def _cached(self, kind, path):
+        """Return a fresh copy of the value cached for path, or _MISSING if it is stale or absent"""
+        entry = self.entries.get((kind, str(path)))
+        if entry is None:
+            return _MISSING
+        (data, stamps) = entry
+        for (dependency, (mtime_ns, size, digest)) in stamps.items():
+            try:
+                stat = os.stat(dependency)
+            except OSError:
+                return _MISSING
+            if (stat.st_mtime_ns, stat.st_size) == (mtime_ns, size):
+                continue
+            # The file was touched. It's only stale if its contents changed.
+            if file_digest(dependency) != digest:
+                return _MISSING
+            stamps[dependency] = (stat.st_mtime_ns, stat.st_size, digest)
+            self._changed = True
+        # Values are kept pickled, so callers are free to modify what they're given
+        return pickle.loads(data)
+
+    def _store(self, kind, path, value, dependencies):
+        stamps = {}
+        for dependency in dependencies:
+            stat = os.stat(dependency)
+            stamps[str(dependency)] = (stat.st_mtime_ns, stat.st_size, file_digest(dependency))
+        self.entries[(kind, str(path))] = (pickle.dumps(value), stamps)
+        self._changed = True
+
+    def save(self):
+        """Write new and updated cache entries to the cache file."""
+        if self.cache_path and self._changed:
+            write_atomic(self.cache_path, pickle.dumps((self.schema, self.entries)))
+            self._changed = False
+
+    def yaml_files(self, path) -> list:
+        """Return a list of Paths to all YAML files at or under path."""
+        return self.index.files(path)
+
+    def load_yaml(self, path):
+        """Parse the YAML file at path, or return its cached contents.
+
+        :raises yaml.YAMLError: If the file contains invalid YAML.
+        """
+        path = Path(path).resolve()
+        value = self._cached('yaml', path)
+        if value is _MISSING:
+            value = load_yaml(path)
+            self._store('yaml', path, value, [path])
+        return value
+
+    def resolve_subkey(self, value, base_dir, dependencies=None):
+        """If a config value ends in .yml or .yaml, resolve it to the YAML contents.
+
+        :param dependencies: (Optional) A list to append the path of any file read to.
+        """
+        if isinstance(value, str):
+            if not value.lower().endswith(YAML_SUFFIXES):
+                return value
+            possible_yamls = self.yaml_files(Path(base_dir) / value)
+            if len(possible_yamls) != 1:
+                raise ValueError(f'Unable to resolve {value} to a unique existing file')
+            if dependencies is not None:
+                dependencies.append(possible_yamls[0])
+            return self.load_yaml(possible_yamls[0])
+        return value
+
+    def _validate(self, file):
+        """Return the validated config in file, or None if it isn't a valid config"""
+        try:
+            config = self.load_yaml(file)
+        except yaml.YAMLError as e:
+            self._log(e)
+            self._log(f'Skipping "{str(file)}": file contains invalid YAML')
+            self._store('config', file.resolve(), None, [file])
+            return None
+        # Ensure the file contains a config dictionary. Files with other top-level keys (such as
+        # individual cell configs) can't pass validation, so skip them without trying.
+        if not isinstance(config, dict) or not config.keys() <= {'settings', 'cells'}:
+            self._log(f'Skipping "{str(file)}": file does not contain a config dict')
+            self._store('config', file.resolve(), None, [file])
+            return None
+        # Substitute in config keys which point to other YAML files or directories
+        dependencies = [file]
+        config = {k: self.resolve_subkey(v, file.parent, dependencies) for k, v in config.items()}
+        # Validate the schema
+        try:
+            config = syntax.ConfigFile.validate(config)
+        except SchemaError:
+            self._log(f'Skipping "{str(file)}": file does not contain a valid CharLib config')
+            config = None
+        self._store('config', file.resolve(), config, dependencies)
+        return config
+
+    def find_config(self, config_path):
+        """Find an appropriately-formatted YAML file in config_path and return its validated config.
+
+        :raises FileNotFoundError: If no valid configuration is found.
+        """
+        self._log(f'Searching for YAML files at {str(config_path)}')
+        for file in self.yaml_files(config_path):
+            config = self._cached('config', file.resolve())
+            if config is _MISSING:
+                config = self._validate(file)
+            if isinstance(config, dict):
+                return config
+        raise FileNotFoundError(f'No valid configuration found in {config_path}')
+
+    def read_cell_configs(self, cells):
+        """Yield cell names and property dicts from a dict of cells.
+
+        This function also handles the case where cell properties are stored in another file. In
+        this case it reads the file and makes sure the properties are in dict format."""
+        for name, properties in cells.items():
+            # If properties is a (name, filepath) pair, fetch cell config from YAML at filepath
+            if isinstance(properties, str):
+                # Search the directory for valid YAML
+                for file in self.yaml_files(properties):
+                    try:
+                        properties = self.load_yaml(file)
+                        break # Quit searching after successfully reading a match
+                    except yaml.YAMLError as e:
+                        self._log(e)
+                        self._log(f'Skipping "{str(file)}": file contains invalid YAML')
+                        continue
+            yield (name, properties)
@@ -30,8 +30,8 @@ class ConfigFile:
                         '* Using the syntax ``path/to/file`` will result in ' \
                         '``.include path/to/file`` in SPICE simulations.\n' \
                         '* Using the syntax ``path/to/dir`` will allow CharLib to search the ' \
-                        'directory for subcircuits used in a particular cell and include them using '\
-                        '``.include path/to/dir/file``.\n' \
+                        'directory for models and subcircuits used in a particular cell and ' \
+                        'include only those. This requires the ``subset_models`` setting.\n' \
                         '* Using the syntax ``path/to/file section`` will result in ' \
                         '``.lib path/to/file section`` in SPICE simulations.'
         ) : [str],
@@ -476,6 +476,52 @@ class ConfigFile:
                             'keyword is set to ``True``'
             ), default='debug'
         ) : str,
+        Optional(
+            Literal(
+                'use_cache',
+                description='Reuse stored results of previously-run simulations. Simulations are ' \
+                            'identified by their SPICE deck and the contents of every netlist ' \
+                            'and model file they include, so changing a cell or model always ' \
+                            'triggers a fresh simulation. Using the ``--no-cache`` flag on the ' \
+                            'command line overrides this value.'
+            ), default=True
+        ) : bool,
+        Optional(
+            Literal(
+                'cache_dir',
+                description='The directory where CharLib stores cached simulation results. If ' \
+                            'omitted, CharLib uses ``$XDG_CACHE_HOME/charlib`` (usually ' \
+                            '``~/.cache/charlib``).'
+            )
+        ) : str,
+        Optional(
+            Literal(
+                'subset_models',
+                description='Trim model files to only the models and subcircuits used by each ' \
+                            'cell netlist before simulating. Trimmed files are stored in the ' \
+                            'cache directory. This greatly reduces the time the simulator spends ' \
+                            'parsing large PDK model decks. Must be enabled to use a directory ' \
+                            'of model files as a model.'
+            ), default=True
+        ) : bool,
+        Optional(
+            Literal(
+                'extract_netlists',
+                description='Copy each cell\'s subcircuit (and any subcircuits it instantiates) ' \
+                            'from its netlist into a separate file in the cache directory, and ' \
+                            'simulate using that file. This keeps the simulator from parsing the ' \
+                            'entire library netlist for every simulation.'
+            ), default=True
+        ) : bool,
+        Optional(
+            Literal(
+                'keep_waveforms',
+                description='Save the input and output waveforms of each delay and metastability ' \
+                            'simulation to memory-mapped files in ``results_dir/waveforms``, for ' \
+                            'debugging or later analysis. Waveforms needed for ``io`` plots are ' \
+                            'always saved.'
+            ), default=False
+        ) : bool,
         Optional(
             Literal(
                 'omit_on_failure',
@@ -4,6 +4,7 @@ import re
 from collections import UserDict
 
 INDENT_STR = '  '
+NAME_REGEX = re.compile(r'^\w+$')
 
 
 class Statement:
@@ -14,7 +15,7 @@ class Statement:
 
     @name.setter
     def name(self, name):
-        if not re.match(r'^\w+$', name):
+        if not NAME_REGEX.match(name):
             raise ValueError('Liberty object names must consist of only alphanumeric characters and underscores!')
         self._name = name
 
@@ -22,32 +23,120 @@ class Statement:
     def unique_key(self):
         return (self.name, self.identifier)
 
-    def to_liberty(self, indent=0, precision=6):
+    def to_liberty(self, indent_level=0, precision=1, **kwargs) -> str:
+        """Convert this statement to a Liberty-format string
+
+        :param indent_level: The level of indentation to use. Default 0.
+        :param precision: The number of digits to use when displaying float values. Default 1.
+        """
+        return '\n'.join(self.liberty_lines(indent_level, precision=precision, **kwargs))
+
+    def liberty_lines(self, indent_level=0, precision=1, **kwargs):
+        """Yield the lines of this statement in Liberty format, without trailing newlines"""
         return NotImplemented
 
+    def write_liberty(self, file, indent_level=0, precision=1, **kwargs):
+        """Write this statement in Liberty format to a text file object.
+
+        Lines are written as they are generated, so the full text is never held in memory. The
+        output is identical to to_liberty.
+
+        :param file: A writable text file object.
+        :param indent_level: The level of indentation to use. Default 0.
+        :param precision: The number of digits to use when displaying float values. Default 1.
+        """
+        lines = self.liberty_lines(indent_level, precision=precision, **kwargs)
+        file.write(next(lines, ''))
+        for line in lines:
+            file.write('\n')
+            file.write(line)
+
 
 class Group(Statement):
 
+    # Distinguishes groups which would otherwise share a key with an earlier sibling, such as
+    # state-dependent timing arcs read from a file. Part of unique_key when nonzero.
+    repeat = 0
+
     class SubGroupDict(UserDict):
-        """Custom dictionary with auto-updating keys. Used for keeping track of subgroups."""
+        """Custom dictionary with auto-updating keys. Used for keeping track of subgroups.
+
+        Also maintains an index of subgroups by name, and keeps the owning group's counts of
+        descendant group names up to date (see Group.subgroups_with_name).
+        """
+
+        def __init__(self, owner=None):
+            super().__init__()
+            self.owner = owner
+            self.names = {} # group name -> {key: group}, in the same order as self.data
 
         def __setitem__(self, key, value):
             survivor = self._update_key(key, value)
             survivor._bind_to_parent_group(self)
 
+        def __delitem__(self, key):
+            self._detach(key)
+
+        def replace(self, group):
+            """Replace the subgroup with the same key as group, keeping its position."""
+            key = group.unique_key
+            old_group = self.data[key]
+            self._propagate(old_group, -1)
+            old_group._bind_to_parent_group(None)
+            self.data[key] = group
+            self.names[group.name][key] = group
+            group._bind_to_parent_group(self)
+            self._propagate(group, 1)
+
+        def _attach(self, key, group):
+            self.data[key] = group
+            self.names.setdefault(group.name, {})[key] = group
+            group._bind_to_parent_group(self)
+            self._propagate(group, 1)
+
+        def _detach(self, key):
+            group = self.data.pop(key)
+            del self.names[group.name][key]
+            if not self.names[group.name]:
+                del self.names[group.name]
+            group._bind_to_parent_group(None)
+            self._propagate(group, -1)
+            return group
+
+        def _propagate(self, group, sign):
+            # Add (or remove) group and its descendants to the name counts of every ancestor
+            changes = [(group.name, sign), *((name, sign * count)
+                                             for (name, count) in group._subtree_counts.items())]
+            ancestor = self.owner
+            while ancestor is not None:
+                counts = ancestor._subtree_counts
+                for (name, change) in changes:
+                    count = counts.get(name, 0) + change
+                    if count:
+                        counts[name] = count
+                    else:
+                        del counts[name]
+                parent_dict = ancestor._parent_dict
+                ancestor = parent_dict.owner if parent_dict else None
+
         def _update_key(self, key, value):
             new_key = value.unique_key
             existing_group = self.data.get(new_key)
             if existing_group and existing_group is not value:
                 # Rekeying value collided with an existing sibling. Rather than raising, merge
                 # the sibling into value, since both represent the same logical subgroup.
-                del self.data[new_key]
+                self._detach(new_key)
+                if self.data.get(key) is value:
+                    self._detach(key)
                 existing_group.merge(value)
                 value = existing_group
                 new_key = value.unique_key
             if key in self.data and key != new_key:
-                del self.data[key]
-            self.data[new_key] = value
+                self._detach(key)
+            if self.data.get(new_key) is not value:
+                if new_key in self.data:
+                    self._detach(new_key)
+                self._attach(new_key, value)
             return value
 
     def __init__(self, group_name: str, group_id: str=''):
@@ -63,9 +152,10 @@ class Group(Statement):
         """
         self.name = group_name
         self.identifier = group_id # TODO: Validate
-        self.groups = self.SubGroupDict()
-        self.attributes = dict()
+        self._subtree_counts = {} # Number of descendant groups with each name
         self._parent_dict = None
+        self.groups = self.SubGroupDict(self)
+        self.attributes = dict()
 
     def _bind_to_parent_group(self, parent_group_dict):
         self._parent_dict = parent_group_dict
@@ -94,11 +184,13 @@ class Group(Statement):
     def unique_key(self):
         # overrides for groups which are not uniquely identifiable by group name and identifier
         if self.name == 'timing' and self.attributes.get('related_pin') and self.attributes.get('timing_type'):
-            return (self.name, self.attributes.get('related_pin').value,
-                    self.attributes.get('timing_type').value)
+            key = (self.name, self.attributes.get('related_pin').value,
+                   self.attributes.get('timing_type').value)
         elif self.name == 'leakage_power' and self.attributes.get('when'):
-            return (self.name, self.attributes.get('when').value)
-        return super().unique_key
+            key = (self.name, self.attributes.get('when').value)
+        else:
+            key = super().unique_key
+        return (*key, self.repeat) if self.repeat else key
 
     def add_group(self, group, group_id=''):
         """Add a subgroup.
@@ -133,9 +225,11 @@ class Group(Statement):
         try:
             return self.groups[(name, identifier)]
         except KeyError as e:
-            if attributes: # Fall back to subgroup search
-                groups = self.filter_subgroups(name, identifier, **attributes)
-                groups = [g for g in groups if self.groups.get(g.unique_key) is g]
+            if attributes: # Fall back to searching subgroups with this name
+                groups = [g for g in self.groups.names.get(name, {}).values()
+                          if not identifier or g.identifier == identifier]
+                groups = [g for g in groups
+                          if all(g.attributes.get(k) == (k,v) for k,v in attributes.items())]
                 if len(groups) != 1:
                     raise KeyError(f'Subgroup search found {len(groups)} matching groups!') from e
                 return groups[0]
@@ -145,12 +239,22 @@ class Group(Statement):
     def subgroups_with_name(self, name: str):
         """Yield subgroups with the specified name.
 
+        Subgroups of matching subgroups are not searched. Each group keeps counts of the group
+        names in its subtree, so only branches containing matches are visited.
+
         :param name: The subgroup name (i.e. 'timing' or 'cell') to search for.
         """
+        count = self._subtree_counts.get(name, 0)
+        if not count:
+            return
+        children = self.groups.names.get(name, {})
+        if len(children) == count: # Every match is a direct child
+            yield from children.values()
+            return
         for group in self.groups.values():
             if group.name == name:
                 yield group
-            elif group.groups:
+            elif group._subtree_counts.get(name):
                 yield from group.subgroups_with_name(name)
 
     def filter_subgroups(self, name: str, identifier='', **attributes):
@@ -198,20 +302,19 @@ class Group(Statement):
         if self._parent_dict:
             self._parent_dict._update_key(old_key, self)
 
-    def to_liberty(self, indent_level=0, precision=1, **kwargs):
-        """Convert this group to a Liberty-format string
+    def liberty_lines(self, indent_level=0, precision=1, **kwargs):
+        """Yield the lines of this group in Liberty format
 
         :param indent_level: The level of indentation to use. Default 0.
         :param precision: The number of digits to use when displaying float values. Default 1.
         """
         indent = INDENT_STR * indent_level
-        group_str = [f'{indent}{self.name} ({self.identifier}) {{']
+        yield f'{indent}{self.name} ({self.identifier}) {{'
         for attr in self.attributes.values():
-            group_str += [attr.to_liberty(indent_level+1, precision=precision, **kwargs)]
+            yield attr.to_liberty(indent_level+1, precision=precision, **kwargs)
         for group in self.groups.values():
-            group_str += group.to_liberty(indent_level+1, precision=precision, **kwargs).split('\n')
-        group_str += [f'{indent}}} /* end {self.name} */']
-        return '\n'.join(group_str)
+            yield from group.liberty_lines(indent_level+1, precision=precision, **kwargs)
+        yield f'{indent}}} /* end {self.name} */'
 
 
 class Attribute(Statement):
@@ -263,7 +366,7 @@ class Attribute(Statement):
         :param value: A string value that may or may not need to be enclosed in quotes
         """
         value = value.strip()
-        if value[0].isnumeric() or not re.match(r'^\w+$', value):
+        if not value or value[0].isnumeric() or not NAME_REGEX.match(value):
             return f'"{value}"'
         else:
             return value
@@ -285,6 +388,10 @@ class Attribute(Statement):
         else: # Assume int or bool, but don't prevent other types
             return f'{indent}{self.name} : {self.value} ;'
 
+    def liberty_lines(self, indent_level=0, precision=1, **kwargs):
+        """Yield this Attribute as a single line in Liberty format"""
+        yield self.to_liberty(indent_level, precision=precision, **kwargs)
+
 
 class Define(Attribute):
     """A define is basically a complex attribute with a bit more input validation"""
@@ -1,4 +1,6 @@
-import itertools
+import gzip, itertools
+from pathlib import Path
+
 import numpy as np
 
 import charlib.liberty.liberty as liberty
@@ -52,33 +54,87 @@ class Library(liberty.Group):
         op_conditions.add_attribute('temperature', self.attributes['nom_temperature'].value, self.attributes['nom_temperature'].precision)
         self.add_group(op_conditions)
 
+    @classmethod
+    def empty(cls, name, file_name=None):
+        """Construct a library group without any of the default attributes or groups.
+
+        Used when reading existing Liberty files, which say everything the library needs.
+
+        :param name: The library name.
+        :param file_name: (Optional) The file name to write the library to. Defaults to
+                          '<name>.lib'.
+        """
+        library = cls.__new__(cls)
+        liberty.Group.__init__(library, 'library', name)
+        library.file_name = file_name or f'{name}.lib'
+        return library
+
     @property
     def cells(self) -> list:
         """Return cell groups."""
-        return [group for group in self.groups if group.name == 'cell']
+        return list(self.groups.names.get('cell', {}).values())
+
+    def add_table_templates(self):
+        """Add the lu_table_template of every timing table in this library, if not already present."""
+        templates = {} # Many tables share each template, so only add each one once
+        for timing_group in self.subgroups_with_name('timing'):
+            for lut_group in timing_group.groups.values():
+                templates[lut_group.template.unique_key] = lut_group.template
+        [self.add_group(template) for template in templates.values()]
 
-    def to_liberty(self, **kwargs):
-        """Convert this library to a Liberty-format string.
+    def update_cells(self, other):
+        """Replace or add each cell in another library, keeping the rest of this library as-is.
+
+        Cells which already exist keep their position in this library. Lookup table templates from
+        other are added as well. Groups are moved from other rather than copied.
+
+        :param other: The library to take cells from.
+        """
+        for template in list(other.subgroups_with_name('lu_table_template')):
+            self.add_group(template)
+        for cell in other.cells:
+            if cell.unique_key in self.groups:
+                self.groups.replace(cell)
+            else:
+                self.add_group(cell)
+
+    def liberty_lines(self, indent_level=0, **kwargs):
+        """Yield the lines of this library in Liberty format.
 
         :param precision: Digits of floating-point precision to display. Default 1
         """
         # TODO: Rework precision kwarg into a dict of group.name: precision values
         # Library display order is specialized
-        lib_str = [f'{self.name} ({self.identifier}){{']
+        yield f'{self.name} ({self.identifier}){{'
         for attr in self.ordered_attributes:
             if attr in self.attributes:
-                lib_str += [self.attributes[attr].to_liberty(1, **kwargs)]
+                yield self.attributes[attr].to_liberty(1, **kwargs)
         for key, attr in self.attributes.items():
             if key not in self.ordered_attributes:
-                lib_str += [attr.to_liberty(1, **kwargs)]
+                yield attr.to_liberty(1, **kwargs)
         for group_name in self.ordered_groups:
             for group in self.subgroups_with_name(group_name):
-                lib_str += group.to_liberty(1, **kwargs).split('\n')
+                yield from group.liberty_lines(1, **kwargs)
         for group in self.groups.values():
             if group.name not in self.ordered_groups:
-                lib_str += group.to_liberty(1, **kwargs).split('\n')
-        lib_str += [f'}} /* end {self.name} */']
-        return '\n'.join(lib_str)
+                yield from group.liberty_lines(1, **kwargs)
+        yield f'}} /* end {self.name} */'
+
+    def write(self, file, **kwargs):
+        """Write this library in Liberty format to a file, streaming it line by line.
+
+        :param file: A path or writable text file object. Paths ending in .gz are compressed with
+                     gzip.
+        :param precision: Digits of floating-point precision to display. Default 1
+        """
+        if not isinstance(file, (str, Path)):
+            self.write_liberty(file, **kwargs)
+            return
+        path = Path(file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        opener = gzip.open if path.suffix == '.gz' else open
+        with opener(path, 'wt', encoding='utf-8') as f:
+            self.write_liberty(f, **kwargs)
 
 
 class LookupTableTemplate(liberty.Group):
@@ -104,29 +160,28 @@ class LookupTableTemplate(liberty.Group):
         """Return size as a shape-like tuple"""
         return tuple(self.variables.values())
 
-    def to_liberty(self, indent_level=0, **kwargs):
+    def liberty_lines(self, indent_level=0, **kwargs):
         # LUT template display order is specialized
         indent = liberty.INDENT_STR * indent_level
-        lut_str = [f'{indent}{self.name} ({self.identifier}) {{']
+        yield f'{indent}{self.name} ({self.identifier}) {{'
 
         # Construct & display variables
         index = 0
         for variable in self.variables.keys():
             index += 1
-            lut_str += [liberty.Attribute(f'variable_{index}', variable).to_liberty(indent_level+1, **kwargs)]
+            yield liberty.Attribute(f'variable_{index}', variable).to_liberty(indent_level+1, **kwargs)
 
         # Construct & display indices
         index = 0
         for length in self.variables.values():
             index += 1
             values = ['"'+', '.join([str(1.0+i) for i in range(length)])+'"']
-            lut_str += [liberty.Attribute(f'index_{index}', values).to_liberty(indent_level+1, **kwargs)]
+            yield liberty.Attribute(f'index_{index}', values).to_liberty(indent_level+1, **kwargs)
 
         # LUT templates may also have sub-groups, but no attributes
         for group in self.groups.values():
-            lut_str += group.to_liberty(indent_level+1, **kwargs).split('\n')
-        lut_str += [f'{indent}}} /* end {self.name} */']
-        return '\n'.join(lut_str)
+            yield from group.liberty_lines(indent_level+1, **kwargs)
+        yield f'{indent}}} /* end {self.name} */'
 
 
 class LookupTable(liberty.Group):
@@ -163,19 +218,70 @@ class LookupTable(liberty.Group):
         # Store table values as a matrix
         self.values = np.zeros(self.size)
 
+    @classmethod
+    def from_arrays(cls, lut_name, template_name, variables, index_values, values,
+                    index_maps=None):
+        """Construct a lookup table directly from numpy arrays, without copying them.
+
+        This is much faster than __init__ when building many tables, such as when reading a
+        Liberty file. Tables may share index arrays and index maps, since LookupTable replaces
+        them rather than modifying them in place.
+
+        :param lut_name: The name of the lookup table.
+        :param template_name: The name of the lu_table_template the table uses.
+        :param variables: A list of variable names, one per index.
+        :param index_values: A list of numpy arrays of index values, one per variable.
+        :param values: A numpy array of table values, with one axis per variable.
+        :param index_maps: (Optional) A list of index maps (see index_map), one per variable. If
+                           None, they are built from index_values.
+        """
+        table = cls.__new__(cls)
+        liberty.Group.__init__(table, lut_name, template_name)
+        table.template = LookupTableTemplate(template_name, **{variable: len(index)
+            for (variable, index) in zip(variables, index_values)})
+        if index_maps is None:
+            table.index_values = list(index_values)
+        else:
+            table._index_values = list(index_values)
+            table._index_maps = list(index_maps)
+        table.values = values
+        return table
+
+    @staticmethod
+    def index_map(index) -> dict:
+        """Return a map from each value in index to its position"""
+        return {float(v): i for (i, v) in enumerate(index)}
+
     @property
     def size(self):
         """Return template size"""
         return self.template.size
 
+    @property
+    def index_values(self):
+        """Return a list of numpy arrays of index values, one for each variable"""
+        return self._index_values
+
+    @index_values.setter
+    def index_values(self, index_values):
+        # Keep a value -> position map for each index so lookups don't need to search
+        self._index_values = index_values
+        self._index_maps = [self.index_map(values) for values in index_values]
+
+    def covers(self, other) -> bool:
+        """Return whether every index value of LookupTable other is also present in this table."""
+        return all(float(value) in index_map
+                   for (index_map, values) in zip(self._index_maps, other.index_values)
+                   for value in values)
+
     def _get_indices(self, *index_values):
         """Determine the indices matching the ordered list of index values passed"""
         indices = []
         for key, i in zip(index_values, range(len(self.size))):
             try:
-                indices += [int(np.argwhere(self.index_values[i] == key)[0][0])]
-            except IndexError:
-                raise KeyError(f'index_{i+1} contains no such value: {key}')
+                indices += [self._index_maps[i][float(key)]]
+            except KeyError:
+                raise KeyError(f'index_{i+1} contains no such value: {key}') from None
         return indices
 
     def __getitem__(self, keys):
@@ -194,6 +300,14 @@ class LookupTable(liberty.Group):
         if not self.template.variables.keys() == other.template.variables.keys():
             raise ValueError('LUT template variable names must match in order to merge!')
 
+        # If other fits within this table's indices, just fill its values in, preferring nonzeros
+        if self.covers(other):
+            for index_values in itertools.product(*other.index_values):
+                indices = tuple(self._get_indices(*index_values))
+                if not self.values[indices]:
+                    self.values[indices] = other[*index_values]
+            return
+
         # Merge LUT variable values
         merged_template_variables = {}
         merged_index_values = []
@@ -214,29 +328,29 @@ class LookupTable(liberty.Group):
         self.values = merged_values
 
 
-    def to_liberty(self, indent_level=0, precision=1, **kwargs):
+    def liberty_lines(self, indent_level=0, precision=1, **kwargs):
         # LUT display requires reformatting indices and variables
         indent = liberty.INDENT_STR * indent_level
         inner_indent = liberty.INDENT_STR * (indent_level + 1)
         value_indent = liberty.INDENT_STR * (indent_level + 2)
 
-        lut_str = [f'{indent}{self.name} ({self.identifier}) {{']
+        yield f'{indent}{self.name} ({self.identifier}) {{'
 
         # Display index values
         for i in range(len(self.index_values)):
             index_values = [f"{v:.{precision}f}" for v in self.index_values[i]]
-            lut_str += [f'{inner_indent}index_{i+1} ("{", ".join(index_values)}") ;']
+            yield f'{inner_indent}index_{i+1} ("{", ".join(index_values)}") ;'
 
-        # Display LUT values
-        lut_str += [f'{inner_indent}values ( \\']
+        # Display LUT values, formatting the whole table at once
+        yield f'{inner_indent}values ( \\'
+        table = self.values if self.values.ndim > 1 else self.values[np.newaxis] # 1D: one row
+        values = np.char.mod(f'%.{precision}f', np.atleast_3d(table))
         sets = 1 if len(self.index_values) < 3 else len(self.index_values[2])
         for s in range(sets):
-            for i in range(len(self.index_values[0])):
-                values = [f"{v:.{precision}f}" for v in np.atleast_3d(self.values)[i,:,s]]
-                lut_str += [f'{value_indent}"{", ".join(values)}" \\']
-        lut_str += [f'{inner_indent}) ;']
-        lut_str += [f'{indent}}} /* end {self.name} */']
-        return '\n'.join(lut_str)
+            for i in range(values.shape[0]):
+                yield f'{value_indent}"{", ".join(values[i,:,s])}" \\'
+        yield f'{inner_indent}) ;'
+        yield f'{indent}}} /* end {self.name} */'
 
 
 if __name__ == "__main__":
@@ -0,0 +1,223 @@
+"""Read Liberty files into charlib.liberty Groups, Attributes and LookupTables.
+
+The file is memory-mapped and split into tokens by a single regular expression, so large vendor
+libraries never need to be held in memory as Python strings. Groups whose contents match a known
+lu_table_template (such as cell_rise or rise_power) are read as LookupTables, so they can be merged
+with freshly characterized tables.
+"""
+
+import gc, gzip, math, mmap, re
+from pathlib import Path
+
+import numpy as np
+
+from charlib.liberty import liberty
+from charlib.liberty.library import Library, LookupTable, LookupTableTemplate
+
+# Comments, strings, punctuation and words, in that order. Anything else (whitespace and
+# backslash line continuations) is skipped.
+TOKEN_REGEX = re.compile(rb'/\*.*?\*/|"[^"\\]*(?:\\.[^"\\]*)*"|[{}();:,]|[^\s{}();:,"\\]+',
+                         re.DOTALL)
+
+# Table attributes holding index values, by position
+INDEX_NAMES = ('index_1', 'index_2', 'index_3')
+
+# Simple attribute values which are written as plain decimals keep their precision
+DECIMAL_REGEX = re.compile(r'^[-+]?\d*\.(\d+)$')
+
+
+def read_library(path) -> Library:
+    """Read a Liberty file and return its library group.
+
+    :param path: The Liberty file to read. Paths ending in .gz are decompressed with gzip.
+    """
+    path = Path(path)
+    if path.suffix == '.gz':
+        with gzip.open(path, 'rb') as file:
+            return parse_library(file.read(), path.name.removesuffix('.gz'))
+    with open(path, 'rb') as file:
+        if path.stat().st_size == 0:
+            raise ValueError(f'Liberty file "{path}" is empty')
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parse_library(data, path.name)
+
+
+def parse_library(data, file_name=None) -> Library:
+    """Parse Liberty text and return its library group.
+
+    :param data: The Liberty source, as bytes, str or a buffer such as an mmap.
+    :param file_name: (Optional) The file name to use when writing the library back out. Defaults
+                      to '<library name>.lib'.
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    # Reading creates many small objects, which would otherwise trigger repeated full collections
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        library = LibertyReader(data).read()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    if not isinstance(library, Library):
+        raise ValueError(f'Expected a library group, found {library.name}')
+    if file_name:
+        library.file_name = file_name
+    return library
+
+
+def _value(token: str):
+    """Convert a simple attribute value token to a Python value and display precision"""
+    if token.startswith('"'):
+        return (token[1:-1], None)
+    try:
+        return (int(token), None)
+    except ValueError:
+        pass
+    try:
+        value = float(token)
+    except ValueError:
+        return (token, None)
+    decimals = DECIMAL_REGEX.match(token)
+    return (value, len(decimals.group(1)) if decimals else None)
+
+
+def _floats(values) -> np.ndarray:
+    """Convert a list of quoted, comma-separated number strings to a 2D array, one row each"""
+    return np.array([value.strip('"').replace('\\\n', '').split(',') for value in values],
+                    dtype=float)
+
+
+class LibertyReader:
+    """Builds Liberty groups from a stream of tokens.
+
+    Groups are attached to their parents once they are complete, so each group's key (which may
+    depend on attributes such as related_pin) only has to be computed once.
+
+    :param data: The Liberty source, as bytes or a buffer such as an mmap.
+    """
+
+    def __init__(self, data):
+        self.tokens = map(re.Match.group, TOKEN_REGEX.finditer(data))
+        self.templates = {} # lu_table_template name -> (variable names, index arrays, index maps)
+
+    def read(self) -> liberty.Group:
+        """Read the first top-level group"""
+        stack = [] # Open groups, each as [group, {attribute name or group key: repeats}]
+        token = next(self.tokens, None)
+        while token is not None:
+            if token == b'}':
+                (group, _) = stack.pop()
+                group = self._close(group)
+                if not stack:
+                    return group
+                self._attach(*stack[-1], group)
+                token = next(self.tokens, None)
+                continue
+            if token == b';' or token.startswith(b'/*'):
+                token = next(self.tokens, None)
+                continue
+
+            name = token.decode()
+            separator = next(self.tokens, None)
+            if separator == b':':
+                (value, precision) = _value(next(self.tokens).decode())
+                self._add_attribute(stack, liberty.Attribute(name, value, precision))
+                token = next(self.tokens, None)
+            elif separator == b'(':
+                arguments = []
+                for token in self.tokens:
+                    if token == b')':
+                        break
+                    if token != b',':
+                        arguments.append(token.decode())
+                token = next(self.tokens, None)
+                if token == b'{':
+                    stack.append([self._open(name, arguments, not stack), {}])
+                    token = next(self.tokens, None)
+                else: # Complex attribute, possibly without a trailing semicolon
+                    self._add_attribute(stack, liberty.Attribute(name, arguments))
+            else:
+                raise ValueError(f'Unexpected token {separator!r} after "{name}"')
+        raise ValueError('Unexpected end of Liberty file')
+
+    def _add_attribute(self, stack, attribute):
+        if not stack:
+            raise ValueError(f'Attribute "{attribute.name}" is outside of any group')
+        (group, counts) = stack[-1]
+        count = counts.get(attribute.name, 0)
+        counts[attribute.name] = count + 1
+        # Some attributes (such as define) may be repeated. Store repeats under distinct keys so
+        # they are all kept.
+        group.attributes[attribute.name if not count else (attribute.name, count)] = attribute
+
+    def _open(self, name, arguments, is_root) -> liberty.Group:
+        # Keep comments (which CharLib uses to name timing groups) but drop quotes
+        identifier = ', '.join(argument if argument.startswith('/*') else argument.strip('"')
+                               for argument in arguments)
+        if is_root and name == 'library':
+            # Skip Library's defaults: the file says everything we need to know
+            return Library.empty(identifier)
+        return liberty.Group(name, identifier)
+
+    def _close(self, group) -> liberty.Group:
+        """Convert a finished group to a more specific type if appropriate"""
+        attributes = group.attributes
+        if group.name == 'lu_table_template' or group.name.endswith('_template'):
+            variables = []
+            indices = []
+            while f'variable_{len(variables)+1}' in attributes:
+                variables.append(attributes[f'variable_{len(variables)+1}'].value)
+                index = attributes.get(f'index_{len(variables)}')
+                indices.append(_floats(index.value).ravel() if index else None)
+            self.templates[group.identifier] = (variables, indices, [
+                None if index is None else LookupTable.index_map(index) for index in indices])
+            if group.name == 'lu_table_template' and all(i is not None for i in indices):
+                template = LookupTableTemplate(group.identifier, **{variable: len(index)
+                    for (variable, index) in zip(variables, indices)})
+                for subgroup in group.groups.values():
+                    template.add_group(subgroup)
+                return template
+            return group
+
+        if 'values' not in attributes or group.identifier not in self.templates:
+            return group
+        (variables, indices, index_maps) = self.templates[group.identifier]
+        if any(name in attributes for name in INDEX_NAMES[:len(variables)]):
+            indices = list(indices)
+            index_maps = list(index_maps)
+            for (i, name) in enumerate(INDEX_NAMES[:len(variables)]):
+                if name in attributes:
+                    indices[i] = _floats(attributes[name].value).ravel()
+                    index_maps[i] = LookupTable.index_map(indices[i])
+        if not variables or any(index is None for index in indices):
+            return group # Scalar tables and tables without indices are kept as plain groups
+        values = _floats(attributes['values'].value)
+        sizes = [len(index) for index in indices]
+        if values.size != math.prod(sizes):
+            raise ValueError(f'{group.name} ({group.identifier}) has {values.size} values, but '
+                             f'its indices require {math.prod(sizes)}')
+
+        if len(sizes) < 3:
+            values = values.reshape(sizes)
+        else: # Each set of rows covers one value of index_3
+            values = values.reshape(sizes[2], sizes[0], sizes[1]).transpose(1, 2, 0)
+        # Tables using the template's indices share its index arrays and maps
+        table = LookupTable.from_arrays(group.name, group.identifier, variables, indices, values,
+                                        index_maps)
+        for subgroup in group.groups.values():
+            table.add_group(subgroup)
+        for (key, attribute) in attributes.items():
+            if key != 'values' and key not in INDEX_NAMES:
+                table.attributes[key] = attribute
+        return table
+
+    def _attach(self, parent, counts, group):
+        key = group.unique_key
+        if key in parent.groups:
+            # Groups such as timing and internal_power are often unnamed and told apart only by
+            # attributes like related_pin and when (for example, state-dependent arcs). add_group
+            # would merge them, so number each repeat to give it a distinct key instead.
+            group.repeat = counts[key] = counts.get(key, 0) + 1
+            key = group.unique_key
+        parent.groups[key] = group
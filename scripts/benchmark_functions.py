@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+#
+# Benchmark truth table and test vector generation for functions with 2 to 12 inputs.
+#
+# For each input count, builds an AOI-style function (!((A0&A1)|(A2&A3)|...)) and a parity
+# function (A0^A1^...), then times computing the packed truth table output column, finding the
+# packed test vectors, and expanding the test vectors into dictionaries.
+#
+# Usage (from the repository root):
+#   python scripts/benchmark_functions.py [--min-inputs N] [--max-inputs N]
+
+import argparse, time
+
+from charlib.characterizer.logic.functions import Function
+from charlib.characterizer.port import Pin
+
+
+def aoi(names):
+    """Return an AND-OR-INVERT expression over names, ANDing inputs in pairs."""
+    pairs = [names[i:i+2] for i in range(0, len(names), 2)]
+    return '!(' + '|'.join('(' + '&'.join(pair) + ')' for pair in pairs) + ')'
+
+
+def parity(names):
+    """Return an XOR expression over names."""
+    return '^'.join(names)
+
+
+def timed(callable):
+    """Return (result, seconds) for a call to callable."""
+    start = time.perf_counter()
+    result = callable()
+    return (result, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time truth table and test vector generation.')
+    parser.add_argument('--min-inputs', type=int, default=2)
+    parser.add_argument('--max-inputs', type=int, default=12)
+    args = parser.parse_args()
+
+    print(f'{"function":<8} {"inputs":>6} {"vectors":>8} {"table ms":>9} {"packed ms":>10} '
+          f'{"dicts ms":>9}')
+    for n in range(args.min_inputs, args.max_inputs + 1):
+        names = [f'A{i}' for i in range(n)]
+        inputs = [Pin(name, 'input') for name in names]
+        for (kind, expression) in [('aoi', aoi(names)), ('parity', parity(names))]:
+            function = Function(Pin('Y', 'output'), expression, *inputs)
+            (_, table_time) = timed(lambda: function.output_column)
+            (packed, packed_time) = timed(lambda: function.packed_test_vectors)
+            (_, dicts_time) = timed(lambda: function.test_vectors)
+            print(f'{kind:<8} {n:>6} {len(packed):>8} {1e3*table_time:>9.2f} '
+                  f'{1e3*packed_time:>10.2f} {1e3*dicts_time:>9.2f}')
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+#
+# Micro-benchmark for the logic expression parser on long generated expressions.
+#
+# For each size, builds a sum-of-products expression ((A0&~A1)|(A2^A3)|...) with the given number
+# of operands and times parse_logic on it.
+#
+# Usage (from the repository root):
+#   python scripts/benchmark_parser.py [--sizes N ...] [--repeat N]
+
+import argparse, time
+
+from charlib.characterizer.logic.Parser import parse_logic
+
+
+def sum_of_products(n_operands):
+    """Return a sum-of-products expression over n_operands operands."""
+    terms = []
+    for i in range(0, n_operands, 2):
+        operator = '&~' if (i // 2) % 2 == 0 else '^'
+        terms.append(f'(A{i}{operator}A{i+1})')
+    return '|'.join(terms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time parse_logic on long expressions.')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[8, 32, 128, 512, 2048, 8192, 32768],
+                        help='Numbers of operands to benchmark')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of times to parse each expression (the best time is shown)')
+    args = parser.parse_args()
+
+    print(f'{"operands":>8} {"characters":>10} {"ms":>9} {"us/char":>8}')
+    for size in args.sizes:
+        expression = sum_of_products(size)
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            parse_logic(expression)
+            times.append(time.perf_counter() - start)
+        print(f'{size:>8} {len(expression):>10} {1e3*min(times):>9.3f} '
+              f'{1e6*min(times)/len(expression):>8.3f}')
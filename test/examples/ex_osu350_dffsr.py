@@ -1,3 +1,5 @@
+import sys
+
 from charlib.characterizer.characterizer import Characterizer
 
 def characterize_osu350_dffsr():
@@ -22,8 +24,8 @@ def characterize_osu350_dffsr():
         'metastability_constraint_search_timestep': 0.005,
         'metastability_constraint_load': 0.24,
         'metastability_constraint_sweep_samples': 40})
-    liberty = characterizer.characterize()
-    print(liberty)
+    characterizer.characterize()
+    characterizer.write_library(sys.stdout)
 
 if __name__ == "__main__":
     characterize_osu350_dffsr()
@@ -7,12 +7,8 @@ def run(settings, cells):
     characterizer = Characterizer(**settings)
     for name, properties in utils.read_cell_configs(cells):
         characterizer.add_cell(name, properties)
-    libtext = characterizer.characterize()
-
-    libfile = characterizer.settings.results_dir / characterizer.library.file_name
-    libfile.parent.mkdir(parents=True, exist_ok=True)
-    with open(libfile, 'w') as f:
-        f.write(str(libtext))
+    characterizer.characterize()
+    characterizer.write_library()
 
 def test_ex_osu350_adders():
     config = utils.find_config('test/examples/ex_osu350_adders.yaml')
@@ -0,0 +1,49 @@
+from charlib.characterizer.cell import Cell
+
+
+NETLIST = """\
+.subckt FAX1 A B C YC YS VDD VSS
+.ends
+"""
+
+SUPPLIES = {'VDD': 'primary_power', 'VSS': 'primary_ground'}
+
+
+def full_adder(tmp_path):
+    (tmp_path / 'cells.sp').write_text(NETLIST)
+    return Cell('FAX1', SUPPLIES, netlist=str(tmp_path / 'cells.sp'),
+                functions=['YC=(A&B)|(C&(A^B))', 'YS=A^B^C'])
+
+
+def test_conditions_shared_between_outputs(tmp_path):
+    cell = full_adder(tmp_path)
+    conditions = cell.conditions_for_input('A', '01')
+    # With B and C different, only YS switches; with them equal, both outputs switch
+    assert conditions == {
+        (('A', '01'), ('B', '0'), ('C', '0')): {'YS': '01'},
+        (('A', '01'), ('B', '1'), ('C', '1')): {'YS': '01'},
+        (('A', '01'), ('B', '0'), ('C', '1')): {'YC': '01', 'YS': '10'},
+        (('A', '01'), ('B', '1'), ('C', '0')): {'YC': '01', 'YS': '10'},
+    }
+
+
+def test_conditions_cover_every_path(tmp_path):
+    cell = full_adder(tmp_path)
+    for path in cell.paths():
+        (input_pin, input_transition, output_pin, output_transition) = path
+        conditions = cell.conditions_for_input(input_pin, input_transition)
+        expected = list(cell.nonmasking_conditions_for_path(*path))
+        measured = [states for (states, outputs) in conditions.items()
+                    if outputs.get(output_pin) == output_transition]
+        assert len(measured) == len(expected)
+
+
+def test_paths_only_include_possible_paths(tmp_path):
+    (tmp_path / 'cells.sp').write_text('.subckt AND2X1 A B Y VDD VSS\n.ends\n')
+    cell = Cell('AND2X1', SUPPLIES, netlist=str(tmp_path / 'cells.sp'), functions=['Y=A&B'])
+    assert list(cell.paths()) == [('A', '01', 'Y', '01'), ('A', '10', 'Y', '10'),
+                                  ('B', '01', 'Y', '01'), ('B', '10', 'Y', '10')]
+    assert cell.nonmasking_conditions_for_path('A', '01', 'Y', '01') == [
+        {'A': '01', 'B': '1', 'Y': '01'}]
+    assert cell.nonmasking_conditions_for_path('A', '01', 'Y', '10') == []
+    assert list(cell.input_transitions()) == [('A', '01'), ('A', '10'), ('B', '01'), ('B', '10')]
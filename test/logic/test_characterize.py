@@ -0,0 +1,59 @@
+from charlib.characterizer.characterizer import Characterizer
+from charlib.characterizer.results import PinAttribute
+from charlib.characterizer.store import MeasurementStore
+
+NETLIST = """\
+.subckt INVX1 A Y VDD VSS
+M0 Y A VSS VSS nfet w=1u l=0.18u
+M1 Y A VDD VDD pfet w=2u l=0.18u
+.ends
+.subckt BUFX1 A Y VDD VSS
+X0 A N VDD VSS INVX1
+X1 N Y VDD VSS INVX1
+.ends
+"""
+
+
+# Stand-ins for simulation procedures, so cells can be characterized without a simulator
+def measure_capacitance(cell, config, settings):
+    for pin in cell.inputs:
+        yield (fake_capacitance, cell.name, pin, len(cell.name))
+
+def fake_capacitance(cell, pin, value):
+    return [PinAttribute(cell, pin, 'capacitance', value)]
+
+def no_tasks(cell, config, settings):
+    return []
+
+
+def test_cells_are_built_and_characterized_in_parallel(tmp_path):
+    (tmp_path / 'cells.sp').write_text(NETLIST)
+    (tmp_path / 'models.m').write_text('.model nfet nmos\n.model pfet pmos\n')
+    characterizer = Characterizer(lib_name='parallel_test', cache_dir=tmp_path / 'cache',
+                                  results_dir=tmp_path / 'results', defer_plots=True, quiet=True)
+    characterizer.settings.extract_netlists = False
+    characterizer.settings.jobs = 2
+    simulation = characterizer.settings.simulation
+    simulation.input_capacitance = measure_capacitance
+    simulation.combinational_delay = simulation.combinational_leakage = no_tasks
+    for (name, function) in [('INVX1', 'Y=!A'), ('BUFX1', 'Y=A')]:
+        characterizer.add_cell(name, {'netlist': str(tmp_path / 'cells.sp'),
+                                      'models': [str(tmp_path / 'models.m')], 'inputs': ['A'],
+                                      'outputs': ['Y'], 'functions': [function],
+                                      'data_slews': [0.015], 'loads': [0.06]})
+    library = characterizer.characterize()
+
+    # Cells are added in the order they were configured, however long each took to build
+    assert [cell.identifier for cell in library.cells] == ['INVX1', 'BUFX1']
+    assert [cell.name for (cell, _) in characterizer.cells] == ['INVX1', 'BUFX1']
+    pin = library.group('cell', 'BUFX1').group('pin', 'A')
+    assert pin.attributes['capacitance'].value == 5
+
+    # Cells are recorded in the measurement store, so the library can be rebuilt from it
+    with MeasurementStore(characterizer.measurement_store_path) as store:
+        rendered = store.library()
+        assert not list(rendered.cells)
+        for result in store.results():
+            result.apply(rendered)
+    rendered.add_table_templates()
+    assert rendered.to_liberty(precision=6) == library.to_liberty(precision=6)
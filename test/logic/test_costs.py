@@ -0,0 +1,46 @@
+from charlib.characterizer.costs import CostModel, makespan
+from charlib.characterizer.procedures import estimated_cost
+
+
+def cheap_task(n):
+    pass
+
+@estimated_cost(10)
+def fixed_task(n):
+    pass
+
+@estimated_cost(lambda n: n)
+def scaled_task(n):
+    pass
+
+
+def test_tasks_estimated_by_static_cost():
+    costs = CostModel()
+    tasks = [(cheap_task, 1), (scaled_task, 5), (fixed_task, 1), (scaled_task, 50)]
+    assert [costs.estimate(*task) for task in tasks] == [1, 5, 10, 50]
+
+
+def test_learned_timings_override_static_cost(tmp_path):
+    costs = CostModel(tmp_path / 'costs.json')
+    # cheap_task turns out to be much slower than declared
+    costs.record(cheap_task, (1,), 100.0)
+    costs.record(fixed_task, (1,), 10.0)
+    costs.save()
+
+    costs = CostModel(tmp_path / 'costs.json')
+    assert costs.estimate(cheap_task, 1) == 100.0
+    assert costs.estimate(fixed_task, 1) == 10.0
+    # scaled_task hasn't been timed, so it uses the median rate of the others
+    assert costs.estimate(scaled_task, 2) == 2 * (100.0 + 1.0) / 2
+
+
+def test_corrupt_timing_file_is_ignored(tmp_path):
+    (tmp_path / 'costs.json').write_text('{not json')
+    assert CostModel(tmp_path / 'costs.json').estimate(fixed_task, 1) == 10
+
+
+def test_makespan():
+    assert makespan([], 4) == 0
+    assert makespan([5, 1, 1, 1, 1, 1], 2) == 5
+    assert makespan([3, 3, 2, 2, 2], 2) == 7
+    assert makespan([1, 2, 3], 1) == 6
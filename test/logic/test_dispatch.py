@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+from charlib.characterizer.dispatch import Dispatcher
+
+
+def test_tasks_run_most_expensive_first():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        dispatcher = Dispatcher(executor, 1)
+        for (label, cost) in [('a', 1), ('b', 5), ('c', 3), ('d', 5)]:
+            dispatcher.push(label, cost, str, label)
+        assert [future.result() for (_, future) in dispatcher.completed()] == ['b', 'd', 'c', 'a']
+
+
+def test_tasks_start_while_cells_are_prepared():
+    order = []
+    release = Event()
+
+    def prepare(cell):
+        order.append(f'prepare {cell}')
+        if cell == 'last':
+            release.wait(5) # Planning the last cell is slow
+        return cell
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        dispatcher = Dispatcher(executor, 2)
+        for cell in ['first', 'last']:
+            dispatcher.prepare(cell, prepare, cell)
+        for (label, future) in dispatcher.completed():
+            if label in ('first', 'last'):
+                dispatcher.push(f'{label} task', 1, order.append, f'simulate {label}')
+            elif label == 'first task':
+                release.set() # The first cell's task ran before the last cell was ready
+    assert order == ['prepare first', 'prepare last', 'simulate first', 'simulate last']
+    assert len(dispatcher) == 0
@@ -1,5 +1,10 @@
+import pickle
+import warnings
+
+import pytest
+
 from charlib.characterizer.cell import Pin
-from charlib.characterizer.logic.functions import Function
+from charlib.characterizer.logic.functions import Function, FunctionCache
 
 def test_noninverting_dff():
     """Verify truth table and test vectors for the noninverting function of a D flip-flop"""
@@ -133,3 +138,73 @@ def test_xor2():
 
 def test_addf():
     pass # TODO
+
+def test_packed_test_vectors():
+    """Verify the compact test vector form expands to the expected dictionaries"""
+    output = Pin('Y', 'output')
+    inputs = [Pin('A', 'input'), Pin('B', 'input')]
+    function = Function(output, 'A&B', *inputs)
+
+    # Rows are numbered with A as the most significant bit, so only row 3 (A=1, B=1) is high
+    assert function.output_column == 0b1000
+    # Each vector is (start_row << PIN_BITS) | index of the flipped input
+    assert [(code >> 6, code & 0b111111) for code in function.packed_test_vectors] == [
+        (1, 0), (3, 0), (2, 1), (3, 1)]
+    assert function.test_vectors == [
+        {'A': '01', 'B': '1', 'Y': '01'},
+        {'A': '10', 'B': '1', 'Y': '10'},
+        {'A': '1', 'B': '01', 'Y': '01'},
+        {'A': '1', 'B': '10', 'Y': '10'},
+    ]
+
+def test_dff_with_xor_next_state():
+    """Verify the clock selects the whole next-state expression, whatever its operators"""
+    output = Pin('Q', 'output')
+    inputs = [
+        Pin('CLK', 'input', role='clock', edge_triggered=True),
+        Pin('D', 'input'),
+        Pin('E', 'input')
+    ]
+    function = Function(output, 'D^E', *inputs, state='IQ')
+
+    for row in function.truth_table():
+        expected = row['D'] ^ row['E'] if row['CLK'] else row['IQ']
+        assert row['Q'] == expected, row
+
+def test_mixing_and_with_xor():
+    """Verify & binds more tightly than ^, and that leaving the order to precedence is flagged"""
+    output = Pin('Y', 'output')
+    inputs = [Pin('A', 'input'), Pin('B', 'input'), Pin('C', 'input')]
+    with pytest.warns(UserWarning, match='without parentheses'):
+        function = Function(output, 'A&B^C', *inputs)
+    for row in function.truth_table():
+        assert row['Y'] == (row['A'] & row['B']) ^ row['C'], row
+
+    # Parenthesized forms say what they mean, so they parse silently
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        for expression in ['(A&B)^C', 'A&(B^C)', 'A^B|C&B', 'A&B&C']:
+            Function(output, expression, *inputs)
+
+def test_function_cache_shares_renamed_functions(tmp_path):
+    """Verify functions differing only in pin names share cached test vectors"""
+    nand_ab = Function(Pin('Y', 'output'), '!(A&B)', Pin('A', 'input'), Pin('B', 'input'))
+    nand_xw = Function(Pin('Z', 'output'), '!(X&W)', Pin('X', 'input'), Pin('W', 'input'))
+    nor_ab = Function(Pin('Y', 'output'), '!(A|B)', Pin('A', 'input'), Pin('B', 'input'))
+    assert nand_ab.canonical_form == nand_xw.canonical_form != nor_ab.canonical_form
+
+    assert not FunctionCache(tmp_path).fill(nand_ab)
+    cache = FunctionCache(tmp_path) # Start with an empty memo, so the entry is read from disk
+    assert cache.fill(nand_xw)
+    assert nand_xw.packed_test_vectors == nand_ab.packed_test_vectors
+    assert nand_xw.test_vectors == [{k.replace('A', 'W').replace('B', 'X').replace('Y', 'Z'): v
+                                     for (k, v) in vector.items()}
+                                    for vector in nand_ab.test_vectors]
+    assert not cache.fill(nor_ab)
+
+def test_functions_can_be_sent_to_workers():
+    """Verify functions survive pickling, as they do when cells are sent to worker processes"""
+    function = Function(Pin('Y', 'output'), '!(A^B)', Pin('A', 'input'), Pin('B', 'input'))
+    copy = pickle.loads(pickle.dumps(function))
+    assert copy.eval(A=1, B=0) == function.eval(A=1, B=0) == 0
+    assert copy.test_vectors == function.test_vectors
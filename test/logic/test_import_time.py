@@ -0,0 +1,44 @@
+"""Import-time regression tests, measured with ``python -X importtime``"""
+
+import os, subprocess, sys
+from pathlib import Path
+
+ROOT = Path(__file__).parents[2]
+
+# Modules which take a long time to import, and should only be imported when actually needed
+HEAVY_MODULES = ['matplotlib', 'PySpice', 'liberty.parser', 'tqdm']
+
+
+def import_times(module) -> dict:
+    """Import module in a fresh interpreter and return the cumulative import time of each module
+    it imported, in microseconds."""
+    env = {**os.environ, 'PYTHONPATH': str(ROOT)}
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        (_, cumulative, name) = line.removeprefix('import time:').split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def is_heavy(name) -> bool:
+    return any(name == module or name.startswith(f'{module}.') for module in HEAVY_MODULES)
+
+
+def test_cli_imports_no_subcommands():
+    times = import_times('charlib.cli.main')
+    imported = [name for name in times if is_heavy(name)
+                or (name.startswith('charlib.cli.') and name != 'charlib.cli.main')]
+    assert not imported, f'charlib.cli.main took {times["charlib.cli.main"]} us to import'
+
+
+def test_characterizer_imports_no_procedures_or_plotting():
+    times = import_times('charlib.characterizer.characterizer')
+    imported = [name for name in times if name.split('.')[0] in ('matplotlib', 'tqdm')
+                or name.startswith('charlib.characterizer.procedures.')]
+    assert not imported, \
+        f'charlib.characterizer.characterizer took {times["charlib.characterizer.characterizer"]} ' \
+        'us to import'
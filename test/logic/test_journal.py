@@ -0,0 +1,46 @@
+from charlib.characterizer.journal import Journal
+from charlib.liberty import liberty
+
+
+def _cell_group(capacitance):
+    cell = liberty.Group('cell', 'INVX1')
+    cell.add_group('pin', 'A')
+    cell.group('pin', 'A').add_attribute('capacitance', capacitance)
+    return cell
+
+
+def test_resume_reads_back_completed_entries(tmp_path):
+    path = tmp_path / 'lib.journal'
+    with Journal(path) as journal:
+        journal.append('measure_pin_cap_by_ac_sweep INVX1 A', _cell_group(0.01))
+        journal.append('measure_pin_cap_by_ac_sweep INVX1 B', _cell_group(0.02))
+
+    with Journal(path, resume=True) as journal:
+        assert len(journal) == 2
+        assert 'measure_pin_cap_by_ac_sweep INVX1 A' in journal
+        assert journal.entries['measure_pin_cap_by_ac_sweep INVX1 B'] == _cell_group(0.02)
+
+
+def test_resume_ignores_partially_written_entry(tmp_path):
+    path = tmp_path / 'lib.journal'
+    with Journal(path) as journal:
+        journal.append('task 1', _cell_group(0.01))
+        journal.append('task 2', _cell_group(0.02))
+    # Simulate a crash partway through writing the last entry
+    path.write_bytes(path.read_bytes()[:-5])
+
+    with Journal(path, resume=True) as journal:
+        assert list(journal.entries) == ['task 1']
+        journal.append('task 3', _cell_group(0.03))
+    with Journal(path, resume=True) as journal:
+        assert list(journal.entries) == ['task 1', 'task 3']
+
+
+def test_new_run_discards_existing_journal(tmp_path):
+    path = tmp_path / 'lib.journal'
+    with Journal(path) as journal:
+        journal.append('task 1', _cell_group(0.01))
+    with Journal(path) as journal:
+        assert len(journal) == 0
+    with Journal(path, resume=True) as journal:
+        assert len(journal) == 0
@@ -1,4 +1,8 @@
+import gzip
+
 from charlib.liberty import liberty
+from charlib.liberty.library import Library, LookupTable
+from charlib.liberty.reader import parse_library, read_library
 
 
 # ---------------------------------------------------------------------------
@@ -69,3 +73,229 @@ def test_add_attribute_rekey_collision_merges_into_existing_sibling():
     merged = timing_groups[0]
     assert merged.attributes['marker'] == ('marker', 'existing')
     assert merged.attributes['time'] == ('time', '12:00')
+
+
+# ---------------------------------------------------------------------------
+# Streaming output tests
+# ---------------------------------------------------------------------------
+
+def make_library():
+    library = Library('stream_test', voltage_unit='1V')
+    cell = liberty.Group('cell', 'INV')
+    cell.add_attribute('area', 128)
+    cell.add_group('pin', 'Y')
+    timing = liberty.Group('timing', '/* A */')
+    timing.add_attribute('related_pin', 'A')
+    lut = LookupTable('cell_rise', 'delay_template_2x3', total_output_net_capacitance=[0.1, 0.2],
+                      input_net_transition=[0.01, 0.02, 0.04])
+    lut.values[:] = [[1.5, -0.0, 2.25], [1e-9, 3.0, 4.125]]
+    timing.add_group(lut)
+    cell.group('pin', 'Y').add_group(timing)
+    library.add_group(cell)
+    library.add_group(lut.template)
+    return library
+
+
+def test_written_library_matches_rendered_text(tmp_path):
+    library = make_library()
+    text = library.to_liberty(precision=6)
+    assert '"1.500000, -0.000000, 2.250000" \\' in text
+
+    library.write(tmp_path / 'stream_test.lib', precision=6)
+    assert (tmp_path / 'stream_test.lib').read_text() == text
+
+    library.write(tmp_path / 'stream_test.lib.gz', precision=6)
+    with gzip.open(tmp_path / 'stream_test.lib.gz', 'rt') as file:
+        assert file.read() == text
+
+
+# ---------------------------------------------------------------------------
+# Subgroup index tests
+# ---------------------------------------------------------------------------
+
+def walk_subgroups_with_name(group, name):
+    """Reference implementation of Group.subgroups_with_name, without using any indexes"""
+    for subgroup in group.groups.values():
+        if subgroup.name == name:
+            yield subgroup
+        else:
+            yield from walk_subgroups_with_name(subgroup, name)
+
+
+def test_subgroup_indexes_track_merges_and_rekeys():
+    library = make_library()
+    cell = library.group('cell', 'INV')
+    cell.add_group('pin', 'A')
+    pin = cell.group('pin', 'Y')
+    existing = liberty.Group('timing', '')
+    existing.add_attribute('related_pin', 'B')
+    existing.add_attribute('timing_type', 'combinational')
+    existing.add_group(liberty.Group('cell_fall', 'delay_template_2x3'))
+    pin.add_group(existing)
+    partial = liberty.Group('timing', '')
+    partial.add_attribute('related_pin', 'B')
+    pin.add_group(partial)
+    # Completing partial's key makes it collide with (and merge into) existing
+    partial.add_attribute('timing_type', 'combinational')
+
+    for name in ['cell', 'pin', 'timing', 'cell_rise', 'cell_fall', 'lu_table_template', 'missing']:
+        assert list(library.subgroups_with_name(name)) == \
+            list(walk_subgroups_with_name(library, name))
+    assert len(list(library.subgroups_with_name('timing'))) == 2
+    assert library._subtree_counts['timing'] == 2
+    assert library._subtree_counts['pin'] == 2
+    assert library.cells == [cell]
+
+    # Lookups by key attribute only consider direct children with that name
+    assert pin.group('timing', related_pin='A').identifier == '/* A */'
+    assert pin.group('timing', related_pin='B') is existing
+
+    del pin.groups[existing.unique_key]
+    assert library._subtree_counts['timing'] == 1
+    assert 'cell_rise' in library._subtree_counts
+    del cell.groups[pin.unique_key]
+    assert 'timing' not in library._subtree_counts
+    assert list(library.subgroups_with_name('cell_rise')) == []
+
+
+# ---------------------------------------------------------------------------
+# Reader tests
+# ---------------------------------------------------------------------------
+
+VENDOR_LIBRARY = """\
+/* Written by some other tool */
+library ("vendor_tt") {
+  delay_model : table_lookup ;
+  define (drive_strength, cell, integer) ;
+  define (footprint, cell, string) ;
+  capacitive_load_unit (1, pf)
+  nom_voltage : 1.80 ;
+  lu_table_template (delay_2x2) {
+    variable_1 : input_net_transition ;
+    variable_2 : total_output_net_capacitance ;
+    index_1 ("0.1, 0.2") ;
+    index_2 ("0.01, 0.02") ;
+  }
+  cell ("NAND2") {
+    area : 4.5 ;
+    pin (Y) {
+      function : "!(A&B)" ;
+      timing () {
+        related_pin : "A" ;
+        cell_rise (delay_2x2) {
+          values ("1.0, 2.0", \\
+                  "3.0, 4.0") ;
+        }
+      }
+      timing () {
+        related_pin : "B" ;
+        cell_rise (delay_2x2) {
+          index_1 ("0.1, 0.3") ;
+          values ("5.0, 6.0", "7.0, 8.0") ;
+        }
+        cell_fall (scalar) { values ("0.5") ; }
+      }
+    }
+  }
+  cell (NOR2) { area : 4.5 ; }
+}
+"""
+
+
+def test_read_library_round_trips_written_library(tmp_path):
+    library = make_library()
+    library.write(tmp_path / 'stream_test.lib.gz', precision=6)
+    library_read = read_library(tmp_path / 'stream_test.lib.gz')
+    assert library_read.file_name == 'stream_test.lib'
+    assert library_read.to_liberty(precision=6) == library.to_liberty(precision=6)
+    lut = library_read.group('cell', 'INV').group('pin', 'Y').group('timing', '/* A */') \
+        .group('cell_rise', 'delay_template_2x3')
+    assert isinstance(lut, LookupTable)
+    assert lut[0.2, 0.04] == 4.125
+
+
+def test_read_vendor_library():
+    library = parse_library(VENDOR_LIBRARY)
+    assert library.identifier == 'vendor_tt'
+    assert [attr.value for attr in library.attributes.values() if attr.name == 'define'] == \
+        [['drive_strength', 'cell', 'integer'], ['footprint', 'cell', 'string']]
+    assert library.attributes['capacitive_load_unit'].value == ['1', 'pf']
+    assert library.attributes['nom_voltage'].to_liberty() == 'nom_voltage : 1.80 ;'
+
+    pin = library.group('cell', 'NAND2').group('pin', 'Y')
+    assert pin.attributes['function'].value == '!(A&B)'
+    # Unnamed timing groups with different related pins are kept apart
+    (timing_a, timing_b) = pin.subgroups_with_name('timing')
+    assert timing_a.attributes['related_pin'].value == 'A'
+    # Tables without their own indices use the template's
+    cell_rise = timing_a.group('cell_rise', 'delay_2x2')
+    assert [list(index) for index in cell_rise.index_values] == [[0.1, 0.2], [0.01, 0.02]]
+    assert cell_rise[0.2, 0.01] == 3.0
+    assert timing_b.group('cell_rise', 'delay_2x2')[0.3, 0.02] == 8.0
+    assert not isinstance(timing_b.group('cell_fall', 'scalar'), LookupTable)
+
+    # Reading the library back in gives the same result
+    text = library.to_liberty(precision=3)
+    assert parse_library(text).to_liberty(precision=3) == text
+
+
+STATE_DEPENDENT_LIBRARY = """\
+library (arcs) {
+  cell (XOR3) {
+    pin (Y) {
+      function : "A^B^C" ;
+      timing () { related_pin : "A" ; timing_type : combinational ; when : "B" ;
+                  timing_sense : negative_unate ; }
+      timing () { related_pin : "A" ; timing_type : combinational ; when : "!B" ;
+                  timing_sense : positive_unate ; }
+      timing () { related_pin : "A" ; timing_type : combinational ; when : "C" ;
+                  timing_sense : non_unate ; }
+      internal_power () { related_pin : "A" ; when : "B" ; }
+      internal_power () { related_pin : "A" ; when : "!B" ; }
+      internal_power () { related_pin : "A" ; when : "C" ; }
+    }
+  }
+}
+"""
+
+
+def test_read_keeps_arcs_sharing_related_pin():
+    library = parse_library(STATE_DEPENDENT_LIBRARY)
+    pin = library.group('cell', 'XOR3').group('pin', 'Y')
+    arcs = [(timing.attributes['when'].value, timing.attributes['timing_sense'].value)
+            for timing in pin.subgroups_with_name('timing')]
+    assert arcs == [('B', 'negative_unate'), ('!B', 'positive_unate'), ('C', 'non_unate')]
+    assert [power.attributes['when'].value
+            for power in pin.subgroups_with_name('internal_power')] == ['B', '!B', 'C']
+
+    # Writing the library and reading it back keeps every arc
+    text = library.to_liberty()
+    assert parse_library(text).to_liberty() == text
+
+
+def test_modifying_repeated_arcs_keeps_their_siblings():
+    library = parse_library(STATE_DEPENDENT_LIBRARY)
+    pin = library.group('cell', 'XOR3').group('pin', 'Y')
+    (first, second, third) = pin.subgroups_with_name('timing')
+    second.add_attribute('sdf_cond', 'B == 1\'b0')
+    third.add_attribute('timing_sense', 'positive_unate')
+    assert list(pin.subgroups_with_name('timing')) == [first, second, third]
+    assert [timing.attributes['when'].value for timing in (first, second, third)] == \
+        ['B', '!B', 'C']
+    assert third.attributes['timing_sense'].value == 'positive_unate'
+
+
+def test_update_cells_replaces_cells_in_place():
+    library = parse_library(VENDOR_LIBRARY)
+    new_library = make_library()
+    nand2 = liberty.Group('cell', 'NAND2')
+    nand2.add_attribute('area', 5.0)
+    new_library.add_group(nand2)
+
+    library.update_cells(new_library)
+    assert [cell.identifier for cell in library.cells] == ['NAND2', 'NOR2', 'INV']
+    assert library.group('cell', 'NAND2') is nand2
+    assert 'pin' not in nand2.groups.names
+    assert len(list(library.subgroups_with_name('timing'))) == 1
+    assert library.group('lu_table_template', 'delay_template_2x3')
+    assert library.attributes['nom_voltage'].value == 1.8
@@ -0,0 +1,67 @@
+import sqlite3
+
+from charlib.characterizer.results import CellSubgroup, PinAttribute, TableMeasurements
+from charlib.characterizer.store import MeasurementStore
+from charlib.liberty import liberty
+from charlib.liberty.library import Library
+
+
+def make_library():
+    library = Library('store_test')
+    cell = liberty.Group('cell', 'NAND2')
+    for pin in ['A', 'B', 'Y']:
+        cell.add_group('pin', pin)
+    library.add_group(cell)
+    return library
+
+
+def delay_results(criterion):
+    axes = {'total_output_net_capacitance': [1, 2], 'input_net_transition': [0.1]}
+    return [TableMeasurements('NAND2', 'Y', '/* A */', {'related_pin': 'A'}, 'cell_rise',
+                              'delay_template_2x1',
+                              {'total_output_net_capacitance': load, 'input_net_transition': 0.1},
+                              {'B=1': load * 10.0, 'B=0': load * 20.0}, criterion, axes)
+            for load in axes['total_output_net_capacitance']]
+
+
+def render(store, criterion=None):
+    library = store.library()
+    for result in store.results(criterion):
+        result.apply(library)
+    library.add_table_templates()
+    return library
+
+
+def test_store_renders_same_library(tmp_path):
+    library = make_library()
+    with MeasurementStore(tmp_path / 'test.db', create=True,
+                          corner={'temperature': 25, 'voltage': 3.3}) as store:
+        store.set_library(library)
+        for results in [[PinAttribute('NAND2', 'A', 'capacitance', 0.002)], delay_results(max),
+                        [CellSubgroup('NAND2', 'leakage_power', '/* A&B */', when='A&B',
+                                      value=1.5)]]:
+            store.add('task', results)
+            for result in results:
+                result.apply(library)
+    library.add_table_templates()
+
+    with MeasurementStore(tmp_path / 'test.db') as store:
+        assert render(store).to_liberty(precision=6) == library.to_liberty(precision=6)
+        lut = render(store, 'average').group('cell', 'NAND2').group('pin', 'Y') \
+            .group('timing', '/* A */').group('cell_rise', 'delay_template_2x1')
+        assert lut.values.tolist() == [[15.0], [30.0]]
+
+
+def test_measurements_are_stored_as_rows(tmp_path):
+    with MeasurementStore(tmp_path / 'test.db', create=True,
+                          corner={'temperature': 25, 'voltage': 3.3}) as store:
+        store.set_library(make_library())
+        store.add('measure_delays', delay_results('max'))
+
+    with sqlite3.connect(tmp_path / 'test.db') as connection:
+        rows = connection.execute('SELECT procedure, cell, related_pin, pin, state, load, slew, '
+                                  'temperature, voltage, value FROM measurements').fetchall()
+    assert rows == [('measure_delays', 'NAND2', 'A', 'Y', 'B=1', 1.0, 0.1, 25.0, 3.3, 10.0),
+                    ('measure_delays', 'NAND2', 'A', 'Y', 'B=0', 1.0, 0.1, 25.0, 3.3, 20.0),
+                    ('measure_delays', 'NAND2', 'A', 'Y', 'B=1', 2.0, 0.1, 25.0, 3.3, 20.0),
+                    ('measure_delays', 'NAND2', 'A', 'Y', 'B=0', 2.0, 0.1, 25.0, 3.3, 40.0)]
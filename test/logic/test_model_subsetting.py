@@ -0,0 +1,94 @@
+from charlib.characterizer import spice
+
+
+NETLIST = """\
+* Test cell netlist
+.subckt INV A Y VDD VSS
+M0 Y A VSS VSS nfet w=1u l=0.18u
+M1 Y A VDD VDD pfet w=2u l=0.18u
+X0 Y VSS esd_diode
+.ends
+"""
+
+MODELS = """\
+* Test PDK
+.lib typical
+.param corner=0
+.lib devices.lib mos_tt
+.include extras.spice
+.endl
+.lib fast
+.model nfet nmos level=54 vth0=0.3
+.endl
+"""
+
+DEVICES = """\
+.lib mos_tt
+.model nfet.0 nmos level=54
++ vth0=0.4 lmin=0.1u lmax=1u
+.model nfet.1 nmos level=54 vth0=0.41
+.model pfet pmos level=54 vth0=-0.4
+* Not used by the test cell
+.model nfet_6v0 nmos level=54 vth0=0.7
+.endl
+.lib mos_ff
+.model nfet nmos level=54 vth0=0.35
+.endl
+"""
+
+EXTRAS = """\
+.subckt esd_diode a b
+D0 a b dio_esd
+.ends
+.subckt unused_res a b
+R0 a b rpoly 1k
+.ends
+.model dio_esd d is=1e-14
+.model rpoly r rsh=100
+"""
+
+
+def write_pdk(tmp_path):
+    (tmp_path / 'cell.sp').write_text(NETLIST)
+    (tmp_path / 'models.lib').write_text(MODELS)
+    (tmp_path / 'devices.lib').write_text(DEVICES)
+    (tmp_path / 'extras.spice').write_text(EXTRAS)
+
+
+def model_names(path):
+    return {spice.tokens(s)[1].lower() for s in spice.read_statements(path)
+            if spice.tokens(s)[0].lower() in ('.model', '.subckt')}
+
+
+def test_subset_keeps_only_used_models(tmp_path):
+    write_pdk(tmp_path)
+    path = spice.subset_models([(tmp_path / 'models.lib', 'typical')], tmp_path / 'cell.sp',
+                               tmp_path / 'cache')
+    assert path.parent == tmp_path / 'cache'
+    assert model_names(path) == {'nfet.0', 'nfet.1', 'pfet', 'esd_diode', 'dio_esd'}
+    text = path.read_text()
+    assert '.param corner=0' in text
+    assert '+ vth0=0.4 lmin=0.1u lmax=1u' in text
+    assert 'vth0=0.35' not in text # From an unrequested section
+
+
+def test_subset_from_model_directory(tmp_path):
+    write_pdk(tmp_path)
+    model_dir = tmp_path / 'models'
+    model_dir.mkdir()
+    (tmp_path / 'extras.spice').rename(model_dir / 'extras.spice')
+    (model_dir / 'README').write_text('.model pfet pmos')
+    path = spice.subset_models([(model_dir,)], tmp_path / 'cell.sp', tmp_path / 'cache')
+    assert model_names(path) == {'esd_diode', 'dio_esd'}
+
+
+def test_subset_is_shared_and_tracks_changes(tmp_path):
+    write_pdk(tmp_path)
+    models = [(tmp_path / 'models.lib', 'typical')]
+    first = spice.subset_models(models, tmp_path / 'cell.sp', tmp_path / 'cache')
+    assert spice.subset_models(models, tmp_path / 'cell.sp', tmp_path / 'cache') == first
+
+    (tmp_path / 'cell.sp').write_text(NETLIST.replace('X0 Y VSS esd_diode\n', ''))
+    second = spice.subset_models(models, tmp_path / 'cell.sp', tmp_path / 'cache')
+    assert second != first
+    assert model_names(second) == {'nfet.0', 'nfet.1', 'pfet'}
@@ -0,0 +1,64 @@
+from charlib.characterizer import spice
+from charlib.characterizer.cell import Cell
+
+
+NETLIST = """\
+* Library netlist
+.SUBCKT INVX1 A Y VDD VSS
+M0 Y A VSS VSS nfet w=1u l=0.18u
+M1 Y A VDD VDD pfet w=2u l=0.18u
+.ENDS INVX1
+
+.subckt nand2x1 A
++ B Y
++ VDD VSS params: strength=1
+X0 n0 A VSS VSS nfet_stack
+M1 Y A VDD VDD pfet
+M2 Y B VDD VDD pfet
+.ends
+"""
+
+SUPPLIES = {'VDD': 'primary_power', 'VSS': 'primary_ground'}
+
+
+def test_index_records_pins_and_ranges(tmp_path):
+    (tmp_path / 'cells.sp').write_text(NETLIST)
+    index = spice.netlist_index(tmp_path / 'cells.sp')
+
+    assert 'invx1' in index and 'NAND2X1' in index and 'nor2x1' not in index
+    assert index.subckt('invx1').pins == ['A', 'Y', 'VDD', 'VSS']
+    assert index.subckt('NAND2X1').pins == ['A', 'B', 'Y', 'VDD', 'VSS']
+    assert index.text('INVX1').startswith('.SUBCKT INVX1')
+    assert index.text('INVX1').endswith('.ENDS INVX1\n')
+    assert index.text('nand2x1').count('\n') == 7
+
+
+def test_index_is_shared_until_file_changes(tmp_path):
+    (tmp_path / 'cells.sp').write_text(NETLIST)
+    index = spice.netlist_index(tmp_path / 'cells.sp')
+    assert spice.netlist_index(tmp_path / 'cells.sp') is index
+
+    (tmp_path / 'cells.sp').write_text(NETLIST.replace('INVX1', 'INVX2'))
+    assert 'invx2' in spice.netlist_index(tmp_path / 'cells.sp')
+
+
+def test_cell_pins_in_netlist_order(tmp_path):
+    (tmp_path / 'cells.sp').write_text(NETLIST)
+    cell = Cell('nand2x1', SUPPLIES, netlist=str(tmp_path / 'cells.sp'), functions=['Y=!(A&B)'])
+    assert [pin.name for pin in cell.pins_in_netlist_order()] == ['A', 'B', 'Y', 'VDD', 'VSS']
+
+
+def test_extract_subckt_with_dependencies(tmp_path):
+    (tmp_path / 'models.lib').write_text('.model nfet nmos\n')
+    (tmp_path / 'cells.sp').write_text('.include models.lib\n' + NETLIST + """
+.subckt nfet_stack d g s b
+M0 d g s b nfet
+.ends
+.subckt unused A Y
+.ends
+""")
+    path = spice.extract_subckt(tmp_path / 'cells.sp', 'nand2x1', tmp_path / 'netlists')
+    index = spice.netlist_index(path)
+    assert sorted(index.subckts) == ['nand2x1', 'nfet_stack']
+    assert f'.include {tmp_path / "models.lib"}' in path.read_text()
+    assert spice.extract_subckt(tmp_path / 'cells.sp', 'nand2x1', tmp_path / 'netlists') == path
@@ -0,0 +1,47 @@
+from charlib.characterizer.characterizer import Characterizer
+from charlib.cli import utils
+
+
+NETLIST = """\
+.subckt INVX1 A Y VDD VSS
+M0 Y A VSS VSS nfet w=1u l=0.18u
+M1 Y A VDD VDD pfet w=2u l=0.18u
+.ends
+"""
+
+CONFIG = """\
+settings:
+    lib_name: plan_test
+    cache_dir: {tmp_path}/cache
+cells:
+    INVX1:
+        netlist:    {tmp_path}/cells.sp
+        models:     [{tmp_path}/models.m]
+        inputs:     [A]
+        outputs:    ['Y']
+        functions:  [Y=!A]
+        data_slews: [0.015, 0.04]
+        loads:      [0.06, 0.18, 0.42]
+"""
+
+
+def test_plan_counts_tasks_without_simulating(tmp_path):
+    (tmp_path / 'cells.sp').write_text(NETLIST)
+    (tmp_path / 'models.m').write_text('.model nfet nmos\n.model pfet pmos\n')
+    (tmp_path / 'config.yaml').write_text(CONFIG.format(tmp_path=tmp_path))
+    config = utils.find_config(tmp_path / 'config.yaml')
+    characterizer = Characterizer(**config['settings'])
+    characterizer.settings.extract_netlists = False
+    for name, properties in utils.read_cell_configs(config['cells']):
+        characterizer.add_cell(name, properties)
+
+    plan = characterizer.plan(jobs=2)
+    procedures = plan['cells']['INVX1']
+    assert plan['tasks'] == sum(counts['tasks'] for counts in procedures.values())
+    assert plan['simulations'] == sum(counts['simulations'] for counts in procedures.values())
+    assert plan['simulations'] > 0
+    # Without learned timings, each simulation is assumed to take one second
+    assert not plan['learned_timings']
+    assert plan['cpu_seconds'] == plan['simulations']
+    assert plan['cpu_seconds'] / 2 <= plan['wall_seconds'] <= plan['cpu_seconds']
+    assert not (tmp_path / 'cache').exists()
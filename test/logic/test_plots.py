@@ -0,0 +1,52 @@
+import numpy as np
+
+from charlib.characterizer import plots
+from charlib.characterizer.results import PlotRequest, TableEntry
+from charlib.characterizer.waveforms import Waveforms, WaveformStore
+from charlib.liberty import liberty
+from charlib.liberty.library import Library
+
+
+def make_library():
+    library = Library('plot_test')
+    cell = liberty.Group('cell', 'INV')
+    cell.add_group('pin', 'A')
+    cell.add_group('pin', 'Y')
+    library.add_group(cell)
+    axes = {'total_output_net_capacitance': [1, 2], 'input_net_transition': [0.1, 0.2]}
+    for table in ['cell_rise', 'cell_fall']:
+        for load in axes['total_output_net_capacitance']:
+            for slew in axes['input_net_transition']:
+                TableEntry('INV', 'Y', '/* A */', {'related_pin': 'A'}, table,
+                           'delay_template_2x2',
+                           {'total_output_net_capacitance': load, 'input_net_transition': slew},
+                           load + slew, axes).apply(library)
+    return library
+
+
+def test_wants():
+    assert plots.wants('all', 'io')
+    assert plots.wants(['delay', 'io'], 'io')
+    assert plots.wants('io', 'io')
+    assert not plots.wants('none', 'io')
+    assert not plots.wants(['delay'], 'io')
+    assert not plots.wants([], 'delay')
+
+
+def test_draw_plots_in_separate_processes(tmp_path):
+    time = np.linspace(0, 1, 5)
+    WaveformStore(tmp_path / 'waveforms').save('0123', Waveforms(time, vA=time, vY=1 - time),
+                                               ['vA', 'vY'])
+    requests = [
+        PlotRequest('INV', plots.IOVoltagePlot(tmp_path / 'io' / 'cell_fall.png',
+                                               tmp_path / 'waveforms', {'': '0123'}, 'A', 'Y',
+                                               indicate_voltages=[0.2, 0.8])),
+        PlotRequest('INV', plots.DelaySurfacePlots('INV', tmp_path / 'INV')),
+    ]
+    library = make_library()
+    (surface,) = requests[1].plot.prepare(library)
+    assert [table.name for table in surface.tables] == ['cell_rise', 'cell_fall']
+
+    plots.draw_plots(library, requests, jobs=2, quiet=True)
+    assert (tmp_path / 'io' / 'cell_fall.png').stat().st_size > 0
+    assert (tmp_path / 'INV' / 'A to Y delay.png').stat().st_size > 0
@@ -0,0 +1,51 @@
+import os, subprocess, sys
+from pathlib import Path
+
+from charlib.characterizer.procedures import (BUILTIN_PROCEDURES, registered_procedures,
+                                              supported_parameters)
+
+ROOT = Path(__file__).parents[2]
+
+
+def test_procedure_modules_import_on_lookup():
+    procedure = registered_procedures['combinational_leakage']
+    assert procedure['callable'].__name__ == 'combinational_leakage'
+    assert 'charlib.characterizer.procedures.combinational.leakage_power' in sys.modules
+
+
+def test_builtin_procedures_register_from_their_modules():
+    for (name, module) in BUILTIN_PROCEDURES.items():
+        procedure = registered_procedures[name]
+        assert procedure['callable'].__module__ == f'charlib.characterizer.procedures.{module}'
+    assert 'metastability_constraint_sweep_samples' in supported_parameters()
+
+
+BUILD_CELL = """
+import sys
+from charlib.characterizer.characterizer import CharacterizationSettings, build_cell
+settings = CharacterizationSettings(lib_name='lazy', cache_dir={tmp_path!r})
+settings.extract_netlists = False
+(cell, config) = build_cell('INVX1', {{
+    'netlist': {netlist!r}, 'models': [{models!r}], 'inputs': ['A'], 'outputs': ['Y'],
+    'functions': ['Y=!A'], 'data_slews': [0.1], 'loads': [0.2],
+    'charge_integration_t_slew': 0.5}}, settings)
+print(sorted(config.parameters))
+print(sorted(name for name in sys.modules if name.startswith('charlib.characterizer.procedures.')))
+"""
+
+
+def test_building_cells_imports_only_selected_procedures(tmp_path):
+    (tmp_path / 'cells.sp').write_text('.subckt INVX1 A Y VDD VSS\n.ends\n')
+    (tmp_path / 'models.m').write_text('.model nfet nmos\n')
+    script = BUILD_CELL.format(tmp_path=str(tmp_path), netlist=str(tmp_path / 'cells.sp'),
+                               models=str(tmp_path / 'models.m'))
+    env = {**os.environ, 'PYTHONPATH': str(ROOT)}
+    process = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True,
+                             text=True, check=True)
+    (parameters, modules) = process.stdout.splitlines()
+    # Parameters of selected procedures are kept, and those of unselected procedures dropped
+    assert 'data_slews' in parameters and 'loads' in parameters
+    assert 'charge_integration_t_slew' not in parameters
+    assert 'charlib.characterizer.procedures.pin_capacitance.ac_sweep' in modules
+    assert 'charlib.characterizer.procedures.pin_capacitance.charge_integration' not in modules
+    assert 'metastability.binary_search' not in modules
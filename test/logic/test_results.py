@@ -0,0 +1,84 @@
+import pickle
+
+from charlib.characterizer.results import PinAttribute, CellSubgroup, TableEntry
+from charlib.liberty import liberty
+
+
+def make_library():
+    library = liberty.Group('library', 'test')
+    cell = liberty.Group('cell', 'INV')
+    cell.add_group('pin', 'A')
+    cell.add_group('pin', 'Y')
+    library.add_group(cell)
+    return library
+
+
+def delay_entry(load, slew, value):
+    return TableEntry('INV', 'Y', '/* A */', {'related_pin': 'A'}, 'cell_rise',
+                      'delay_template_2x2',
+                      {'total_output_net_capacitance': load, 'input_net_transition': slew}, value)
+
+
+def test_table_entries_fill_lookup_table():
+    library = make_library()
+    for (load, slew, value) in [(1, 0.1, 10), (2, 0.1, 20), (1, 0.2, 30), (2, 0.2, 40)]:
+        delay_entry(load, slew, value).apply(library)
+
+    timing_groups = list(library.group('cell', 'INV').group('pin', 'Y').subgroups_with_name('timing'))
+    assert len(timing_groups) == 1
+    assert timing_groups[0].attributes['related_pin'].value == 'A'
+    lut = timing_groups[0].group('cell_rise', 'delay_template_2x2')
+    assert [list(index) for index in lut.index_values] == [[1, 2], [0.1, 0.2]]
+    assert lut.values.tolist() == [[10, 30], [20, 40]]
+
+
+def test_constraint_entries_share_timing_group():
+    library = make_library()
+    for slew in [0.1, 0.2]:
+        TableEntry('INV', 'A', '/* setup */',
+                   {'related_pin': 'CLK', 'timing_type': 'setup_rising'}, 'rise_constraint',
+                   'setup_template_1x2',
+                   {'related_pin_transition': 0.1, 'constraint_pin_transition': slew},
+                   slew * 10).apply(library)
+
+    pin_group = library.group('cell', 'INV').group('pin', 'A')
+    timing_group = pin_group.groups[('timing', 'CLK', 'setup_rising')]
+    assert len(list(pin_group.subgroups_with_name('timing'))) == 1
+    assert timing_group.group('rise_constraint', 'setup_template_1x2').values.tolist() == [[1.0, 2.0]]
+
+
+def test_attribute_and_subgroup_results():
+    library = make_library()
+    PinAttribute('INV', 'A', 'capacitance', 0.002).apply(library)
+    CellSubgroup('INV', 'leakage_power', '/* A */', when='A', value=1.5).apply(library)
+    CellSubgroup('INV', 'leakage_power', '/* !A */', when='!A', value=2.5).apply(library)
+
+    cell = library.group('cell', 'INV')
+    assert cell.group('pin', 'A').attributes['capacitance'].value == 0.002
+    assert [g.attributes['value'].value for g in cell.subgroups_with_name('leakage_power')] == [1.5, 2.5]
+
+
+def test_results_are_small_and_picklable():
+    entry = delay_entry(1, 0.1, 10)
+    assert pickle.loads(pickle.dumps(entry)) == entry
+    assert len(pickle.dumps(entry)) < 512
+
+
+def test_entries_with_axes_fill_preallocated_table():
+    library = make_library()
+    loads = [0.1 * i for i in range(1, 11)]
+    slews = [0.01 * i for i in range(10, 0, -1)]
+    axes = {'total_output_net_capacitance': loads, 'input_net_transition': slews}
+    for (i, load) in enumerate(loads):
+        for (j, slew) in enumerate(slews):
+            TableEntry('INV', 'Y', '/* A */', {'related_pin': 'A'}, 'cell_rise',
+                       'delay_template_10x10',
+                       {'total_output_net_capacitance': load, 'input_net_transition': slew},
+                       i + j / 100, axes).apply(library)
+
+    timing_group = next(library.group('cell', 'INV').group('pin', 'Y').subgroups_with_name('timing'))
+    lut = timing_group.group('cell_rise', 'delay_template_10x10')
+    assert lut.size == (10, 10)
+    assert list(lut.index_values[1]) == sorted(slews)
+    assert lut[loads[3], slews[2]] == 3.02
+    assert lut[loads[9], slews[9]] == 9.09
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from charlib.characterizer.backend import CachedAnalysis, SimulationCache, deck_key
+
+
+DECK = """.title comb_delay
+.include {netlist}
+.lib {models} tt
+VDD VDD 0 3.3
+XDUT A Y VDD VSS INVX1
+.tran 1ps 10ns
+.end
+"""
+
+def _write_deck_files(tmp_path, netlist='.subckt INVX1 A Y VDD VSS\n.ends\n'):
+    (tmp_path / 'cells.sp').write_text(netlist)
+    (tmp_path / 'models.lib').write_text('.lib tt\n.include devices.sp\n.endl\n')
+    (tmp_path / 'devices.sp').write_text('.model nmos nmos level=1\n')
+    return DECK.format(netlist=tmp_path / 'cells.sp', models=tmp_path / 'models.lib')
+
+
+def test_deck_key_ignores_title_comments_and_whitespace(tmp_path):
+    deck = _write_deck_files(tmp_path)
+    reformatted = deck.replace('.title comb_delay', '.title something_else') \
+                      .replace('VDD VDD 0 3.3', '* supply\nvdd   vdd 0   3.3')
+    assert deck_key(deck) == deck_key(reformatted)
+
+
+def test_deck_key_tracks_included_file_contents(tmp_path):
+    deck = _write_deck_files(tmp_path)
+    key = deck_key(deck)
+    # Editing a file included by a model file (not by the deck itself) must invalidate the key
+    (tmp_path / 'devices.sp').write_text('.model nmos nmos level=3\n')
+    assert deck_key(deck) != key
+
+
+def test_deck_key_depends_on_backend(tmp_path):
+    deck = _write_deck_files(tmp_path)
+    assert deck_key(deck, 'ngspice-shared') != deck_key(deck, 'xyce-serial')
+
+
+def test_cache_round_trip(tmp_path):
+    analysis = SimpleNamespace(
+        nodes={'vout': np.linspace(0, 3.3, 5)},
+        branches={'vdd': np.array([-1e-9])},
+        measurements={'cell_rise__a_to_y': 1.5e-10},
+        time=np.linspace(0, 1e-9, 5))
+    cache = SimulationCache(tmp_path)
+    assert cache.load('ab' * 32) is None
+    cache.store('ab' * 32, analysis)
+
+    cached = cache.load('ab' * 32)
+    assert np.array_equal(cached['vout'], analysis.nodes['vout'])
+    assert np.array_equal(cached.vout, analysis.nodes['vout'])
+    assert np.array_equal(cached.time, analysis.time)
+    assert float(cached.branches['vdd'][0]) == -1e-9
+    assert cached.measurements == {'cell_rise__a_to_y': 1.5e-10}
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from charlib.characterizer.waveforms import Waveforms, WaveformStore
+
+
+def test_waveforms_are_memory_mapped(tmp_path):
+    store = WaveformStore(tmp_path)
+    time = np.linspace(0, 1, 5)
+    assert 'abcd' not in store
+    waveforms = store.save('abcd', Waveforms(time, vA=time, vY=1 - time, vZ=time), ['vA', 'vY'])
+    assert 'abcd' in store
+    assert store.path('abcd') == tmp_path / 'ab' / 'abcd.npy'
+    assert waveforms.time.tolist() == time.tolist()
+    assert waveforms['vY'].tolist() == (1 - time).tolist()
+    assert isinstance(waveforms['vA'].base, np.memmap)
+    with pytest.raises(IndexError):
+        waveforms['vZ']
+    with pytest.raises(ValueError):
+        waveforms['vA'][0] = 1.0 # Read-only
+
+
+def test_identical_simulations_are_saved_once(tmp_path):
+    store = WaveformStore(tmp_path)
+    time = np.linspace(0, 1, 5)
+    store.save('abcd', Waveforms(time, vA=time), ['vA'])
+    waveforms = store.save('abcd', Waveforms(time, vA=2 * time), ['vA'])
+    assert waveforms['vA'].tolist() == time.tolist()
+    assert [path.name for path in tmp_path.rglob('*')] == ['ab', 'abcd.npy']
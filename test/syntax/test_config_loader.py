@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from charlib.config import loader as config_loader
+from charlib.config.loader import ConfigLoader
+
+CONFIG = """\
+settings:
+    lib_name: {lib_name}
+cells:
+    INVX1:
+        netlist: cells.sp
+        models: [models.m]
+        inputs: [A]
+        outputs: [Y]
+        functions: [Y=!A]
+        data_slews: [0.015, 0.04]
+        loads: [0.06, 0.18]
+"""
+
+CELL = """\
+netlist: cells.sp
+models: [models.m]
+inputs: [A, B]
+outputs: [Y]
+functions: [Y=!(A&B)]
+"""
+
+
+def make_library(path):
+    (path / 'cells').mkdir()
+    (path / 'cells' / 'NAND2X1.yml').write_text(CELL)
+    (path / 'config.yaml').write_text(CONFIG.format(lib_name='loader_test'))
+
+
+def test_find_config_skips_other_yaml_files(tmp_path):
+    make_library(tmp_path)
+    loader = ConfigLoader()
+    config = loader.find_config(tmp_path)
+    assert config['settings']['lib_name'] == 'loader_test'
+    assert list(config['cells']) == ['INVX1']
+    cells = dict(loader.read_cell_configs({'NAND2X1': str(tmp_path / 'cells')}))
+    assert cells['NAND2X1']['functions'] == ['Y=!(A&B)']
+    with pytest.raises(FileNotFoundError):
+        loader.find_config(tmp_path / 'cells')
+
+
+def test_validated_configs_are_cached(tmp_path, monkeypatch):
+    make_library(tmp_path)
+    loader = ConfigLoader(tmp_path / 'cache')
+    config = loader.find_config(tmp_path)
+    config['settings']['lib_name'] = 'modified' # Callers may modify what they're given
+    loader.save()
+
+    # Unchanged (or only touched) files are not parsed or validated again
+    expected = ConfigLoader().find_config(tmp_path)
+    os.utime(tmp_path / 'config.yaml', ns=(0, 0))
+    with monkeypatch.context() as patch:
+        patch.setattr(config_loader, 'load_yaml', lambda path: pytest.fail(f'{path} was read'))
+        assert ConfigLoader(tmp_path / 'cache').find_config(tmp_path) == expected
+
+    # Edited files are read again
+    (tmp_path / 'config.yaml').write_text(CONFIG.format(lib_name='edited'))
+    config = ConfigLoader(tmp_path / 'cache').find_config(tmp_path)
+    assert config['settings']['lib_name'] == 'edited'
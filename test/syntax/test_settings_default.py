@@ -49,4 +49,7 @@ def test_settings_default():
     assert settings["debug"] == False
     assert settings["debug_dir"] == "debug"
     assert settings["omit_on_failure"] == False
+    assert settings["use_cache"] == True
+    assert settings["subset_models"] == True
+    assert settings["extract_netlists"] == True
 